@@ -3,40 +3,38 @@
 Advanced Data Analysis for Uber Fares Dataset
 """
 
+import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from scipy import stats
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
+from plot_style import pyplot, seaborn
+from instrumentation import instrumented
+from partitioned_store import add_date_range_arguments, date_range, read_dataset
+from dataframe_engine import get_engine
 import warnings
 warnings.filterwarnings('ignore')
 
-# Set style
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
-
+@instrumented()
 class UberAdvancedAnalysis:
     """
     Advanced analysis class for Uber Fares dataset
     """
     
-    def __init__(self, data_path='uber_enhanced.csv'):
-        """Initialize the advanced analyzer"""
+    def __init__(self, data_path='uber_enhanced.csv', engine=None):
+        """Initialize the advanced analyzer (engine: 'pandas', 'duckdb' or None for UBER_ENGINE)"""
         self.data_path = data_path
+        self.engine = get_engine(engine)
         self.df = None
         
-    def load_data(self):
-        """Load the enhanced dataset"""
+    def load_data(self, df=None, start=None, end=None):
+        """Load the enhanced dataset (only pickups in [start, end) if given) or take an in-memory frame"""
         print("=" * 80)
         print("UBER FARES DATASET - ADVANCED DATA ANALYSIS")
         print("=" * 80)
         
-        self.df = pd.read_csv(self.data_path)
+        self.df = df if df is not None else read_dataset(self.data_path, start, end)
+        if self.df.empty:
+            print(f"\n❌ No pickups in [{start or 'the first trip'}, {end or 'the last trip'}) - nothing to analyze")
+            return False
         # Convert pickup_datetime back to datetime if needed
         if self.df['pickup_datetime'].dtype == 'object':
             self.df['pickup_datetime'] = pd.to_datetime(self.df['pickup_datetime'])
@@ -44,11 +42,16 @@ class UberAdvancedAnalysis:
         print(f"\n📊 Enhanced dataset loaded:")
         print(f"   • Shape: {self.df.shape}")
         print(f"   • Features: {len(self.df.columns)}")
+        if start is not None or end is not None:
+            print(f"   • Pickups from {start or 'the first trip'} to {end or 'the last trip'} (end exclusive)")
         
         return True
     
     def correlation_analysis(self):
         """Perform comprehensive correlation analysis"""
+        from scipy import stats
+        plt = pyplot()
+        sns = seaborn()
         print("\n" + "=" * 60)
         print("1. CORRELATION ANALYSIS")
         print("=" * 60)
@@ -91,6 +94,8 @@ class UberAdvancedAnalysis:
     
     def fare_prediction_factors(self):
         """Analyze factors that predict fare amounts"""
+        from scipy import stats
+        plt = pyplot()
         print("\n" + "=" * 60)
         print("2. FARE PREDICTION FACTORS")
         print("=" * 60)
@@ -111,7 +116,9 @@ class UberAdvancedAnalysis:
         axes[0, 0].plot(self.df['trip_distance_km'], p(self.df['trip_distance_km']), "r--", alpha=0.8)
         
         # 2. Fare by hour (with confidence intervals)
-        hourly_stats = self.df.groupby('pickup_hour')['fare_amount'].agg(['mean', 'std', 'count'])
+        hourly_stats = self.engine.group_agg(self.df, 'pickup_hour', {
+            'mean': ('fare_amount', 'mean'), 'std': ('fare_amount', 'std'), 'count': ('fare_amount', 'count')
+        })
         hourly_stats['se'] = hourly_stats['std'] / np.sqrt(hourly_stats['count'])
         hourly_stats['ci'] = 1.96 * hourly_stats['se']
         
@@ -124,7 +131,7 @@ class UberAdvancedAnalysis:
         
         # 3. Fare distribution by passenger category
         passenger_categories = ['Solo', 'Couple', 'Small Group', 'Large Group']
-        fare_by_passenger = [self.df[self.df['passenger_category'] == cat]['fare_amount'].values 
+        fare_by_passenger = [self.engine.filter(self.df, {'passenger_category': cat}, ['fare_amount'])['fare_amount'].values
                            for cat in passenger_categories]
         
         axes[0, 2].boxplot(fare_by_passenger, labels=passenger_categories)
@@ -140,8 +147,8 @@ class UberAdvancedAnalysis:
         axes[1, 0].set_title('Fare vs Distance from Center')
         
         # 5. Weekend vs Weekday fare comparison
-        weekend_fares = self.df[self.df['is_weekend'] == 1]['fare_amount']
-        weekday_fares = self.df[self.df['is_weekend'] == 0]['fare_amount']
+        weekend_fares = self.engine.filter(self.df, {'is_weekend': 1}, ['fare_amount'])['fare_amount']
+        weekday_fares = self.engine.filter(self.df, {'is_weekend': 0}, ['fare_amount'])['fare_amount']
         
         axes[1, 1].hist([weekday_fares, weekend_fares], bins=30, alpha=0.7, 
                        label=['Weekday', 'Weekend'], color=['skyblue', 'lightcoral'])
@@ -157,7 +164,7 @@ class UberAdvancedAnalysis:
         
         for borough in borough_order:
             if borough in self.df['pickup_borough'].values:
-                borough_fares = self.df[self.df['pickup_borough'] == borough]['fare_amount']
+                borough_fares = self.engine.filter(self.df, {'pickup_borough': borough}, ['fare_amount'])['fare_amount']
                 if len(borough_fares) > 100:  # Only include boroughs with sufficient data
                     borough_data.append(borough_fares.values)
                     borough_labels.append(borough)
@@ -181,7 +188,7 @@ class UberAdvancedAnalysis:
         
         # ANOVA for time periods
         time_periods = ['Morning', 'Afternoon', 'Evening', 'Night']
-        period_fares = [self.df[self.df['time_period'] == period]['fare_amount'].values 
+        period_fares = [self.engine.filter(self.df, {'time_period': period}, ['fare_amount'])['fare_amount'].values
                        for period in time_periods]
         f_stat, p_value = stats.f_oneway(*period_fares)
         print(f"   • Time period ANOVA: F={f_stat:.3f}, p-value={p_value:.2e}")
@@ -192,6 +199,7 @@ class UberAdvancedAnalysis:
     
     def seasonal_analysis(self):
         """Analyze seasonal patterns and trends"""
+        plt = pyplot()
         print("\n" + "=" * 60)
         print("3. SEASONAL ANALYSIS")
         print("=" * 60)
@@ -201,15 +209,16 @@ class UberAdvancedAnalysis:
         fig.suptitle('Seasonal Patterns and Trends', fontsize=16, fontweight='bold')
         
         # 1. Monthly trends
-        monthly_stats = self.df.groupby('pickup_month').agg({
-            'fare_amount': ['mean', 'count'],
-            'trip_distance_km': 'mean'
+        monthly_stats = self.engine.group_agg(self.df, 'pickup_month', {
+            'fare_mean': ('fare_amount', 'mean'),
+            'ride_count': ('fare_amount', 'count'),
+            'distance_mean': ('trip_distance_km', 'mean')
         }).round(2)
         
         months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
                  'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
         
-        axes[0, 0].plot(monthly_stats.index, monthly_stats[('fare_amount', 'mean')], 
+        axes[0, 0].plot(monthly_stats.index, monthly_stats['fare_mean'], 
                        marker='o', linewidth=2, markersize=8, color='red')
         axes[0, 0].set_xlabel('Month')
         axes[0, 0].set_ylabel('Average Fare ($)', color='red')
@@ -219,14 +228,14 @@ class UberAdvancedAnalysis:
         axes[0, 0].grid(True, alpha=0.3)
         
         ax2 = axes[0, 0].twinx()
-        ax2.bar(monthly_stats.index, monthly_stats[('fare_amount', 'count')], 
+        ax2.bar(monthly_stats.index, monthly_stats['ride_count'], 
                alpha=0.3, color='blue')
         ax2.set_ylabel('Number of Rides', color='blue')
         
         # 2. Yearly trends (if multiple years available)
-        yearly_stats = self.df.groupby('pickup_year').agg({
-            'fare_amount': 'mean',
-            'trip_distance_km': 'mean'
+        yearly_stats = self.engine.group_agg(self.df, 'pickup_year', {
+            'fare_amount': ('fare_amount', 'mean'),
+            'trip_distance_km': ('trip_distance_km', 'mean')
         })
         
         if len(yearly_stats) > 1:
@@ -244,9 +253,9 @@ class UberAdvancedAnalysis:
         
         # 3. Day of week patterns
         day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        daily_stats = self.df.groupby('day_of_week').agg({
-            'fare_amount': 'mean',
-            'trip_distance_km': 'mean'
+        daily_stats = self.engine.group_agg(self.df, 'day_of_week', {
+            'fare_amount': ('fare_amount', 'mean'),
+            'trip_distance_km': ('trip_distance_km', 'mean')
         }).reindex(day_order)
         
         axes[1, 0].bar(daily_stats.index, daily_stats['fare_amount'], color='lightgreen')
@@ -256,9 +265,9 @@ class UberAdvancedAnalysis:
         axes[1, 0].tick_params(axis='x', rotation=45)
         
         # 4. Heatmap of hour vs day patterns
-        pivot_data = self.df.groupby(['pickup_hour', 'pickup_weekday'])['fare_amount'].mean().unstack()
+        pivot_data = self.engine.pivot_matrix(self.df, 'pickup_hour', 'pickup_weekday', 'fare_amount', 'mean',
+                                              range(24), range(7))
         day_names = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-        pivot_data.columns = day_names
         
         im = axes[1, 1].imshow(pivot_data.T, cmap='YlOrRd', aspect='auto')
         axes[1, 1].set_xlabel('Hour of Day')
@@ -279,10 +288,10 @@ class UberAdvancedAnalysis:
         
         # Print seasonal insights
         print(f"\n📊 Seasonal Insights:")
-        highest_month = monthly_stats[('fare_amount', 'mean')].idxmax()
-        lowest_month = monthly_stats[('fare_amount', 'mean')].idxmin()
-        print(f"   • Highest fare month: {months[highest_month-1]} (${monthly_stats.loc[highest_month, ('fare_amount', 'mean')]:.2f})")
-        print(f"   • Lowest fare month: {months[lowest_month-1]} (${monthly_stats.loc[lowest_month, ('fare_amount', 'mean')]:.2f})")
+        highest_month = monthly_stats['fare_mean'].idxmax()
+        lowest_month = monthly_stats['fare_mean'].idxmin()
+        print(f"   • Highest fare month: {months[highest_month-1]} (${monthly_stats.loc[highest_month, 'fare_mean']:.2f})")
+        print(f"   • Lowest fare month: {months[lowest_month-1]} (${monthly_stats.loc[lowest_month, 'fare_mean']:.2f})")
         
         highest_day = daily_stats['fare_amount'].idxmax()
         lowest_day = daily_stats['fare_amount'].idxmin()
@@ -291,8 +300,15 @@ class UberAdvancedAnalysis:
 
 def main():
     """Main function to run advanced analysis"""
-    analyzer = UberAdvancedAnalysis('uber_enhanced.csv')
-    analyzer.load_data()
+    parser = argparse.ArgumentParser(description='Correlation, fare factor and seasonal analysis')
+    parser.add_argument('--data', default='uber_enhanced.csv', help='Enhanced dataset')
+    add_date_range_arguments(parser)
+    args = parser.parse_args()
+    start, end = date_range(args)
+
+    analyzer = UberAdvancedAnalysis(args.data)
+    if not analyzer.load_data(start=start, end=end):
+        return
     analyzer.correlation_analysis()
     analyzer.fare_prediction_factors()
     analyzer.seasonal_analysis()
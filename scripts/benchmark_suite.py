@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite: Per-Method Timings of the Pipeline at Multiple Dataset Scales
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import multiprocessing
+import pandas as pd
+import numpy as np
+from instrumentation import PeakRSSMeter
+from synthetic_trips import SyntheticTripGenerator
+import warnings
+warnings.filterwarnings('ignore')
+
+# Methods timed per stage, in pipeline order; the first entry of each stage is its loader
+BENCHMARK_STEPS = {
+    'clean': ['load_data', 'handle_missing_values', 'clean_fare_amounts', 'clean_coordinates',
+              'clean_passenger_count', 'convert_datetime', 'remove_unnecessary_columns'],
+    'features': ['load_cleaned_data', 'extract_temporal_features', 'calculate_distance_features',
+                 'create_location_features', 'create_passenger_features', 'create_landmark_features',
+                 'create_demand_features'],
+    'eda': ['load_data', 'fare_distribution_analysis', 'temporal_analysis', 'geographical_analysis'],
+    'advanced': ['load_data', 'correlation_analysis', 'fare_prediction_factors', 'seasonal_analysis'],
+    'tableau': ['load_and_prepare_data', 'create_tableau_optimized_dataset', 'create_interactive_dashboard',
+                'create_summary_statistics'],
+}
+
+def parse_scale(text):
+    """'100k' -> 100000, '10M' -> 10000000"""
+    text = text.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+def _benchmark_scale(n_rows, stages, seed):
+    """Run the selected stages once at one scale (in a fresh worker process) and time every method"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from data_cleaning import UberDataCleaner
+    from feature_engineering import UberFeatureEngineer
+    from comprehensive_eda import UberEDA
+    from advanced_analysis import UberAdvancedAnalysis
+    from tableau_prep_and_interactive_viz import TableauDataPrep
+
+    meter = PeakRSSMeter()
+    start = time.perf_counter()
+    raw = SyntheticTripGenerator(seed=seed).generate_frame(n_rows)
+    result = {'rows': n_rows, 'generate_s': time.perf_counter() - start, 'methods': []}
+
+    workdir = tempfile.mkdtemp(prefix='uber_bench_')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        cleaner = UberDataCleaner()
+        engineer = UberFeatureEngineer()
+        instances = {
+            'clean': (cleaner, lambda: raw, lambda: cleaner.df_cleaned),
+            'features': (engineer, lambda: cleaner.df_cleaned.reset_index(drop=True), lambda: engineer.df_enhanced),
+            'eda': (UberEDA(), lambda: engineer.df_enhanced, None),
+            'advanced': (UberAdvancedAnalysis(), lambda: engineer.df_enhanced, None),
+            'tableau': (TableauDataPrep(), lambda: engineer.df_enhanced, None),
+        }
+        # Analysis stages need the enhanced frame, so cleaning and features always run
+        required = {'clean', 'features'} | set(stages)
+        for stage in [s for s in BENCHMARK_STEPS if s in required]:
+            instance, upstream, output = instances[stage]
+            for i, method in enumerate(BENCHMARK_STEPS[stage]):
+                args = (upstream(),) if i == 0 else ()
+                frame = args[0] if args else (output() if output else instance.df)
+                meter.reset()
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    getattr(instance, method)(*args)
+                elapsed = time.perf_counter() - start
+                plt.close('all')
+                result['methods'].append({
+                    'stage': stage,
+                    'method': method,
+                    'rows': len(frame),
+                    'wall_s': elapsed,
+                    'peak_rss_mb': meter.peak_mb(),
+                    'rows_per_s': len(frame) / elapsed if elapsed > 0 else None,
+                })
+    finally:
+        # Every stage writes its full output files into the work directory
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+class UberBenchmarkSuite:
+    """
+    Time every pipeline method on generated data and compare result files
+    """
+
+    def __init__(self, scales=(100_000, 1_000_000), stages=None, seed=42):
+        """Initialize the suite"""
+        self.scales = list(scales)
+        self.stages = list(stages or BENCHMARK_STEPS)
+        self.seed = seed
+        self.results = None
+
+    def run(self):
+        """Benchmark every scale, each in its own process so peaks do not carry over"""
+        print("=" * 80)
+        print("UBER FARES DATASET - BENCHMARK SUITE")
+        print("=" * 80)
+
+        self.results = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'stages': self.stages,
+            'scales': {},
+        }
+        context = multiprocessing.get_context('spawn')
+        for n_rows in self.scales:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(_benchmark_scale, n_rows, self.stages, self.seed).result()
+            self.results['scales'][str(n_rows)] = result
+
+            print(f"\n📊 {n_rows:,} rows (generated in {result['generate_s']:.2f}s):")
+            for entry in result['methods']:
+                print(f"   • {entry['stage']}.{entry['method']}: {entry['wall_s']:.3f}s, "
+                      f"{entry['peak_rss_mb']:.0f} MB peak, {entry['rows_per_s'] or 0:,.0f} rows/s")
+        return self.results
+
+    def save(self, output_path='uber_benchmark.json'):
+        """Write results as JSON"""
+        with open(output_path, 'w') as f:
+            json.dump(self.results, f, indent=2)
+        print(f"\n💾 Benchmark results saved to: {output_path}")
+        return output_path
+
+    @staticmethod
+    def compare(baseline_path, candidate_path, threshold=0.10, min_seconds=0.005):
+        """List methods whose wall time or peak RSS grew by more than threshold between two result files"""
+        print("=" * 80)
+        print("BENCHMARK COMPARISON")
+        print("=" * 80)
+
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        with open(candidate_path) as f:
+            candidate = json.load(f)
+
+        regressions = []
+        for scale, result in candidate['scales'].items():
+            if scale not in baseline['scales']:
+                continue
+            before = {(m['stage'], m['method']): m for m in baseline['scales'][scale]['methods']}
+            print(f"\n📊 {int(scale):,} rows:")
+            for entry in result['methods']:
+                old = before.get((entry['stage'], entry['method']))
+                if old is None:
+                    continue
+                time_change = entry['wall_s'] / old['wall_s'] - 1 if old['wall_s'] > 0 else 0.0
+                rss_change = entry['peak_rss_mb'] / old['peak_rss_mb'] - 1 if old['peak_rss_mb'] > 0 else 0.0
+                slower = time_change > threshold and entry['wall_s'] - old['wall_s'] > min_seconds
+                bigger = rss_change > threshold
+                flag = '❌ REGRESSION' if slower or bigger else '✅'
+                print(f"   {flag} {entry['stage']}.{entry['method']}: {old['wall_s']:.3f}s -> {entry['wall_s']:.3f}s "
+                      f"({time_change:+.1%}), RSS {old['peak_rss_mb']:.0f} -> {entry['peak_rss_mb']:.0f} MB "
+                      f"({rss_change:+.1%})")
+                if slower or bigger:
+                    regressions.append({'scale': int(scale), 'stage': entry['stage'], 'method': entry['method'],
+                                        'time_change': time_change, 'rss_change': rss_change})
+
+        print(f"\n📋 {len(regressions)} regression(s) above {threshold:.0%}")
+        return regressions
+
+def main():
+    """Main function to run or compare benchmarks"""
+    parser = argparse.ArgumentParser(description='Per-method pipeline benchmark suite')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Benchmark the pipeline on generated data')
+    run_parser.add_argument('--scales', default='100k,1m', help='Comma-separated row counts, e.g. 100k,1m,10m')
+    run_parser.add_argument('--stages', default=','.join(BENCHMARK_STEPS),
+                            help=f'Comma-separated subset of: {",".join(BENCHMARK_STEPS)}')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--output', default='uber_benchmark.json')
+
+    compare_parser = subparsers.add_parser('compare', help='Flag regressions between two result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help='Relative slowdown to flag')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+        unknown = set(stages) - set(BENCHMARK_STEPS)
+        if unknown:
+            parser.error(f"Unknown stages: {sorted(unknown)}; choose from {list(BENCHMARK_STEPS)}")
+        suite = UberBenchmarkSuite([parse_scale(s) for s in args.scales.split(',')], stages, args.seed)
+        suite.run()
+        suite.save(args.output)
+        print(f"\n🎯 Benchmark completed successfully!")
+    else:
+        regressions = UberBenchmarkSuite.compare(args.baseline, args.candidate, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
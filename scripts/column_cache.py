@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Memory-Mapped Column Cache: Fixed-Width Binary Columns of a CSV Dataset
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+# Text columns parsed to timestamps when the cache is built
+DATETIME_COLUMNS = ['pickup_datetime']
+
+# Text columns with at most this share of distinct values are dictionary-encoded
+MAX_DICTIONARY_SHARE = 0.5
+
+# Layout version recorded in the manifest; caches written by another version are rebuilt
+CACHE_FORMAT = 2
+
+def cache_dir_for(data_path):
+    """Cache directory that sits next to a CSV: uber_enhanced.csv -> uber_enhanced_columns/"""
+    return os.path.splitext(data_path)[0] + '_columns'
+
+def dictionary_categories(series):
+    """Categories a text column is dictionary-encoded with, or None if it is stored as bytes"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+    elif series.dtype == object and series.nunique() <= MAX_DICTIONARY_SHARE * len(series):
+        categories = pd.Categorical(series).categories
+    else:
+        return None
+    return [c.item() if isinstance(c, np.generic) else c for c in categories]
+
+def encode_column(series):
+    """(fixed-width array, manifest entry) for one column"""
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        tz = getattr(series.dtype, 'tz', None)
+        values = series.dt.tz_convert('UTC').dt.tz_localize(None) if tz is not None else series
+        return values.to_numpy('datetime64[ns]').view(np.int64), {'kind': 'datetime', 'tz': str(tz) if tz else None}
+    categories = dictionary_categories(series)
+    if categories is not None:
+        return pd.Categorical(series, categories=categories).codes, {'kind': 'category', 'categories': categories}
+    if series.dtype == object:
+        # Missing values are stored as empty strings (read_csv never yields empty text) and decoded back to NaN
+        missing = series.isna()
+        text = series.astype(str).mask(missing, '')
+        return text.str.encode('utf-8').to_numpy(dtype=bytes), {'kind': 'bytes', 'missing': bool(missing.any())}
+    return series.to_numpy(), {'kind': 'numeric'}
+
+def decode_column(values, entry):
+    """Column for a DataFrame built on values without copying them (except tz-aware timestamps and bytes)"""
+    if entry['kind'] == 'datetime':
+        column = pd.Series(values.view('datetime64[ns]'), copy=False)
+        if entry['tz']:
+            # Localizing makes one private copy of this column
+            column = column.dt.tz_localize('UTC').dt.tz_convert(entry['tz'])
+        return column
+    if entry['kind'] == 'category':
+        return pd.Categorical.from_codes(values, entry['categories'])
+    if entry['kind'] == 'bytes':
+        column = np.char.decode(values, 'utf-8').astype(object)
+        if entry.get('missing'):
+            column[values == b''] = np.nan
+        return column
+    return values
+
+class ColumnCache:
+    """
+    One .npy file per column plus a manifest, opened with np.load(mmap_mode='c')
+
+    Numeric and boolean columns are stored as they are, timestamps as int64
+    nanoseconds, low-cardinality text as integer codes with the dictionary
+    in the manifest and any other text as fixed-width UTF-8 bytes, with
+    missing text kept as empty strings so it reads back as NaN. Mapped
+    columns share the OS page cache between processes; a process that
+    modifies a column gets private copies of the touched pages only.
+    """
+
+    def __init__(self, directory):
+        """Initialize the cache for one directory"""
+        self.directory = directory
+        self.manifest = None
+
+    def _read_manifest(self):
+        """Manifest of the cache, or None if there is none"""
+        try:
+            with open(os.path.join(self.directory, 'manifest.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _source_stamp(source_path):
+        """Size and modification time identifying one version of the source file"""
+        stat = os.stat(source_path)
+        return {'path': os.path.basename(source_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def is_fresh(self, source_path):
+        """True if the cache was built from the current version of source_path"""
+        manifest = self._read_manifest()
+        return (manifest is not None and os.path.exists(source_path)
+                and manifest.get('format') == CACHE_FORMAT
+                and manifest.get('source') == self._source_stamp(source_path))
+
+    def write(self, df, source_path=None, extra=None):
+        """Write every column, replacing the cache as a whole once all files are complete (extra: more manifest keys)"""
+        staging = f"{self.directory}.tmp{os.getpid()}"
+        os.makedirs(staging, exist_ok=True)
+        manifest = {'format': CACHE_FORMAT, 'rows': len(df), 'columns': [],
+                    'source': self._source_stamp(source_path) if source_path else None, **(extra or {})}
+        for i, col in enumerate(df.columns):
+            values, entry = encode_column(df[col])
+            entry.update(name=col, file=f'col{i:03d}.npy', dtype=values.dtype.str)
+            np.save(os.path.join(staging, entry['file']), np.ascontiguousarray(values))
+            manifest['columns'].append(entry)
+        with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory, ignore_errors=True)
+        try:
+            os.rename(staging, self.directory)
+        except OSError:
+            # Another process published the same cache first
+            shutil.rmtree(staging, ignore_errors=True)
+        self.manifest = manifest
+        return self.directory
+
+    def read(self, columns=None):
+        """DataFrame whose numeric, code and timestamp buffers are memory-mapped files"""
+        self.manifest = self._read_manifest()
+        if self.manifest is None:
+            raise FileNotFoundError(f"No column cache in {self.directory}")
+        wanted = None if columns is None else set(columns)
+        data = {}
+        for entry in self.manifest['columns']:
+            if wanted is not None and entry['name'] not in wanted:
+                continue
+            # Plain ndarray view of the mapping, so columns behave like parsed ones
+            values = np.asarray(np.load(os.path.join(self.directory, entry['file']), mmap_mode='c'))
+            data[entry['name']] = decode_column(values, entry)
+        # copy=False keeps each column in its own mapped block instead of consolidating
+        return pd.DataFrame(data, copy=False)
+
+    def nbytes(self):
+        """Total size of the column files"""
+        return sum(os.path.getsize(os.path.join(self.directory, entry['file']))
+                   for entry in (self.manifest or self._read_manifest())['columns'])
+
+def build_column_cache(data_path, cache_dir=None):
+    """Parse a CSV once and write its column cache"""
+    df = pd.read_csv(data_path)
+    for col in DATETIME_COLUMNS:
+        if col in df.columns and df[col].dtype == 'object':
+            df[col] = pd.to_datetime(df[col])
+    return ColumnCache(cache_dir or cache_dir_for(data_path)).write(df, source_path=data_path)
+
+def read_csv_cached(data_path, columns=None, build=True):
+    """
+    Load a dataset from its column cache, building the cache on the first read
+
+    The cache is only used while it matches the CSV's size and modification
+    time; set UBER_COLUMN_CACHE=0 to always parse the CSV. Unlike
+    pd.read_csv, text columns with few distinct values load as Categorical
+    and pickup_datetime loads as a timestamp.
+    """
+    if os.environ.get('UBER_COLUMN_CACHE', '1') == '0':
+        return pd.read_csv(data_path, usecols=columns)
+    cache = ColumnCache(cache_dir_for(data_path))
+    if not cache.is_fresh(data_path):
+        if not build:
+            return pd.read_csv(data_path, usecols=columns)
+        try:
+            build_column_cache(data_path, cache.directory)
+        except OSError:
+            return pd.read_csv(data_path, usecols=columns)
+    return cache.read(columns)
+
+def main():
+    """Main function to build or inspect column caches"""
+    parser = argparse.ArgumentParser(description='Build memory-mapped column caches of CSV datasets')
+    parser.add_argument('data', nargs='+', help='CSV files, e.g. uber_cleaned.csv uber_enhanced.csv')
+    parser.add_argument('--check', action='store_true', help='Only report whether each cache is fresh')
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("UBER FARES DATASET - COLUMN CACHE")
+    print("=" * 80)
+
+    for data_path in args.data:
+        cache = ColumnCache(cache_dir_for(data_path))
+        if args.check:
+            print(f"\n{'✅ fresh' if cache.is_fresh(data_path) else '❌ stale or missing'}: {cache.directory}/")
+            continue
+
+        start = time.perf_counter()
+        build_column_cache(data_path, cache.directory)
+        build_s = time.perf_counter() - start
+        start = time.perf_counter()
+        df = cache.read()
+        read_s = time.perf_counter() - start
+        start = time.perf_counter()
+        pd.read_csv(data_path)
+        csv_s = time.perf_counter() - start
+
+        kinds = pd.Series([entry['kind'] for entry in cache.manifest['columns']]).value_counts()
+        print(f"\n📊 {data_path} -> {cache.directory}/:")
+        print(f"   • Rows: {len(df):,}, columns: {', '.join(f'{n} {kind}' for kind, n in kinds.items())}")
+        print(f"   • Size: {cache.nbytes() / 1024**2:.1f} MB (CSV {os.path.getsize(data_path) / 1024**2:.1f} MB)")
+        print(f"⏱️ Build {build_s:.2f}s, mapped load {read_s * 1000:.1f} ms vs CSV parse {csv_s:.2f}s")
+
+    print(f"\n🎯 Column cache ready!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Compact Trip Store: Quantized Coordinates and Delta-Encoded Pickup Times
+"""
+
+import argparse
+import json
+import os
+import time
+import pandas as pd
+import numpy as np
+from data_cleaning import NYC_BOUNDS, parse_pickup_datetime
+from feature_engineering import BOROUGH_BOUNDS, EARTH_RADIUS_KM, classify_borough, haversine_distance
+import warnings
+warnings.filterwarnings('ignore')
+
+# Rows per block of delta-encoded pickup times (each block starts from an absolute base)
+BLOCK_ROWS = 4096
+
+# Gaps between consecutive pickups are uint16 seconds; this value marks a gap kept in the overflow table
+DELTA_OVERFLOW = np.iinfo(np.uint16).max
+
+COORDINATE_COLUMNS = ['pickup_longitude', 'pickup_latitude', 'dropoff_longitude', 'dropoff_latitude']
+
+METERS_PER_DEGREE = np.pi * EARTH_RADIUS_KM * 1000 / 180
+
+def smallest_uint(max_value):
+    """Narrowest unsigned integer dtype holding 0..max_value"""
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if max_value <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    raise ValueError(f"{max_value} does not fit in 64 bits")
+
+def epoch_nanoseconds(times):
+    """int64 UTC nanoseconds of a timestamp column (text is parsed first)"""
+    if times.dtype == object:
+        times = parse_pickup_datetime(times)
+    if times.dt.tz is not None:
+        times = times.dt.tz_convert('UTC').dt.tz_localize(None)
+    return times.to_numpy('datetime64[ns]').view(np.int64)
+
+class CoordinateQuantizer:
+    """
+    Fixed-point coordinates: integer steps from the south-west corner of the NYC bounds
+
+    With bits=16 the 0.6 degree box is split into 65,535 steps per axis,
+    about 1.0 m north-south and 0.8 m east-west; bits=32 gives sub-millimetre
+    steps. Decoding is one multiply-add per value.
+    """
+
+    def __init__(self, bits=16, bounds=NYC_BOUNDS):
+        """Steps of the fixed-point grid"""
+        self.bits = bits
+        self.bounds = dict(bounds)
+        self.dtype = smallest_uint((1 << bits) - 1)
+        levels = (1 << bits) - 1
+        self.origin = {'latitude': bounds['min_latitude'], 'longitude': bounds['min_longitude']}
+        self.step = {'latitude': (bounds['max_latitude'] - bounds['min_latitude']) / levels,
+                     'longitude': (bounds['max_longitude'] - bounds['min_longitude']) / levels}
+        self.levels = levels
+
+    def quantize(self, values, axis):
+        """Nearest grid step of coordinates on one axis ('latitude' or 'longitude'); outside values are clipped"""
+        steps = np.rint((np.asarray(values, dtype=np.float64) - self.origin[axis]) / self.step[axis])
+        return np.clip(steps, 0, self.levels).astype(self.dtype)
+
+    def dequantize(self, steps, axis):
+        """Coordinates of grid steps"""
+        return self.origin[axis] + np.asarray(steps, dtype=np.float64) * self.step[axis]
+
+    def threshold(self, value, axis, upper):
+        """Integer step q so that steps >= q (steps <= q for an upper bound) means coordinate >= value (<= value)"""
+        steps = (value - self.origin[axis]) / self.step[axis]
+        return int(np.floor(steps) if upper else np.ceil(steps))
+
+    def resolution_m(self, latitude=40.75):
+        """Step size in metres (north-south, east-west) at a latitude"""
+        return (self.step['latitude'] * METERS_PER_DEGREE,
+                self.step['longitude'] * METERS_PER_DEGREE * np.cos(np.radians(latitude)))
+
+    def to_manifest(self):
+        """JSON description"""
+        return {'bits': self.bits, 'bounds': self.bounds}
+
+class CompactTrips:
+    """
+    Cleaned trips in pickup-time order with fixed-point coordinates and delta-encoded times
+
+    Coordinates are quantized grid steps (uint16 at 16 bits), fares integer
+    cents and passenger counts uint8. Pickup times are whole seconds: each
+    block of BLOCK_ROWS rows keeps its first time as an int64 base and every
+    other row the gap to the previous row as uint16; the rare gaps of 18
+    hours or more are marked and kept in a small overflow table. Decoding
+    is a cumulative sum per block, so any row range decodes on its own. The distance and borough kernels work
+    on the integer steps directly.
+    """
+
+    ARRAYS = ['fare_cents', 'passenger_count', 'time_deltas', 'time_bases', 'delta_overflow_rows',
+              'delta_overflow_values'] + COORDINATE_COLUMNS
+
+    def __init__(self, quantizer=None, block_rows=BLOCK_ROWS):
+        """Initialize an empty store"""
+        self.quantizer = quantizer or CoordinateQuantizer()
+        self.block_rows = block_rows
+        self.arrays = {}
+        self.n_rows = 0
+
+    @classmethod
+    def encode(cls, df, bits=16, block_rows=BLOCK_ROWS):
+        """Sort the cleaned trips by pickup time once and encode every column; returns (trips, row order)"""
+        trips = cls(CoordinateQuantizer(bits), block_rows)
+        seconds = epoch_nanoseconds(df['pickup_datetime']) // 10**9
+        order = np.argsort(seconds, kind='stable')
+        seconds = seconds[order]
+
+        trips.n_rows = len(df)
+        deltas = np.diff(seconds, prepend=seconds[:1])
+        deltas[::block_rows] = 0
+        trips.arrays['time_bases'] = seconds[::block_rows].copy()
+        overflow = np.flatnonzero(deltas >= DELTA_OVERFLOW)
+        trips.arrays['time_deltas'] = np.minimum(deltas, DELTA_OVERFLOW).astype(np.uint16)
+        trips.arrays['delta_overflow_rows'] = overflow
+        trips.arrays['delta_overflow_values'] = deltas[overflow]
+        for col in COORDINATE_COLUMNS:
+            trips.arrays[col] = trips.quantizer.quantize(df[col].to_numpy()[order], col.split('_')[1])
+        cents = np.rint(df['fare_amount'].to_numpy(dtype=np.float64)[order] * 100).astype(np.int64)
+        trips.arrays['fare_cents'] = cents.astype(smallest_uint(int(cents.max(initial=0))))
+        trips.arrays['passenger_count'] = df['passenger_count'].to_numpy()[order].astype(np.uint8)
+        return trips, order
+
+    def _range(self, first, stop):
+        """Row range clipped to the store"""
+        return max(first, 0), self.n_rows if stop is None else min(stop, self.n_rows)
+
+    def pickup_seconds(self, first=0, stop=None):
+        """Epoch seconds of rows first..stop-1, decoded block by block"""
+        first, stop = self._range(first, stop)
+        block_first = first // self.block_rows
+        block_stop = -(-stop // self.block_rows)
+        lo, hi = block_first * self.block_rows, min(block_stop * self.block_rows, self.n_rows)
+        deltas = self.arrays['time_deltas'][lo:hi].astype(np.int64)
+        overflow_rows = self.arrays['delta_overflow_rows']
+        a, b = np.searchsorted(overflow_rows, [lo, hi])
+        deltas[overflow_rows[a:b] - lo] = self.arrays['delta_overflow_values'][a:b]
+        sums = np.cumsum(deltas)
+        block_starts = np.arange(0, hi - lo, self.block_rows)
+        lengths = np.diff(np.append(block_starts, hi - lo))
+        seconds = sums - np.repeat(sums[block_starts], lengths) + np.repeat(
+            np.asarray(self.arrays['time_bases'][block_first:block_stop]), lengths)
+        return seconds[first - lo:stop - lo]
+
+    def coordinates(self, column, first=0, stop=None):
+        """Decoded coordinate column"""
+        first, stop = self._range(first, stop)
+        return self.quantizer.dequantize(self.arrays[column][first:stop], column.split('_')[1])
+
+    def decode(self, first=0, stop=None):
+        """Rows first..stop-1 in the cleaned dataset layout"""
+        first, stop = self._range(first, stop)
+        data = {'fare_amount': self.arrays['fare_cents'][first:stop] / 100,
+                'pickup_datetime': pd.to_datetime(self.pickup_seconds(first, stop), unit='s', utc=True)}
+        for col in COORDINATE_COLUMNS:
+            data[col] = self.coordinates(col, first, stop)
+        data['passenger_count'] = self.arrays['passenger_count'][first:stop].astype(np.int64)
+        return pd.DataFrame(data)
+
+    def _steps(self, col, first, stop):
+        """Quantized steps of one coordinate as int64 (uint32 steps do not fit int32)"""
+        return self.arrays[col][first:stop].astype(np.int64)
+
+    def trip_distance_km(self, first=0, stop=None):
+        """Haversine trip distance from integer step differences (one scale per axis)"""
+        first, stop = self._range(first, stop)
+        q = self.quantizer
+        lat_step = np.radians(q.step['latitude'])
+        lon_step = np.radians(q.step['longitude'])
+        pickup_lat = self._steps('pickup_latitude', first, stop)
+        dropoff_lat = self._steps('dropoff_latitude', first, stop)
+        dlat = (dropoff_lat - pickup_lat) * lat_step
+        dlon = (self._steps('dropoff_longitude', first, stop) - self._steps('pickup_longitude', first, stop)) * lon_step
+        origin = np.radians(q.origin['latitude'])
+        a = (np.sin(dlat / 2) ** 2
+             + np.cos(origin + pickup_lat * lat_step) * np.cos(origin + dropoff_lat * lat_step) * np.sin(dlon / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+    def manhattan_distance_km(self, first=0, stop=None):
+        """Feature-engineering Manhattan approximation from integer step differences"""
+        first, stop = self._range(first, stop)
+        q = self.quantizer
+        dlat = np.abs(self._steps('dropoff_latitude', first, stop) - self._steps('pickup_latitude', first, stop))
+        dlon = np.abs(self._steps('dropoff_longitude', first, stop) - self._steps('pickup_longitude', first, stop))
+        return dlat * (q.step['latitude'] * 111) + dlon * (q.step['longitude'] * 85)
+
+    def borough(self, endpoint='pickup', first=0, stop=None):
+        """classify_borough on integer steps: the borough boxes are quantized once"""
+        first, stop = self._range(first, stop)
+        q = self.quantizer
+        lat = self.arrays[f'{endpoint}_latitude'][first:stop]
+        lon = self.arrays[f'{endpoint}_longitude'][first:stop]
+        conditions = [
+            (lon >= q.threshold(min_lon, 'longitude', False)) & (lon <= q.threshold(max_lon, 'longitude', True))
+            & (lat >= q.threshold(min_lat, 'latitude', False)) & (lat <= q.threshold(max_lat, 'latitude', True))
+            for _, (min_lon, max_lon, min_lat, max_lat) in BOROUGH_BOUNDS
+        ]
+        # Select small integer codes, then look the names up once
+        codes = np.select(conditions, np.arange(len(BOROUGH_BOUNDS), dtype=np.int8), default=len(BOROUGH_BOUNDS))
+        return np.array([name for name, _ in BOROUGH_BOUNDS] + ['Other'])[codes]
+
+    def nbytes(self):
+        """Size of every encoded array"""
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def save(self, directory):
+        """Write one .npy file per array plus a manifest"""
+        os.makedirs(directory, exist_ok=True)
+        for name, array in self.arrays.items():
+            np.save(os.path.join(directory, f'{name}.npy'), array)
+        manifest = {'rows': self.n_rows, 'block_rows': self.block_rows, 'quantizer': self.quantizer.to_manifest(),
+                    'dtypes': {name: array.dtype.str for name, array in self.arrays.items()}}
+        with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Open a saved store; arrays are memory-mapped so only decoded pages are read"""
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            manifest = json.load(f)
+        trips = cls(CoordinateQuantizer(**manifest['quantizer']), manifest['block_rows'])
+        trips.n_rows = manifest['rows']
+        for name in cls.ARRAYS:
+            trips.arrays[name] = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r' if mmap else None)
+        return trips
+
+    def accuracy(self, df, order):
+        """Encoding error against the original trips (rows in the store's order)"""
+        report = {}
+        errors_m = []
+        for col in COORDINATE_COLUMNS:
+            original = df[col].to_numpy(dtype=np.float64)[order]
+            # East-west degrees shrink with the cosine of the latitude
+            latitude = df[col.replace('longitude', 'latitude')].to_numpy(dtype=np.float64)[order]
+            scale = METERS_PER_DEGREE * (np.cos(np.radians(latitude)) if col.endswith('longitude') else 1)
+            errors_m.append(np.abs(self.coordinates(col) - original) * scale)
+        errors_m = np.concatenate(errors_m)
+        report['coordinate_error_mean_m'] = float(errors_m.mean())
+        report['coordinate_error_max_m'] = float(errors_m.max())
+
+        exact = haversine_distance(*(df[col].to_numpy(dtype=np.float64)[order] for col in
+                                     ['pickup_latitude', 'pickup_longitude', 'dropoff_latitude', 'dropoff_longitude']))
+        distance_error_m = np.abs(self.trip_distance_km() - exact) * 1000
+        report['distance_error_mean_m'] = float(distance_error_m.mean())
+        report['distance_error_max_m'] = float(distance_error_m.max())
+
+        mismatches = 0
+        for endpoint in ('pickup', 'dropoff'):
+            exact_borough = classify_borough(df[f'{endpoint}_latitude'].to_numpy()[order],
+                                             df[f'{endpoint}_longitude'].to_numpy()[order])
+            mismatches += int((self.borough(endpoint) != exact_borough).sum())
+        report['borough_mismatches'] = mismatches
+
+        fares = df['fare_amount'].to_numpy(dtype=np.float64)[order]
+        report['fare_error_max'] = float(np.abs(self.arrays['fare_cents'] / 100 - fares).max(initial=0))
+
+        nanoseconds = epoch_nanoseconds(df['pickup_datetime'])[order]
+        report['time_error_max_s'] = float(np.abs(self.pickup_seconds() * 10**9 - nanoseconds).max(initial=0) / 1e9)
+        return report
+
+def main():
+    """Main function to build the compact store and report its size, speed and accuracy"""
+    parser = argparse.ArgumentParser(description='Quantized coordinates and delta-encoded pickup times')
+    parser.add_argument('--data', default='uber_cleaned.csv', help='Cleaned dataset')
+    parser.add_argument('--output-dir', default='compact_trips')
+    parser.add_argument('--bits', type=int, default=16, choices=[16, 32], help='Bits per quantized coordinate')
+    parser.add_argument('--block-rows', type=int, default=BLOCK_ROWS, help='Rows per delta-encoded time block')
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("UBER FARES DATASET - COMPACT TRIP STORE")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    df = pd.read_csv(args.data)
+    csv_s = time.perf_counter() - start
+    df['pickup_datetime'] = parse_pickup_datetime(df['pickup_datetime'])
+
+    start = time.perf_counter()
+    trips, order = CompactTrips.encode(df, args.bits, args.block_rows)
+    encode_s = time.perf_counter() - start
+    path = trips.save(args.output_dir)
+
+    resolution = trips.quantizer.resolution_m()
+    dtypes = {name: array.dtype.name for name, array in trips.arrays.items()}
+    print(f"\n✅ Encoded {trips.n_rows:,} trips in {encode_s:.2f}s:")
+    print(f"   • Coordinates: {dtypes['pickup_latitude']} steps of {resolution[0]:.2f} m (N-S) x "
+          f"{resolution[1]:.2f} m (E-W)")
+    print(f"   • Pickup times: int64 base per {args.block_rows:,} rows + {dtypes['time_deltas']} second deltas "
+          f"({len(trips.arrays['delta_overflow_rows']):,} longer gaps in the overflow table)")
+    print(f"   • Fares: {dtypes['fare_cents']} cents, passengers: {dtypes['passenger_count']}")
+    print(f"   💾 Saved to: {path}")
+
+    original_columns = ['fare_amount', 'pickup_datetime'] + COORDINATE_COLUMNS + ['passenger_count']
+    in_memory = df[original_columns].memory_usage(index=False).sum()
+    on_disk = sum(os.path.getsize(os.path.join(path, f'{name}.npy')) for name in CompactTrips.ARRAYS)
+    print(f"\n📊 Size per trip:")
+    print(f"   • In memory: {trips.nbytes() / trips.n_rows:.1f} B vs {in_memory / trips.n_rows:.1f} B as float64/datetime64 "
+          f"({in_memory / trips.nbytes():.1f}x smaller)")
+    print(f"   • On disk: {on_disk / trips.n_rows:.1f} B vs {os.path.getsize(args.data) / trips.n_rows:.1f} B of CSV "
+          f"({os.path.getsize(args.data) / on_disk:.1f}x smaller)")
+
+    loaded = CompactTrips.load(path)
+    timings = {}
+    start = time.perf_counter()
+    decoded = loaded.decode()
+    timings['decode all columns'] = time.perf_counter() - start
+    start = time.perf_counter()
+    loaded.pickup_seconds()
+    timings['decode pickup times'] = time.perf_counter() - start
+    start = time.perf_counter()
+    loaded.trip_distance_km()
+    timings['distance on steps'] = time.perf_counter() - start
+    start = time.perf_counter()
+    haversine_distance(decoded['pickup_latitude'].to_numpy(), decoded['pickup_longitude'].to_numpy(),
+                       decoded['dropoff_latitude'].to_numpy(), decoded['dropoff_longitude'].to_numpy())
+    timings['distance on float64'] = time.perf_counter() - start
+    start = time.perf_counter()
+    loaded.borough('pickup')
+    timings['borough on steps'] = time.perf_counter() - start
+    start = time.perf_counter()
+    classify_borough(decoded['pickup_latitude'].to_numpy(), decoded['pickup_longitude'].to_numpy())
+    timings['borough on float64'] = time.perf_counter() - start
+
+    print(f"\n⏱️ Timings ({trips.n_rows:,} trips; CSV parse {csv_s:.2f}s):")
+    for label, seconds in timings.items():
+        print(f"   • {label}: {seconds * 1000:.1f} ms")
+
+    report = loaded.accuracy(df, order)
+    print(f"\n📋 Accuracy loss:")
+    print(f"   • Coordinates: mean {report['coordinate_error_mean_m']:.3g} m, max {report['coordinate_error_max_m']:.3g} m")
+    print(f"   • Trip distance: mean {report['distance_error_mean_m']:.3g} m, max {report['distance_error_max_m']:.3g} m")
+    print(f"   • Borough labels changed: {report['borough_mismatches']:,} of {2 * trips.n_rows:,} endpoints")
+    print(f"   • Fares: max error ${report['fare_error_max']:.4f}")
+    print(f"   • Pickup times: max error {report['time_error_max_s']:.3f} s")
+
+    print(f"\n🎯 Compact trip store completed successfully!")
+
+if __name__ == "__main__":
+    main()
@@ -3,37 +3,38 @@
 Comprehensive Exploratory Data Analysis for Uber Fares Dataset
 """
 
+import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from plot_style import pyplot
+from instrumentation import instrumented
+from partitioned_store import add_date_range_arguments, date_range, read_dataset
+from dataframe_engine import get_engine
 import warnings
 warnings.filterwarnings('ignore')
 
-# Set style
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
-
+@instrumented()
 class UberEDA:
     """
     Comprehensive EDA class for Uber Fares dataset
     """
     
-    def __init__(self, data_path='uber_enhanced.csv'):
-        """Initialize the EDA analyzer"""
+    def __init__(self, data_path='uber_enhanced.csv', engine=None):
+        """Initialize the EDA analyzer (engine: 'pandas', 'duckdb' or None for UBER_ENGINE)"""
         self.data_path = data_path
+        self.engine = get_engine(engine)
         self.df = None
         
-    def load_data(self):
-        """Load the enhanced dataset"""
+    def load_data(self, df=None, start=None, end=None):
+        """Load the enhanced dataset (only pickups in [start, end) if given) or take an in-memory frame"""
         print("=" * 80)
         print("UBER FARES DATASET - COMPREHENSIVE EXPLORATORY DATA ANALYSIS")
         print("=" * 80)
         
-        self.df = pd.read_csv(self.data_path)
+        self.df = df if df is not None else read_dataset(self.data_path, start, end)
+        if self.df.empty:
+            print(f"\n❌ No pickups in [{start or 'the first trip'}, {end or 'the last trip'}) - nothing to analyze")
+            return False
         # Convert pickup_datetime back to datetime if needed
         if self.df['pickup_datetime'].dtype == 'object':
             self.df['pickup_datetime'] = pd.to_datetime(self.df['pickup_datetime'])
@@ -41,12 +42,15 @@ class UberEDA:
         print(f"\n📊 Enhanced dataset loaded:")
         print(f"   • Shape: {self.df.shape}")
         print(f"   • Features: {len(self.df.columns)}")
+        if start is not None or end is not None:
+            print(f"   • Pickups from {start or 'the first trip'} to {end or 'the last trip'} (end exclusive)")
         print(f"   • Memory usage: {self.df.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
         
         return True
     
     def fare_distribution_analysis(self):
         """Analyze fare amount distributions"""
+        plt = pyplot()
         print("\n" + "=" * 60)
         print("1. FARE DISTRIBUTION ANALYSIS")
         print("=" * 60)
@@ -70,7 +74,9 @@ class UberEDA:
         axes[0, 1].set_ylabel('Fare Amount ($)')
         
         # 3. Fare by time period
-        fare_by_period = self.df.groupby('time_period')['fare_amount'].mean().sort_values(ascending=False)
+        fare_by_period = self.engine.group_agg(self.df, 'time_period', {
+            'fare_amount': ('fare_amount', 'mean')
+        })['fare_amount'].sort_values(ascending=False)
         axes[0, 2].bar(fare_by_period.index, fare_by_period.values, color='lightcoral')
         axes[0, 2].set_title('Average Fare by Time Period')
         axes[0, 2].set_xlabel('Time Period')
@@ -78,7 +84,7 @@ class UberEDA:
         axes[0, 2].tick_params(axis='x', rotation=45)
         
         # 4. Fare by day of week
-        fare_by_day = self.df.groupby('day_of_week')['fare_amount'].mean()
+        fare_by_day = self.engine.group_agg(self.df, 'day_of_week', {'fare_amount': ('fare_amount', 'mean')})['fare_amount']
         day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
         fare_by_day = fare_by_day.reindex(day_order)
         axes[1, 0].bar(fare_by_day.index, fare_by_day.values, color='lightgreen')
@@ -88,14 +94,18 @@ class UberEDA:
         axes[1, 0].tick_params(axis='x', rotation=45)
         
         # 5. Fare by passenger count
-        fare_by_passengers = self.df.groupby('passenger_count')['fare_amount'].mean()
+        fare_by_passengers = self.engine.group_agg(self.df, 'passenger_count', {
+            'fare_amount': ('fare_amount', 'mean')
+        })['fare_amount']
         axes[1, 1].bar(fare_by_passengers.index, fare_by_passengers.values, color='gold')
         axes[1, 1].set_title('Average Fare by Passenger Count')
         axes[1, 1].set_xlabel('Passenger Count')
         axes[1, 1].set_ylabel('Average Fare ($)')
         
         # 6. Fare by distance category
-        fare_by_distance = self.df.groupby('distance_category')['fare_amount'].mean()
+        fare_by_distance = self.engine.group_agg(self.df, 'distance_category', {
+            'fare_amount': ('fare_amount', 'mean')
+        })['fare_amount']
         distance_order = ['Very Short', 'Short', 'Medium', 'Long', 'Very Long']
         fare_by_distance = fare_by_distance.reindex(distance_order)
         axes[1, 2].bar(fare_by_distance.index, fare_by_distance.values, color='plum')
@@ -123,6 +133,7 @@ class UberEDA:
     
     def temporal_analysis(self):
         """Analyze temporal patterns"""
+        plt = pyplot()
         print("\n" + "=" * 60)
         print("2. TEMPORAL PATTERN ANALYSIS")
         print("=" * 60)
@@ -132,7 +143,7 @@ class UberEDA:
         fig.suptitle('Temporal Pattern Analysis', fontsize=16, fontweight='bold')
         
         # 1. Rides by hour of day
-        rides_by_hour = self.df.groupby('pickup_hour').size()
+        rides_by_hour = self.engine.group_agg(self.df, 'pickup_hour', {'rides': ('pickup_hour', 'size')})['rides']
         axes[0, 0].plot(rides_by_hour.index, rides_by_hour.values, marker='o', linewidth=2, markersize=6)
         axes[0, 0].set_title('Number of Rides by Hour of Day')
         axes[0, 0].set_xlabel('Hour of Day')
@@ -140,7 +151,7 @@ class UberEDA:
         axes[0, 0].grid(True, alpha=0.3)
         
         # 2. Rides by day of week
-        rides_by_day = self.df.groupby('day_of_week').size()
+        rides_by_day = self.engine.group_agg(self.df, 'day_of_week', {'rides': ('day_of_week', 'size')})['rides']
         day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
         rides_by_day = rides_by_day.reindex(day_order)
         axes[0, 1].bar(rides_by_day.index, rides_by_day.values, color='skyblue')
@@ -150,9 +161,9 @@ class UberEDA:
         axes[0, 1].tick_params(axis='x', rotation=45)
         
         # 3. Peak vs Off-peak comparison
-        peak_comparison = self.df.groupby('is_peak_hour').agg({
-            'fare_amount': 'mean',
-            'trip_distance_km': 'mean'
+        peak_comparison = self.engine.group_agg(self.df, 'is_peak_hour', {
+            'fare_amount': ('fare_amount', 'mean'),
+            'trip_distance_km': ('trip_distance_km', 'mean')
         })
         peak_labels = ['Off-Peak', 'Peak']
         
@@ -171,9 +182,9 @@ class UberEDA:
         ax2.set_ylabel('Average Distance (km)', color='lightblue')
         
         # 4. Monthly trends
-        monthly_trends = self.df.groupby('pickup_month').agg({
-            'fare_amount': 'mean',
-            'trip_distance_km': 'mean'
+        monthly_trends = self.engine.group_agg(self.df, 'pickup_month', {
+            'fare_amount': ('fare_amount', 'mean'),
+            'trip_distance_km': ('trip_distance_km', 'mean')
         })
         
         axes[1, 1].plot(monthly_trends.index, monthly_trends['fare_amount'], marker='o', label='Avg Fare', color='red')
@@ -198,6 +209,7 @@ class UberEDA:
     
     def geographical_analysis(self):
         """Analyze geographical patterns"""
+        plt = pyplot()
         print("\n" + "=" * 60)
         print("3. GEOGRAPHICAL PATTERN ANALYSIS")
         print("=" * 60)
@@ -218,11 +230,11 @@ class UberEDA:
         plt.colorbar(scatter, ax=axes[0, 0], label='Fare Amount ($)')
         
         # 2. Borough analysis
-        borough_stats = self.df.groupby('pickup_borough').agg({
-            'fare_amount': 'mean',
-            'trip_distance_km': 'mean',
-            'pickup_borough': 'count'
-        }).rename(columns={'pickup_borough': 'ride_count'})
+        borough_stats = self.engine.group_agg(self.df, 'pickup_borough', {
+            'fare_amount': ('fare_amount', 'mean'),
+            'trip_distance_km': ('trip_distance_km', 'mean'),
+            'ride_count': ('pickup_borough', 'count')
+        })
         
         axes[0, 1].bar(borough_stats.index, borough_stats['ride_count'], color='lightblue')
         axes[0, 1].set_title('Rides by Pickup Borough')
@@ -231,9 +243,9 @@ class UberEDA:
         axes[0, 1].tick_params(axis='x', rotation=45)
         
         # 3. Inter-borough vs Intra-borough
-        inter_borough_stats = self.df.groupby('is_inter_borough').agg({
-            'fare_amount': 'mean',
-            'trip_distance_km': 'mean'
+        inter_borough_stats = self.engine.group_agg(self.df, 'is_inter_borough', {
+            'fare_amount': ('fare_amount', 'mean'),
+            'trip_distance_km': ('trip_distance_km', 'mean')
         })
         
         labels = ['Intra-borough', 'Inter-borough']
@@ -255,7 +267,10 @@ class UberEDA:
         
         # 4. Distance from center analysis
         distance_bins = pd.cut(self.df['pickup_distance_from_center'], bins=5)
-        distance_stats = self.df.groupby(distance_bins)['fare_amount'].mean()
+        binned = pd.DataFrame({'distance_bin': distance_bins.cat.codes, 'fare_amount': self.df['fare_amount']})
+        distance_stats = self.engine.group_agg(binned, 'distance_bin', {'fare_amount': ('fare_amount', 'mean')})
+        distance_stats = distance_stats['fare_amount'].reindex(range(len(distance_bins.cat.categories)))
+        distance_stats.index = distance_bins.cat.categories
         
         axes[1, 1].bar(range(len(distance_stats)), distance_stats.values, color='gold')
         axes[1, 1].set_title('Fare by Distance from City Center')
@@ -277,8 +292,15 @@ class UberEDA:
 
 def main():
     """Main function to run comprehensive EDA"""
-    eda = UberEDA('uber_enhanced.csv')
-    eda.load_data()
+    parser = argparse.ArgumentParser(description='Comprehensive EDA charts')
+    parser.add_argument('--data', default='uber_enhanced.csv', help='Enhanced dataset')
+    add_date_range_arguments(parser)
+    args = parser.parse_args()
+    start, end = date_range(args)
+
+    eda = UberEDA(args.data)
+    if not eda.load_data(start=start, end=end):
+        return
     eda.fare_distribution_analysis()
     eda.temporal_analysis()
     eda.geographical_analysis()
@@ -5,12 +5,78 @@ Comprehensive Data Cleaning and Preprocessing for Uber Fares Dataset
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
+from instrumentation import instrumented
+from partitioned_store import write_partitioned
 import warnings
 warnings.filterwarnings('ignore')
 
+# NYC approximate boundaries
+# Longitude: -74.3 to -73.7 (West to East)
+# Latitude: 40.4 to 41.0 (South to North)
+NYC_BOUNDS = {
+    'min_longitude': -74.3,
+    'max_longitude': -73.7,
+    'min_latitude': 40.4,
+    'max_latitude': 41.0
+}
+
+# Most NYC taxi fares should be under $100
+MAX_REASONABLE_FARE = 100
+
+# Realistic passenger counts (inclusive)
+PASSENGER_RANGE = (1, 6)
+
+# Index and key columns of the raw file, not needed for analysis
+UNNECESSARY_COLUMNS = ['Unnamed: 0', 'key']
+
+def fare_bounds(fares):
+    """(lower, upper) fare limits: IQR fences of the positive fares, upper capped at MAX_REASONABLE_FARE"""
+    fares = fares[fares > 0]
+    Q1 = fares.quantile(0.25)
+    Q3 = fares.quantile(0.75)
+    IQR = Q3 - Q1
+    return Q1 - 1.5 * IQR, min(Q3 + 1.5 * IQR, MAX_REASONABLE_FARE)
+
+def parse_pickup_datetime(values, errors='raise'):
+    """Parse raw 'YYYY-MM-DD HH:MM:SS UTC' timestamps on pandas' ISO fast path, inferring any other layout"""
+    text = values.astype(str)
+    if text.str.endswith(' UTC').all():
+        # strptime with the zone suffix is ~40x slower than ISO parsing and localizing
+        return pd.to_datetime(text.str.slice(0, -4), format='ISO8601', errors=errors).dt.tz_localize('UTC')
+    return pd.to_datetime(values, errors=errors)
+
+def in_nyc_bounds(df):
+    """Mask of rows whose pickup and dropoff coordinates are all inside NYC_BOUNDS"""
+    return (
+        (df['pickup_longitude'] >= NYC_BOUNDS['min_longitude']) &
+        (df['pickup_longitude'] <= NYC_BOUNDS['max_longitude']) &
+        (df['pickup_latitude'] >= NYC_BOUNDS['min_latitude']) &
+        (df['pickup_latitude'] <= NYC_BOUNDS['max_latitude']) &
+        (df['dropoff_longitude'] >= NYC_BOUNDS['min_longitude']) &
+        (df['dropoff_longitude'] <= NYC_BOUNDS['max_longitude']) &
+        (df['dropoff_latitude'] >= NYC_BOUNDS['min_latitude']) &
+        (df['dropoff_latitude'] <= NYC_BOUNDS['max_latitude'])
+    )
+
+def clean_trip_batch(df, bounds):
+    """
+    Apply every UberDataCleaner rule to a batch of raw trips, quietly and with fixed fare bounds
+
+    Fare bounds come from fare_bounds() over a reference history rather than
+    the batch itself, so small streamed batches are judged like the full file.
+    Unparseable timestamps are dropped as well.
+    """
+    lower, upper = bounds
+    df = df.dropna(subset=['dropoff_longitude', 'dropoff_latitude'])
+    df = df[(df['fare_amount'] > 0) & (df['fare_amount'] >= lower) & (df['fare_amount'] <= upper)]
+    df = df[in_nyc_bounds(df)]
+    df = df[(df['passenger_count'] >= PASSENGER_RANGE[0]) & (df['passenger_count'] <= PASSENGER_RANGE[1])]
+    df = df.assign(pickup_datetime=parse_pickup_datetime(df['pickup_datetime'], errors='coerce'))
+    df = df.dropna(subset=['pickup_datetime'])
+    return df.drop(columns=[col for col in UNNECESSARY_COLUMNS if col in df.columns])
+
+@instrumented('df_cleaned')
 class UberDataCleaner:
     """
     Comprehensive data cleaning class for Uber Fares dataset
@@ -22,15 +88,18 @@ class UberDataCleaner:
         self.df_original = None
         self.df_cleaned = None
         self.cleaning_report = {}
+        self.fare_bounds = None
         
-    def load_data(self):
-        """Load the original dataset"""
+    def load_data(self, df=None):
+        """Load the original dataset (or take an in-memory frame)"""
         print("=" * 80)
         print("UBER FARES DATASET - DATA CLEANING & PREPROCESSING")
         print("=" * 80)
         
-        self.df_original = pd.read_csv(self.data_path)
-        self.df_cleaned = self.df_original.copy()
+        self.df_original = df if df is not None else pd.read_csv(self.data_path)
+        # Shallow copy: every cleaning step reassigns df_cleaned or replaces
+        # whole columns, so the original buffers are never written through
+        self.df_cleaned = self.df_original.copy(deep=False)
         
         print(f"\n📊 Original dataset loaded:")
         print(f"   • Shape: {self.df_original.shape}")
@@ -79,16 +148,9 @@ class UberDataCleaner:
         self.df_cleaned = self.df_cleaned[self.df_cleaned['fare_amount'] > 0]
         negative_removed = initial_rows - len(self.df_cleaned)
         
-        # Remove extremely high fares (outliers) - using IQR method
-        Q1 = self.df_cleaned['fare_amount'].quantile(0.25)
-        Q3 = self.df_cleaned['fare_amount'].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        
-        # For fare amounts, we'll use a more reasonable upper bound
-        # Most NYC taxi fares should be under $100
-        reasonable_upper_bound = min(upper_bound, 100)
+        # Remove extremely high fares (outliers) - using IQR method, capped at a reasonable upper bound
+        lower_bound, reasonable_upper_bound = fare_bounds(self.df_cleaned['fare_amount'])
+        self.fare_bounds = (lower_bound, reasonable_upper_bound)
         
         initial_rows = len(self.df_cleaned)
         self.df_cleaned = self.df_cleaned[
@@ -116,16 +178,6 @@ class UberDataCleaner:
         print("3. CLEANING COORDINATES")
         print("=" * 60)
         
-        # NYC approximate boundaries
-        # Longitude: -74.3 to -73.7 (West to East)
-        # Latitude: 40.4 to 41.0 (South to North)
-        nyc_bounds = {
-            'min_longitude': -74.3,
-            'max_longitude': -73.7,
-            'min_latitude': 40.4,
-            'max_latitude': 41.0
-        }
-        
         print(f"\n📊 Coordinate ranges before cleaning:")
         print(f"   • Pickup Longitude: {self.df_cleaned['pickup_longitude'].min():.6f} to {self.df_cleaned['pickup_longitude'].max():.6f}")
         print(f"   • Pickup Latitude: {self.df_cleaned['pickup_latitude'].min():.6f} to {self.df_cleaned['pickup_latitude'].max():.6f}")
@@ -135,16 +187,7 @@ class UberDataCleaner:
         # Filter coordinates within NYC bounds
         initial_rows = len(self.df_cleaned)
         
-        self.df_cleaned = self.df_cleaned[
-            (self.df_cleaned['pickup_longitude'] >= nyc_bounds['min_longitude']) &
-            (self.df_cleaned['pickup_longitude'] <= nyc_bounds['max_longitude']) &
-            (self.df_cleaned['pickup_latitude'] >= nyc_bounds['min_latitude']) &
-            (self.df_cleaned['pickup_latitude'] <= nyc_bounds['max_latitude']) &
-            (self.df_cleaned['dropoff_longitude'] >= nyc_bounds['min_longitude']) &
-            (self.df_cleaned['dropoff_longitude'] <= nyc_bounds['max_longitude']) &
-            (self.df_cleaned['dropoff_latitude'] >= nyc_bounds['min_latitude']) &
-            (self.df_cleaned['dropoff_latitude'] <= nyc_bounds['max_latitude'])
-        ]
+        self.df_cleaned = self.df_cleaned[in_nyc_bounds(self.df_cleaned)]
         
         coordinate_outliers_removed = initial_rows - len(self.df_cleaned)
         
@@ -171,8 +214,8 @@ class UberDataCleaner:
         # Remove unrealistic passenger counts (0 or > 6)
         initial_rows = len(self.df_cleaned)
         self.df_cleaned = self.df_cleaned[
-            (self.df_cleaned['passenger_count'] >= 1) & 
-            (self.df_cleaned['passenger_count'] <= 6)
+            (self.df_cleaned['passenger_count'] >= PASSENGER_RANGE[0]) & 
+            (self.df_cleaned['passenger_count'] <= PASSENGER_RANGE[1])
         ]
         passenger_outliers_removed = initial_rows - len(self.df_cleaned)
         
@@ -194,7 +237,7 @@ class UberDataCleaner:
         print(self.df_cleaned['pickup_datetime'].head())
         
         # Convert to datetime
-        self.df_cleaned['pickup_datetime'] = pd.to_datetime(self.df_cleaned['pickup_datetime'])
+        self.df_cleaned['pickup_datetime'] = parse_pickup_datetime(self.df_cleaned['pickup_datetime'])
         
         print(f"\n✅ Converted pickup_datetime to datetime format")
         print(f"\n📊 Datetime range:")
@@ -209,8 +252,7 @@ class UberDataCleaner:
         print("=" * 60)
         
         # Remove the unnamed index column and key column
-        columns_to_remove = ['Unnamed: 0', 'key']
-        existing_columns = [col for col in columns_to_remove if col in self.df_cleaned.columns]
+        existing_columns = [col for col in UNNECESSARY_COLUMNS if col in self.df_cleaned.columns]
         
         if existing_columns:
             self.df_cleaned = self.df_cleaned.drop(columns=existing_columns)
@@ -243,15 +285,17 @@ class UberDataCleaner:
         print(f"   • Memory usage: {self.df_cleaned.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
         print(f"   • Data types: {dict(self.df_cleaned.dtypes.value_counts())}")
     
-    def save_cleaned_data(self, output_path='uber_cleaned.csv'):
-        """Save the cleaned dataset"""
+    def save_cleaned_data(self, output_path='uber_cleaned.csv', partitioned=False):
+        """Save the cleaned dataset (partitioned: also a year/month layout for date-range reads)"""
         self.df_cleaned.to_csv(output_path, index=False)
         print(f"\n💾 Cleaned dataset saved to: {output_path}")
+        if partitioned:
+            print(f"💾 Year/month partitions saved to: {write_partitioned(self.df_cleaned, output_path)}/")
         return output_path
     
-    def run_full_cleaning(self):
+    def run_full_cleaning(self, df=None):
         """Run the complete data cleaning pipeline"""
-        self.load_data()
+        self.load_data(df)
         self.handle_missing_values()
         self.clean_fare_amounts()
         self.clean_coordinates()
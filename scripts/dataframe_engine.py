@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Pluggable DataFrame Engine: Group-Bys, Filters, Value Counts and Pivots on pandas or DuckDB
+"""
+
+import argparse
+import operator
+import os
+import time
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+try:
+    import duckdb
+except ImportError:  # Only the pandas engine is available
+    duckdb = None
+
+# Float aggregates are rounded so results do not depend on each engine's summation order
+FLOAT_DECIMALS = 10
+
+AGG_FUNCTIONS = ['size', 'count', 'sum', 'mean', 'std', 'min', 'max']
+
+FILTER_OPERATORS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+                    '>': operator.gt, '>=': operator.ge}
+
+class DataFrameEngine:
+    """
+    Analysis operations expressed once, run on a pandas DataFrame by a backend
+
+    group_agg(df, by, aggs) takes aggs as {output column: (input column, function)}
+    and returns one row per observed key, sorted by key, with the keys as index.
+    filter(df, where, columns) takes where as {column: value} or
+    {column: (operator, value)} and keeps row order.
+    """
+
+    name = None
+
+    def group_agg(self, df, by, aggs):
+        """Aggregates per group of the by column(s)"""
+        raise NotImplementedError
+
+    def filter(self, df, where, columns=None):
+        """Rows matching every condition in where"""
+        raise NotImplementedError
+
+    def value_counts(self, df, column):
+        """Rows per value, most frequent first (ties in key order)"""
+        counts = self.group_agg(df, column, {'count': (column, 'size')})['count']
+        order = np.lexsort((np.arange(len(counts)), -counts.to_numpy()))
+        return counts.iloc[order].rename(column)
+
+    def pivot_matrix(self, df, rows, cols, value, func, row_labels, col_labels):
+        """len(row_labels) x len(col_labels) matrix of func(value) per (rows, cols) cell, NaN where empty"""
+        cells = self.group_agg(df, [rows, cols], {value: (value, func)})[value]
+        matrix = cells.unstack().reindex(index=row_labels, columns=col_labels)
+        return matrix.to_numpy(dtype=float)
+
+    @staticmethod
+    def _finish(result, df, by, aggs):
+        """Common result layout: key dtypes of the input, rounded floats, aggs order"""
+        for col in by:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                result[col] = pd.Categorical(result[col].astype(object), dtype=df[col].dtype)
+        result = result.set_index(by if len(by) > 1 else by[0])[list(aggs)]
+        for col in result.columns:
+            if aggs[col][1] in ('size', 'count'):
+                result[col] = result[col].astype(np.int64)
+            elif result[col].dtype.kind == 'f':
+                result[col] = result[col].round(FLOAT_DECIMALS)
+        return result
+
+class PandasEngine(DataFrameEngine):
+    """Reference backend: pandas group-bys and boolean masks"""
+
+    name = 'pandas'
+
+    def group_agg(self, df, by, aggs):
+        """Aggregates per group of the by column(s)"""
+        by = [by] if isinstance(by, str) else list(by)
+        grouped = df.groupby(by, sort=True, observed=True)
+        result = pd.DataFrame({
+            out: grouped.size() if func == 'size' else grouped[col].agg(func)
+            for out, (col, func) in aggs.items()
+        })
+        return self._finish(result.reset_index(), df, by, aggs)
+
+    def filter(self, df, where, columns=None):
+        """Rows matching every condition in where"""
+        mask = np.ones(len(df), dtype=bool)
+        for col, condition in where.items():
+            op, value = condition if isinstance(condition, tuple) else ('==', condition)
+            mask &= FILTER_OPERATORS[op](df[col], value).to_numpy()
+        selected = df.loc[mask] if columns is None else df.loc[mask, list(columns)]
+        return selected.reset_index(drop=True)
+
+class DuckDBEngine(DataFrameEngine):
+    """
+    Multi-threaded columnar backend: DuckDB scans the pandas columns in place
+
+    The DataFrame is registered as a view (no copy) and every operation runs
+    as one SQL statement on all of DuckDB's worker threads.
+    """
+
+    name = 'duckdb'
+
+    SQL_FUNCTIONS = {'size': 'count(*)', 'count': 'count({col})', 'sum': 'sum({col})', 'mean': 'avg({col})',
+                     'std': 'stddev_samp({col})', 'min': 'min({col})', 'max': 'max({col})'}
+
+    def __init__(self, threads=None):
+        """Open an in-process database"""
+        if duckdb is None:
+            raise ImportError("duckdb is not installed; use the pandas engine")
+        self.connection = duckdb.connect()
+        if threads:
+            self.connection.execute(f"SET threads TO {int(threads)}")
+
+    @staticmethod
+    def _quote(name):
+        """SQL identifier"""
+        return '"' + str(name).replace('"', '""') + '"'
+
+    def _query(self, df, sql, params=None):
+        """Run sql against df registered as the view t"""
+        self.connection.register('t', df)
+        try:
+            return self.connection.execute(sql, params or []).df()
+        finally:
+            self.connection.unregister('t')
+
+    def group_agg(self, df, by, aggs):
+        """Aggregates per group of the by column(s)"""
+        by = [by] if isinstance(by, str) else list(by)
+        # Categorical columns are scanned as ENUMs, which sort in category order like pandas
+        keys = ', '.join(self._quote(col) for col in by)
+        selects = ', '.join(f"{self.SQL_FUNCTIONS[func].format(col=self._quote(col))} AS {self._quote(out)}"
+                            for out, (col, func) in aggs.items())
+        result = self._query(df, f"SELECT {keys}, {selects} FROM t GROUP BY {keys} ORDER BY {keys}")
+        return self._finish(result, df, by, aggs)
+
+    def filter(self, df, where, columns=None):
+        """Rows matching every condition in where"""
+        conditions, params = [], []
+        for col, condition in where.items():
+            op, value = condition if isinstance(condition, tuple) else ('==', condition)
+            if op not in FILTER_OPERATORS:
+                raise ValueError(f"Unknown operator {op}; use one of {list(FILTER_OPERATORS)}")
+            sql_op = '=' if op == '==' else ('<>' if op == '!=' else op)
+            conditions.append(f"{self._quote(col)} {sql_op} ?")
+            params.append(value.item() if isinstance(value, np.generic) else value)
+        selected = ', '.join(self._quote(col) for col in (columns or df.columns))
+        result = self._query(df, f"SELECT {selected} FROM t WHERE {' AND '.join(conditions) or 'TRUE'}", params)
+        for col in result.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                result[col] = pd.Categorical(result[col].astype(object), dtype=df[col].dtype)
+        return result
+
+ENGINES = {'pandas': PandasEngine, 'duckdb': DuckDBEngine}
+
+def get_engine(engine=None):
+    """Engine instance by name (or passed through); the default comes from UBER_ENGINE, else pandas"""
+    if isinstance(engine, DataFrameEngine):
+        return engine
+    name = engine or os.environ.get('UBER_ENGINE', 'pandas')
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine {name}; choose from {list(ENGINES)}")
+    if name == 'duckdb' and duckdb is None:
+        print(f"⚠️  duckdb not installed - using the pandas engine")
+        return PandasEngine()
+    return ENGINES[name]()
+
+# Operations run by the analysis stages, used for the side-by-side benchmark
+BENCHMARK_OPERATIONS = {
+    'group_agg fare by day_of_week': lambda e, df: e.group_agg(df, 'day_of_week', {'fare': ('fare_amount', 'mean')}),
+    'group_agg hourly mean/std/count': lambda e, df: e.group_agg(df, 'pickup_hour', {
+        'mean': ('fare_amount', 'mean'), 'std': ('fare_amount', 'std'), 'count': ('fare_amount', 'count')}),
+    'group_agg borough fare/distance/rides': lambda e, df: e.group_agg(df, 'pickup_borough', {
+        'fare_amount': ('fare_amount', 'mean'), 'trip_distance_km': ('trip_distance_km', 'mean'),
+        'ride_count': ('pickup_borough', 'count')}),
+    'group_agg day x hour x borough sums': lambda e, df: e.group_agg(
+        df, ['pickup_year', 'pickup_month', 'pickup_day', 'pickup_hour', 'pickup_borough'],
+        {'rides': ('fare_amount', 'size'), 'fare': ('fare_amount', 'sum')}),
+    'filter weekend fares': lambda e, df: e.filter(df, {'is_weekend': 1}, ['fare_amount']),
+    'filter Manhattan fares > $20': lambda e, df: e.filter(
+        df, {'pickup_borough': 'Manhattan', 'fare_amount': ('>', 20)}, ['fare_amount', 'trip_distance_km']),
+    'value_counts time_period': lambda e, df: e.value_counts(df, 'time_period'),
+    'pivot hour x weekday mean fare': lambda e, df: e.pivot_matrix(
+        df, 'pickup_hour', 'pickup_weekday', 'fare_amount', 'mean', range(24), range(7)),
+}
+
+def _same(left, right):
+    """Results identical in values, labels and dtypes"""
+    if isinstance(left, np.ndarray):
+        return np.array_equal(left, right, equal_nan=True)
+    try:
+        (pd.testing.assert_frame_equal if isinstance(left, pd.DataFrame) else pd.testing.assert_series_equal)(
+            left, right, check_exact=True)
+        return True
+    except AssertionError:
+        return False
+
+def benchmark_engines(df, engines=('pandas', 'duckdb'), repeat=3):
+    """Time every benchmark operation on each engine and check the results are identical"""
+    print("=" * 80)
+    print("DATAFRAME ENGINE BENCHMARK")
+    print("=" * 80)
+
+    instances = [get_engine(name) for name in engines]
+    instances = [engine for i, engine in enumerate(instances) if engine.name not in [e.name for e in instances[:i]]]
+    print(f"\n📊 {len(df):,} rows, engines: {', '.join(engine.name for engine in instances)}")
+
+    results = []
+    for label, operation in BENCHMARK_OPERATIONS.items():
+        timings, outputs = {}, {}
+        for engine in instances:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                outputs[engine.name] = operation(engine, df)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings[engine.name] = best
+        reference = outputs[instances[0].name]
+        identical = all(_same(reference, output) for output in outputs.values())
+        results.append({'operation': label, 'identical': identical, **{f'{k}_s': v for k, v in timings.items()}})
+
+        cells = '  '.join(f"{name} {seconds * 1000:8.1f} ms" for name, seconds in timings.items())
+        print(f"   {'✅' if identical else '❌'} {label:40s} {cells}")
+
+    mismatches = sum(not result['identical'] for result in results)
+    print(f"\n📋 {len(results) - mismatches}/{len(results)} operations identical across engines")
+    return pd.DataFrame(results)
+
+def main():
+    """Main function to benchmark the engines side by side"""
+    parser = argparse.ArgumentParser(description='Compare the pandas and DuckDB engines on the analysis operations')
+    parser.add_argument('--data', default='uber_enhanced.csv', help='Enhanced dataset')
+    parser.add_argument('--replicate', type=int, default=1, help='Stack the dataset this many times')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per operation (best is reported)')
+    parser.add_argument('--output', default=None, help='Optional CSV of the timings')
+    args = parser.parse_args()
+
+    from column_cache import read_csv_cached
+    df = read_csv_cached(args.data)
+    if args.replicate > 1:
+        df = pd.concat([df] * args.replicate, ignore_index=True)
+
+    results = benchmark_engines(df, repeat=args.repeat)
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\n💾 Benchmark results saved to: {args.output}")
+    print(f"\n🎯 Engine benchmark completed!")
+    if not results['identical'].all():
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
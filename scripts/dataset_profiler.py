@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Single-Pass Mergeable Dataset Profiler for Uber Fares Dataset
+"""
+
+import argparse
+import json
+import time
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+class MomentAccumulator:
+    """
+    Mergeable count, mean, central moments (up to 4th), min and max
+    """
+
+    def __init__(self):
+        """Initialize an empty accumulator"""
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @classmethod
+    def from_values(cls, values):
+        """Accumulator for one array of non-null values"""
+        acc = cls()
+        if len(values) == 0:
+            return acc
+        values = values.astype(float)
+        acc.n = len(values)
+        acc.mean = values.mean()
+        centered = values - acc.mean
+        sq = centered * centered
+        acc.m2 = sq.sum()
+        acc.m3 = (sq * centered).sum()
+        acc.m4 = (sq * sq).sum()
+        acc.min = values.min()
+        acc.max = values.max()
+        return acc
+
+    def merge(self, other):
+        """Combine with another accumulator (Pebay's pairwise update formulas)"""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        delta_n = delta / n
+
+        m4 = (self.m4 + other.m4 + delta * delta_n**3 * na * nb * (na * na - na * nb + nb * nb)
+              + 6 * delta_n**2 * (na * na * other.m2 + nb * nb * self.m2)
+              + 4 * delta_n * (na * other.m3 - nb * self.m3))
+        m3 = (self.m3 + other.m3 + delta * delta_n**2 * na * nb * (na - nb)
+              + 3 * delta_n * (na * other.m2 - nb * self.m2))
+        m2 = self.m2 + other.m2 + delta * delta_n * na * nb
+
+        self.n = n
+        self.mean += delta_n * nb
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def variance(self):
+        """Sample variance (ddof=1), as pandas Series.var"""
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    def skewness(self):
+        """Bias-corrected sample skewness, as pandas Series.skew"""
+        n = self.n
+        if n < 3 or self.m2 == 0:
+            return np.nan
+        g1 = np.sqrt(n) * self.m3 / self.m2**1.5
+        return np.sqrt(n * (n - 1)) / (n - 2) * g1
+
+    def kurtosis(self):
+        """Bias-corrected excess kurtosis, as pandas Series.kurtosis"""
+        n = self.n
+        if n < 4 or self.m2 == 0:
+            return np.nan
+        g2 = n * self.m4 / self.m2**2 - 3
+        return (n - 1) / ((n - 2) * (n - 3)) * ((n + 1) * g2 + 6)
+
+def _bit_length(x):
+    """Exact bit length of each element of a uint64 array"""
+    x = x.copy()
+    length = np.zeros(len(x), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = x >= (np.uint64(1) << np.uint64(shift))
+        length[mask] += shift
+        x[mask] >>= np.uint64(shift)
+    return length + (x > 0)
+
+class HyperLogLog:
+    """
+    Mergeable approximate distinct counter over 64-bit value hashes
+    """
+
+    def __init__(self, precision=14):
+        """Initialize 2**precision registers"""
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        """Add an array of values"""
+        if len(values) == 0:
+            return self
+        hashes = pd.util.hash_array(np.asarray(values))
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        remainder = hashes << p
+        # Position of the leftmost 1-bit in the remaining 64 - p bits
+        rank = np.minimum(64 - _bit_length(remainder) + 1, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        """Union with another sketch of the same precision"""
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        """Estimated number of distinct values"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if raw <= 2.5 * m and zeros > 0:
+            return m * np.log(m / zeros)
+        return raw
+
+class HeavyHitters:
+    """
+    Mergeable Misra-Gries summary of the most frequent values
+    """
+
+    def __init__(self, capacity=64):
+        """Keep at most `capacity` counters"""
+        self.capacity = capacity
+        self.counters = pd.Series(dtype='int64')
+
+    def update(self, values):
+        """Add an array of values"""
+        return self.merge_counts(pd.Series(values).value_counts())
+
+    def merge(self, other):
+        """Combine with another summary"""
+        return self.merge_counts(other.counters)
+
+    def merge_counts(self, counts):
+        """Add exact counts and shrink back to capacity"""
+        combined = self.counters.add(counts, fill_value=0).sort_values(ascending=False)
+        if len(combined) > self.capacity:
+            # Subtract the (k+1)-th count so every retained estimate stays a lower bound
+            combined = combined.iloc[:self.capacity] - combined.iloc[self.capacity]
+            combined = combined[combined > 0]
+        self.counters = combined.astype('int64')
+        return self
+
+    def top(self, k=5):
+        """Most frequent values with their (lower-bound) counts"""
+        return self.counters.head(k)
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch (merging t-digest with the arcsine scale function)
+    """
+
+    def __init__(self, compression=200):
+        """Initialize an empty sketch"""
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+
+    def update(self, values):
+        """Add an array of values"""
+        if len(values) == 0:
+            return self
+        return self._compress(np.concatenate([self.means, values.astype(float)]),
+                              np.concatenate([self.weights, np.ones(len(values))]))
+
+    def merge(self, other):
+        """Combine with another sketch"""
+        return self._compress(np.concatenate([self.means, other.means]),
+                              np.concatenate([self.weights, other.weights]))
+
+    def _compress(self, means, weights):
+        """Sort centroids and fold neighbours together under the scale function"""
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q_mid = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q_mid - 1)
+        group = np.floor(k - k.min()).astype(np.int64)
+        group_weights = np.bincount(group, weights=weights)
+        keep = group_weights > 0
+        self.weights = group_weights[keep]
+        self.means = np.bincount(group, weights=means * weights)[keep] / self.weights
+        return self
+
+    def quantile(self, q):
+        """Approximate q-quantile"""
+        if len(self.weights) == 0:
+            return np.nan
+        cumulative = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        return float(np.interp(q, cumulative, self.means))
+
+    def cdf(self, x):
+        """Approximate fraction of values <= x"""
+        if len(self.weights) == 0:
+            return np.nan
+        cumulative = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        return float(np.interp(x, self.means, cumulative, left=0.0, right=1.0))
+
+class ColumnProfile:
+    """
+    All per-column sketches, updated and merged together
+    """
+
+    def __init__(self, name, numeric, hll_precision=14, top_k=64, compression=200):
+        """Initialize the column's accumulators"""
+        self.name = name
+        self.numeric = numeric
+        self.rows = 0
+        self.nulls = 0
+        self.distinct = HyperLogLog(hll_precision)
+        self.heavy_hitters = HeavyHitters(top_k)
+        self.moments = MomentAccumulator() if numeric else None
+        self.quantiles = QuantileSketch(compression) if numeric else None
+
+    def update(self, series):
+        """Fold one chunk of the column in"""
+        self.rows += len(series)
+        values = series.dropna().to_numpy()
+        self.nulls += len(series) - len(values)
+        self.distinct.update(values)
+        self.heavy_hitters.update(values)
+        if self.numeric:
+            self.moments.merge(MomentAccumulator.from_values(values))
+            self.quantiles.update(values)
+
+    def merge(self, other):
+        """Combine with a profile of the same column from another chunk range"""
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.distinct.merge(other.distinct)
+        self.heavy_hitters.merge(other.heavy_hitters)
+        if self.numeric:
+            self.moments.merge(other.moments)
+            self.quantiles.merge(other.quantiles)
+        return self
+
+    def report(self):
+        """Structured summary of the column"""
+        top = self.heavy_hitters.top(5)
+        mode = top.index[0] if len(top) else None
+        if isinstance(mode, np.generic):
+            mode = mode.item()
+        report = {
+            'dtype': 'numeric' if self.numeric else 'categorical',
+            'count': int(self.rows - self.nulls),
+            'missing': int(self.nulls),
+            'missing_percentage': self.nulls / self.rows * 100 if self.rows else 0.0,
+            'approx_distinct': int(round(self.distinct.estimate())),
+            'mode': mode,
+            'top_values': {str(k): int(v) for k, v in top.items()},
+        }
+        if self.numeric:
+            acc = self.moments
+            q1, median, q3 = (self.quantiles.quantile(q) for q in (0.25, 0.5, 0.75))
+            iqr = q3 - q1
+            lower_bound, upper_bound = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+            outlier_fraction = self.quantiles.cdf(lower_bound) + 1 - self.quantiles.cdf(upper_bound)
+            report.update({
+                'mean': acc.mean,
+                'std': np.sqrt(acc.variance()),
+                'min': acc.min,
+                '25%': q1,
+                '50%': median,
+                '75%': q3,
+                'max': acc.max,
+                'variance': acc.variance(),
+                'skewness': acc.skewness(),
+                'kurtosis': acc.kurtosis(),
+                'iqr_lower_bound': lower_bound,
+                'iqr_upper_bound': upper_bound,
+                'approx_outliers': int(round(outlier_fraction * acc.n)),
+                'approx_outlier_percentage': outlier_fraction * 100,
+            })
+        return report
+
+class DatasetProfiler:
+    """
+    Profile every column of a dataset in one chunked read
+    """
+
+    def __init__(self, data_path='uber.csv', chunk_size=500000, hll_precision=14, top_k=64, compression=200):
+        """Initialize the profiler"""
+        self.data_path = data_path
+        self.chunk_size = chunk_size
+        self.hll_precision = hll_precision
+        self.top_k = top_k
+        self.compression = compression
+        self.columns = {}
+        self.rows = 0
+
+    def update(self, chunk):
+        """Fold one DataFrame chunk into every column profile"""
+        for col in chunk.columns:
+            if col not in self.columns:
+                numeric = pd.api.types.is_numeric_dtype(chunk[col])
+                self.columns[col] = ColumnProfile(col, numeric, self.hll_precision, self.top_k, self.compression)
+            self.columns[col].update(chunk[col])
+        self.rows += len(chunk)
+        return self
+
+    def merge(self, other):
+        """Combine with a profiler that saw a different part of the data"""
+        for col, profile in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(profile)
+            else:
+                self.columns[col] = profile
+        self.rows += other.rows
+        return self
+
+    def profile(self):
+        """Read the file once, chunk by chunk, and profile it"""
+        print("=" * 80)
+        print("UBER FARES DATASET - SINGLE-PASS PROFILE")
+        print("=" * 80)
+
+        start = time.perf_counter()
+        for chunk in pd.read_csv(self.data_path, chunksize=self.chunk_size):
+            self.update(chunk)
+        elapsed = time.perf_counter() - start
+
+        print(f"\n✅ Profiled {self.rows:,} rows x {len(self.columns)} columns in {elapsed:.2f}s")
+        return self.report()
+
+    def report(self):
+        """Structured profile report"""
+        return {
+            'rows': self.rows,
+            'columns': {col: profile.report() for col, profile in self.columns.items()},
+        }
+
+    def print_report(self, report):
+        """Print the profile in the same layout as the initial data analysis"""
+        print(f"\n📋 Column Profiles:")
+        for col, stats in report['columns'].items():
+            print(f"\n   📊 {col} ({stats['dtype']}):")
+            print(f"      • Missing: {stats['missing']:,} ({stats['missing_percentage']:.4f}%)")
+            print(f"      • Approx. unique values: {stats['approx_distinct']:,}")
+            print(f"      • Most frequent: '{stats['mode'] if stats['mode'] is not None else 'N/A'}'")
+            if stats['dtype'] == 'numeric':
+                print(f"      • Mean: {stats['mean']:.4f}, Std: {stats['std']:.4f}")
+                print(f"      • Min / 25% / 50% / 75% / Max: {stats['min']:.4f} / {stats['25%']:.4f} / "
+                      f"{stats['50%']:.4f} / {stats['75%']:.4f} / {stats['max']:.4f}")
+                print(f"      • Skewness: {stats['skewness']:.4f}, Kurtosis: {stats['kurtosis']:.4f}, "
+                      f"Variance: {stats['variance']:.4f}")
+                print(f"      • Approx. outliers: {stats['approx_outliers']:,} ({stats['approx_outlier_percentage']:.2f}%)")
+
+    def save_report(self, report, output_path='uber_profile.json'):
+        """Save the profile as JSON"""
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2, default=float)
+        print(f"\n💾 Profile saved to: {output_path}")
+        return output_path
+
+def main():
+    """Main function to profile a dataset"""
+    parser = argparse.ArgumentParser(description='Single-pass dataset profiler')
+    parser.add_argument('--data', default='uber.csv')
+    parser.add_argument('--chunk-size', type=int, default=500000)
+    parser.add_argument('--output', default='uber_profile.json')
+    args = parser.parse_args()
+
+    profiler = DatasetProfiler(args.data, args.chunk_size)
+    report = profiler.profile()
+    profiler.print_report(report)
+    profiler.save_report(report, args.output)
+
+    print(f"\n🎯 Dataset profiling completed successfully!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Incremental Per-Zone Hourly Demand Forecasting for Uber Fares Dataset
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+from feature_engineering import BOROUGH_BOUNDS, classify_borough, grid_shape, grid_zone
+import warnings
+warnings.filterwarnings('ignore')
+
+HOURS_PER_WEEK = 168
+
+def epoch_hours(pickup_datetime):
+    """Whole hours since 1970-01-01 for a datetime Series"""
+    values = pickup_datetime.dt.tz_localize(None) if pickup_datetime.dt.tz is not None else pickup_datetime
+    return values.to_numpy(dtype='datetime64[h]').astype(np.int64)
+
+def hour_of_week_from_epoch(hours):
+    """Monday-based hour of week for epoch hours (1970-01-01 was a Thursday)"""
+    return (np.asarray(hours) + 72) % HOURS_PER_WEEK
+
+class SeasonalDemandModel:
+    """
+    Additive exponential smoothing with a weekly season, fitted for all zones at once
+
+    State is one level per zone and one 168-value weekly profile per zone.
+    Every update step is a vectorized operation over zones, so a single pass
+    over the hours fits every zone, and new hours can be folded in without
+    refitting.
+    """
+
+    def __init__(self, alpha=0.05, gamma=0.1):
+        """Initialize the smoothing parameters"""
+        self.alpha = alpha
+        self.gamma = gamma
+        self.level = None
+        self.season = None
+        self.next_hour = None
+
+    def initialize(self, counts, start_hour):
+        """Seed level and weekly profile from the first weeks of a (zone, hour) tensor"""
+        n_init = min(counts.shape[1], 4 * HOURS_PER_WEEK)
+        init = counts[:, :n_init].astype(float)
+        how = hour_of_week_from_epoch(start_hour + np.arange(n_init))
+
+        self.level = init.mean(axis=1)
+        sums = np.zeros((counts.shape[0], HOURS_PER_WEEK))
+        seen = np.bincount(how, minlength=HOURS_PER_WEEK)
+        np.add.at(sums.T, how, init.T)
+        profile = np.divide(sums, seen, out=np.zeros_like(sums), where=seen > 0)
+        self.season = profile - self.level[:, None]
+        self.next_hour = start_hour
+        return self
+
+    def update(self, counts):
+        """Fold the next hours of a (zone, hour) count tensor into the state"""
+        alpha, gamma = self.alpha, self.gamma
+        how = hour_of_week_from_epoch(self.next_hour + np.arange(counts.shape[1]))
+        level, season = self.level, self.season
+        for t in range(counts.shape[1]):
+            y = counts[:, t]
+            h = how[t]
+            s = season[:, h]
+            new_level = alpha * (y - s) + (1 - alpha) * level
+            season[:, h] = gamma * (y - new_level) + (1 - gamma) * s
+            level = new_level
+        self.level = level
+        self.next_hour += counts.shape[1]
+        return self
+
+    def fit(self, counts, start_hour):
+        """Initialize and run the smoother over the whole tensor"""
+        return self.initialize(counts, start_hour).update(counts)
+
+    def forecast(self, horizon=24):
+        """Forecast the next `horizon` hours for every zone"""
+        how = hour_of_week_from_epoch(self.next_hour + np.arange(horizon))
+        return np.maximum(self.level[:, None] + self.season[:, how], 0.0)
+
+    def copy(self):
+        """Independent copy of the model state"""
+        model = SeasonalDemandModel(self.alpha, self.gamma)
+        model.level = self.level.copy()
+        model.season = self.season.copy()
+        model.next_hour = self.next_hour
+        return model
+
+def _backtest_origin(args):
+    """Fit up to one origin and score the next horizon hours (worker entry point)"""
+    counts, start_hour, origin, horizon, alpha, gamma = args
+    model = SeasonalDemandModel(alpha, gamma).fit(counts[:, :origin], start_hour)
+    actual = counts[:, origin:origin + horizon]
+    predicted = model.forecast(horizon)[:, :actual.shape[1]]
+    # Seasonal naive baseline: same hours one week earlier
+    naive = counts[:, origin - HOURS_PER_WEEK:origin - HOURS_PER_WEEK + actual.shape[1]]
+    return origin, np.abs(predicted - actual).mean(), np.abs(naive - actual).mean()
+
+class UberDemandForecaster:
+    """
+    Bin trips into a (zone, hour) count tensor, fit per-zone models and forecast
+    """
+
+    def __init__(self, data_path='uber_cleaned.csv', zone_type='borough', cell_size=0.02, alpha=0.05, gamma=0.1):
+        """Initialize the forecaster"""
+        self.data_path = data_path
+        self.zone_type = zone_type
+        self.cell_size = cell_size
+        self.model = SeasonalDemandModel(alpha, gamma)
+        self.df = None
+        self.zone_labels = None
+        self.counts = None
+        self.start_hour = None
+        self.pending_trips = None
+
+    def load_data(self):
+        """Load pickup times and coordinates from the cleaned dataset"""
+        print("=" * 80)
+        print("UBER FARES DATASET - HOURLY DEMAND FORECASTING")
+        print("=" * 80)
+
+        self.df = pd.read_csv(self.data_path, usecols=['pickup_datetime', 'pickup_latitude', 'pickup_longitude'])
+        self.df['pickup_datetime'] = pd.to_datetime(self.df['pickup_datetime'])
+
+        print(f"\n📊 Trips loaded:")
+        print(f"   • Rows: {len(self.df):,}")
+        print(f"   • Date range: {self.df['pickup_datetime'].min()} to {self.df['pickup_datetime'].max()}")
+
+        return True
+
+    def zone_ids(self, df):
+        """Integer zone id per trip"""
+        lat = df['pickup_latitude'].to_numpy()
+        lon = df['pickup_longitude'].to_numpy()
+        if self.zone_type == 'borough':
+            labels = [name for name, _ in BOROUGH_BOUNDS] + ['Other']
+            codes = pd.Categorical(classify_borough(lat, lon), categories=labels).codes
+            return codes.astype(np.int64), labels
+        zones = grid_zone(lat, lon, self.cell_size)
+        n_rows, n_cols = grid_shape(self.cell_size)
+        n_zones = n_rows * n_cols
+        return zones, [f'cell_{z}' for z in range(n_zones)]
+
+    def bin_trips(self, df, start_hour, n_hours):
+        """Count trips per (zone, hour) in one vectorized bincount"""
+        zones, labels = self.zone_ids(df)
+        hours = epoch_hours(df['pickup_datetime']) - start_hour
+        in_range = (hours >= 0) & (hours < n_hours)
+        flat = zones[in_range] * n_hours + hours[in_range]
+        counts = np.bincount(flat, minlength=len(labels) * n_hours)
+        return counts.reshape(len(labels), n_hours).astype(np.int32), labels
+
+    def build_count_tensor(self):
+        """Build the (zone, hour) count tensor for the whole history"""
+        print("\n" + "=" * 60)
+        print("1. BUILDING ZONE x HOUR COUNT TENSOR")
+        print("=" * 60)
+
+        start = time.perf_counter()
+        hours = epoch_hours(self.df['pickup_datetime'])
+        self.start_hour = int(hours.min())
+        n_hours = int(hours.max()) - self.start_hour + 1
+        self.counts, self.zone_labels = self.bin_trips(self.df, self.start_hour, n_hours)
+
+        # Drop zones that never see a pickup
+        active = self.counts.sum(axis=1) > 0
+        self.counts = self.counts[active]
+        self.zone_labels = [label for label, keep in zip(self.zone_labels, active) if keep]
+
+        print(f"\n✅ Count tensor built in {time.perf_counter() - start:.3f}s")
+        print(f"   • Zones: {len(self.zone_labels)} ({self.zone_type})")
+        print(f"   • Hours: {n_hours:,}")
+        print(f"   • Tensor size: {self.counts.nbytes / 1024**2:.2f} MB")
+
+    def fit_models(self):
+        """Fit the seasonal model for all zones in one pass"""
+        print("\n" + "=" * 60)
+        print("2. FITTING SEASONAL MODELS")
+        print("=" * 60)
+
+        start = time.perf_counter()
+        self.model.fit(self.counts, self.start_hour)
+        print(f"\n✅ Fitted {len(self.zone_labels)} zone models over {self.counts.shape[1]:,} hours "
+              f"in {time.perf_counter() - start:.2f}s")
+
+    def update_with_trips(self, df_new, final=False):
+        """
+        Incrementally fold complete new hours of trips into the fitted state
+
+        The hour of the newest pickup may still be receiving trips, so its
+        trips are held back and folded in by a later call (or by final=True
+        once no more trips for it will arrive).
+        """
+        df_new = df_new.copy()
+        df_new['pickup_datetime'] = pd.to_datetime(df_new['pickup_datetime'])
+        if self.pending_trips is not None:
+            df_new = pd.concat([self.pending_trips, df_new], ignore_index=True)
+        hours = epoch_hours(df_new['pickup_datetime'])
+        last_hour = int(hours.max()) if final else int(hours.max()) - 1
+        self.pending_trips = None if final else df_new[hours > last_hour]
+        n_new = last_hour - self.model.next_hour + 1
+        if n_new <= 0:
+            return 0
+
+        counts, labels = self.bin_trips(df_new, self.model.next_hour, n_new)
+        label_index = {label: i for i, label in enumerate(labels)}
+        counts = counts[[label_index[label] for label in self.zone_labels]]
+        self.model.update(counts)
+        self.counts = np.concatenate([self.counts, counts], axis=1)
+        return n_new
+
+    def forecast_next_day(self, horizon=24, output_path='uber_demand_forecast.csv'):
+        """Forecast ride counts per zone for the next day and save them"""
+        print("\n" + "=" * 60)
+        print("3. NEXT-DAY FORECAST")
+        print("=" * 60)
+
+        predicted = self.model.forecast(horizon)
+        forecast_hours = pd.to_datetime((self.model.next_hour + np.arange(horizon)) * 3600, unit='s')
+        forecast_df = pd.DataFrame({
+            'zone': np.repeat(self.zone_labels, horizon),
+            'forecast_hour': np.tile(forecast_hours, len(self.zone_labels)),
+            'predicted_rides': predicted.ravel().round(3),
+        })
+        forecast_df.to_csv(output_path, index=False)
+
+        totals = forecast_df.groupby('zone')['predicted_rides'].sum().sort_values(ascending=False)
+        print(f"\n📊 Forecast for {forecast_hours[0]} to {forecast_hours[-1]}:")
+        for zone, rides in totals.head(5).items():
+            print(f"   • {zone}: {rides:.1f} rides")
+        print(f"\n💾 Forecast saved to: {output_path}")
+
+        return forecast_df
+
+    def backtest(self, n_origins=8, step=HOURS_PER_WEEK, horizon=24, n_jobs=None):
+        """Rolling-origin backtest with one worker process per origin"""
+        print("\n" + "=" * 60)
+        print("4. ROLLING-ORIGIN BACKTEST")
+        print("=" * 60)
+
+        last_origin = self.counts.shape[1] - horizon
+        origins = [o for o in range(last_origin - (n_origins - 1) * step, last_origin + 1, step)
+                   if o >= 2 * HOURS_PER_WEEK]
+        tasks = [(self.counts, self.start_hour, o, horizon, self.model.alpha, self.model.gamma) for o in origins]
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+            results = list(pool.map(_backtest_origin, tasks))
+        elapsed = time.perf_counter() - start
+
+        backtest_df = pd.DataFrame(results, columns=['origin_hour', 'model_mae', 'seasonal_naive_mae'])
+        backtest_df['origin'] = pd.to_datetime((self.start_hour + backtest_df['origin_hour']) * 3600, unit='s')
+
+        print(f"\n✅ Backtested {len(origins)} origins in {elapsed:.2f}s")
+        print(f"   • Model MAE: {backtest_df['model_mae'].mean():.3f} rides/zone-hour")
+        print(f"   • Seasonal naive MAE: {backtest_df['seasonal_naive_mae'].mean():.3f} rides/zone-hour")
+
+        return backtest_df
+
+def main():
+    """Main function to run demand forecasting"""
+    parser = argparse.ArgumentParser(description='Per-zone hourly demand forecasting')
+    parser.add_argument('--data', default='uber_cleaned.csv')
+    parser.add_argument('--zone-type', choices=['borough', 'grid'], default='borough')
+    parser.add_argument('--cell-size', type=float, default=0.02)
+    parser.add_argument('--horizon', type=int, default=24)
+    parser.add_argument('--origins', type=int, default=8, help='Number of backtest origins')
+    parser.add_argument('--jobs', type=int, default=None, help='Backtest worker processes')
+    args = parser.parse_args()
+
+    forecaster = UberDemandForecaster(args.data, args.zone_type, args.cell_size)
+    forecaster.load_data()
+    forecaster.build_count_tensor()
+    forecaster.fit_models()
+    forecaster.forecast_next_day(args.horizon)
+    forecaster.backtest(args.origins, horizon=args.horizon, n_jobs=args.jobs)
+
+    print(f"\n🎯 Demand forecasting completed successfully!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Streaming Fare Anomaly Detection with Rolling Robust Statistics per Zone and Hour
+"""
+
+import argparse
+import time
+import pandas as pd
+import numpy as np
+from feature_engineering import grid_zone, hour_of_week
+import warnings
+warnings.filterwarnings('ignore')
+
+class StreamingFareAnomalyDetector:
+    """
+    Score fares against a rolling median/MAD of their (pickup zone, hour-of-week) segment
+
+    Each segment keeps a ring buffer of its last `window` fares, so memory is
+    bounded by window * observed segments. Records are scored in chunks: every
+    record in a chunk is compared with its segment's statistics as of the end of
+    the previous chunk, then the chunk is pushed into the ring buffers. Cost per
+    record is O(window), independent of history length.
+    """
+
+    HOURS_PER_WEEK = 168
+
+    def __init__(self, window=64, cell_size=0.02, threshold=4.0, min_observations=10):
+        """Initialize the detector"""
+        self.window = window
+        self.cell_size = cell_size
+        self.threshold = threshold
+        self.min_observations = min_observations
+
+        # Segments get a buffer row the first time they are seen; rows are
+        # allocated with capacity doubling so growth stays amortized O(1)
+        self.slot_of_segment = {}
+        self.n_slots = 0
+        self.segment_of_slot = np.empty(0, dtype=np.int64)
+        self.buffer = np.full((0, window), np.nan, dtype=np.float32)
+        self.position = np.zeros(0, dtype=np.int64)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.records_seen = 0
+
+    def _grow(self, required):
+        """Ensure the state arrays have at least `required` rows"""
+        capacity = len(self.segment_of_slot)
+        if required <= capacity:
+            return
+        extra = max(required, 2 * capacity, 1024) - capacity
+        self.segment_of_slot = np.concatenate([self.segment_of_slot, np.full(extra, -1, dtype=np.int64)])
+        self.buffer = np.concatenate([self.buffer, np.full((extra, self.window), np.nan, dtype=np.float32)])
+        self.position = np.concatenate([self.position, np.zeros(extra, dtype=np.int64)])
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+
+    def segment_ids(self, chunk):
+        """Combine pickup zone and hour-of-week into one segment id"""
+        zone = grid_zone(chunk['pickup_latitude'].to_numpy(), chunk['pickup_longitude'].to_numpy(), self.cell_size)
+        how = hour_of_week(chunk['pickup_datetime'].dt.hour.to_numpy(), chunk['pickup_datetime'].dt.dayofweek.to_numpy())
+        return zone * self.HOURS_PER_WEEK + how
+
+    def _slots(self, segments):
+        """Map segment ids to buffer rows, growing the buffers for new segments"""
+        unique_segments, inverse = np.unique(segments, return_inverse=True)
+        new_segments = [s for s in unique_segments.tolist() if s not in self.slot_of_segment]
+        if new_segments:
+            start = self.n_slots
+            self._grow(start + len(new_segments))
+            for i, segment in enumerate(new_segments):
+                self.slot_of_segment[segment] = start + i
+            self.segment_of_slot[start:start + len(new_segments)] = new_segments
+            self.n_slots += len(new_segments)
+        unique_slots = np.array([self.slot_of_segment[s] for s in unique_segments.tolist()], dtype=np.int64)
+        return unique_slots, inverse
+
+    def _segment_statistics(self, slots):
+        """Rolling median and MAD for the given buffer rows"""
+        rows = self.buffer[slots]
+        median = np.nanmedian(rows, axis=1)
+        mad = np.nanmedian(np.abs(rows - median[:, None]), axis=1)
+        return median, mad
+
+    def _push(self, slots, values):
+        """Append values (in time order) to their segments' ring buffers"""
+        order = np.argsort(slots, kind='stable')
+        sorted_slots = slots[order]
+        group_start = np.r_[0, np.flatnonzero(np.diff(sorted_slots)) + 1]
+        group_size = np.diff(np.r_[group_start, len(sorted_slots)])
+        rank = np.arange(len(sorted_slots)) - np.repeat(group_start, group_size)
+        size_per_row = np.repeat(group_size, group_size)
+
+        # Only the last `window` values of each segment survive this chunk
+        keep = rank >= size_per_row - self.window
+        kept_slots = sorted_slots[keep]
+        columns = (self.position[kept_slots] + rank[keep]) % self.window
+        self.buffer[kept_slots, columns] = values[order][keep]
+
+        group_slots = sorted_slots[group_start]
+        self.position[group_slots] = (self.position[group_slots] + group_size) % self.window
+        self.count[group_slots] += group_size
+
+    def process_chunk(self, chunk):
+        """Score a time-ordered chunk, then fold it into the rolling statistics"""
+        values = chunk['fare_amount'].to_numpy(dtype=np.float32)
+        unique_slots, slot_index = self._slots(self.segment_ids(chunk))
+        slots = unique_slots[slot_index]
+
+        median, mad = self._segment_statistics(unique_slots)
+        warm = self.count[unique_slots] >= self.min_observations
+
+        seg_median = median[slot_index]
+        # Floor the MAD so segments with identical fares do not divide by zero
+        seg_scale = np.maximum(1.4826 * mad[slot_index], 0.5)
+        score = np.abs(values - seg_median) / seg_scale
+        score[~warm[slot_index]] = np.nan
+
+        self._push(slots, values)
+        self.records_seen += len(chunk)
+
+        result = pd.DataFrame({
+            'segment_median_fare': seg_median,
+            'anomaly_score': score,
+            'is_fare_anomaly': (score > self.threshold).astype(int),
+        }, index=chunk.index)
+        return result
+
+    def memory_usage_mb(self):
+        """Size of the rolling state"""
+        return (self.buffer.nbytes + self.position.nbytes + self.count.nbytes + self.segment_of_slot.nbytes) / 1024**2
+
+class UberFareAnomalyReplay:
+    """
+    Replay the trip history in time order through the streaming detector
+    """
+
+    COLUMNS = ['fare_amount', 'pickup_datetime', 'pickup_longitude', 'pickup_latitude',
+               'dropoff_longitude', 'dropoff_latitude', 'passenger_count']
+
+    def __init__(self, data_path='uber_cleaned.csv', detector=None, chunk_size=50000):
+        """Initialize the replay"""
+        self.data_path = data_path
+        self.detector = detector or StreamingFareAnomalyDetector()
+        self.chunk_size = chunk_size
+        self.df = None
+        self.scores = None
+
+    def load_data(self):
+        """Load the columns needed for scoring and sort them by pickup time"""
+        print("=" * 80)
+        print("UBER FARES DATASET - STREAMING FARE ANOMALY DETECTION")
+        print("=" * 80)
+
+        self.df = pd.read_csv(self.data_path, usecols=self.COLUMNS)
+        self.df['pickup_datetime'] = pd.to_datetime(self.df['pickup_datetime'])
+        self.df = self.df.sort_values('pickup_datetime', kind='stable')
+
+        print(f"\n📊 Trips loaded for replay:")
+        print(f"   • Rows: {len(self.df):,}")
+        print(f"   • Date range: {self.df['pickup_datetime'].min()} to {self.df['pickup_datetime'].max()}")
+
+        return True
+
+    def replay(self):
+        """Score every trip in time order, chunk by chunk"""
+        print("\n" + "=" * 60)
+        print("1. REPLAYING HISTORY")
+        print("=" * 60)
+
+        start = time.perf_counter()
+        results = [
+            self.detector.process_chunk(self.df.iloc[i:i + self.chunk_size])
+            for i in range(0, len(self.df), self.chunk_size)
+        ]
+        elapsed = time.perf_counter() - start
+        self.scores = pd.concat(results) if results else pd.DataFrame()
+
+        print(f"\n✅ Replayed {self.detector.records_seen:,} trips in {elapsed:.2f}s "
+              f"({self.detector.records_seen / max(elapsed, 1e-9):,.0f} trips/s)")
+        print(f"   • Segments tracked: {self.detector.n_slots:,}")
+        print(f"   • Rolling state: {self.detector.memory_usage_mb():.2f} MB")
+
+        return self.scores
+
+    def anomaly_summary(self, output_path='uber_fare_anomalies.csv'):
+        """Summarize and save flagged trips"""
+        print("\n" + "=" * 60)
+        print("2. ANOMALY SUMMARY")
+        print("=" * 60)
+
+        flagged = self.df.join(self.scores)
+        scored = flagged['anomaly_score'].notna().sum()
+        flagged = flagged[flagged['is_fare_anomaly'] == 1].sort_values('anomaly_score', ascending=False)
+        flagged.to_csv(output_path, index=False)
+
+        print(f"\n📊 Anomaly Statistics:")
+        print(f"   • Trips scored (segment warmed up): {scored:,}")
+        print(f"   • Anomalies flagged: {len(flagged):,} ({len(flagged) / max(scored, 1) * 100:.2f}% of scored)")
+        print(f"\n📈 Most anomalous fares:")
+        for _, row in flagged.head(5).iterrows():
+            print(f"   • {row['pickup_datetime']}: ${row['fare_amount']:.2f} "
+                  f"(segment median ${row['segment_median_fare']:.2f}, score {row['anomaly_score']:.1f})")
+
+        print(f"\n💾 Flagged trips saved to: {output_path}")
+        return flagged
+
+def main():
+    """Main function to replay the history through the anomaly detector"""
+    parser = argparse.ArgumentParser(description='Streaming fare anomaly detection')
+    parser.add_argument('--data', default='uber_cleaned.csv')
+    parser.add_argument('--window', type=int, default=64, help='Rolling window per segment')
+    parser.add_argument('--cell-size', type=float, default=0.02, help='Pickup zone grid size in degrees')
+    parser.add_argument('--threshold', type=float, default=4.0, help='Robust z-score threshold')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    args = parser.parse_args()
+
+    detector = StreamingFareAnomalyDetector(args.window, args.cell_size, args.threshold)
+    replay = UberFareAnomalyReplay(args.data, detector, args.chunk_size)
+    replay.load_data()
+    replay.replay()
+    replay.anomaly_summary()
+
+    print(f"\n🎯 Fare anomaly detection completed successfully!")
+
+if __name__ == "__main__":
+    main()
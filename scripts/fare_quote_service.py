@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+Asyncio Fare Quote Service with Request Micro-Batching for Uber Fares Dataset
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import pandas as pd
+import numpy as np
+from feature_engineering import (
+    BOROUGH_BOUNDS, haversine_distance, classify_borough, peak_hour_indicator
+)
+import warnings
+warnings.filterwarnings('ignore')
+
+class FareQuoteModel:
+    """
+    Linear fare model over the distance, borough and peak hour features
+    """
+
+    BOROUGHS = [name for name, _ in BOROUGH_BOUNDS] + ['Other']
+    FEATURES = (['intercept', 'trip_distance_km', 'is_peak_hour', 'is_inter_borough', 'passenger_count'] +
+                [f'pickup_{name}' for name in BOROUGHS[1:]])
+
+    def __init__(self, coefficients=None):
+        """Initialize the model, optionally with fitted coefficients"""
+        self.coefficients = None if coefficients is None else np.asarray(coefficients, dtype=float)
+
+    @classmethod
+    def build_features(cls, frame):
+        """Build the design matrix for a batch of trips in one vectorized pass"""
+        pickup_lat = frame['pickup_latitude'].to_numpy(dtype=float)
+        pickup_lon = frame['pickup_longitude'].to_numpy(dtype=float)
+        dropoff_lat = frame['dropoff_latitude'].to_numpy(dtype=float)
+        dropoff_lon = frame['dropoff_longitude'].to_numpy(dtype=float)
+
+        distance = haversine_distance(pickup_lat, pickup_lon, dropoff_lat, dropoff_lon)
+        pickup_borough = classify_borough(pickup_lat, pickup_lon)
+        dropoff_borough = classify_borough(dropoff_lat, dropoff_lon)
+        is_peak = peak_hour_indicator(frame['pickup_hour'].to_numpy(), frame['pickup_weekday'].to_numpy())
+
+        features = np.empty((len(frame), len(cls.FEATURES)))
+        features[:, 0] = 1.0
+        features[:, 1] = distance
+        features[:, 2] = is_peak
+        features[:, 3] = pickup_borough != dropoff_borough
+        features[:, 4] = frame['passenger_count'].to_numpy(dtype=float)
+        for i, name in enumerate(cls.BOROUGHS[1:], start=5):
+            features[:, i] = pickup_borough == name
+
+        return features, distance, pickup_borough, is_peak
+
+    def fit(self, df):
+        """Fit coefficients by least squares on an enhanced dataset"""
+        features, _, _, _ = self.build_features(df)
+        self.coefficients, _, _, _ = np.linalg.lstsq(features, df['fare_amount'].to_numpy(dtype=float), rcond=None)
+        return self
+
+    def predict(self, features):
+        """Predict fares for a design matrix"""
+        if self.coefficients is None:
+            raise ValueError("Model has not been fitted")
+        return np.maximum(features @ self.coefficients, 0.0)
+
+    def quote_batch(self, frame):
+        """Compute features and fare estimates for a batch of trips"""
+        features, distance, pickup_borough, is_peak = self.build_features(frame)
+        fares = self.predict(features)
+        return [
+            {
+                'fare_estimate': round(float(fare), 2),
+                'trip_distance_km': round(float(dist), 3),
+                'pickup_borough': str(borough),
+                'is_peak_hour': int(peak),
+            }
+            for fare, dist, borough, peak in zip(fares, distance, pickup_borough, is_peak)
+        ]
+
+    def save(self, path):
+        """Save coefficients to an .npz file"""
+        np.savez(path, coefficients=self.coefficients, features=np.array(self.FEATURES))
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Load coefficients saved with save()"""
+        with np.load(path) as data:
+            if list(data['features']) != cls.FEATURES:
+                raise ValueError(f"Model file {path} was trained on a different feature set")
+            return cls(data['coefficients'])
+
+class MicroBatcher:
+    """
+    Collect concurrent quote requests into short micro-batches
+    """
+
+    def __init__(self, model, max_batch_size=64, max_wait_ms=2.0):
+        """Initialize the batcher with its batch size and wait-time knobs"""
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.task = None
+        self.batches_processed = 0
+        self.requests_processed = 0
+
+    async def start(self):
+        """Start the background batching task"""
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background batching task"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def submit(self, quote):
+        """Queue one quote request and wait for its batch to be scored"""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((quote, future))
+        return await future
+
+    async def _collect(self):
+        """Wait for one request, then gather more until the batch is full or the wait expires"""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without yielding to the loop
+            while len(batch) < self.max_batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            timeout = deadline - loop.time()
+            if len(batch) >= self.max_batch_size or timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        """Score batches until cancelled"""
+        while True:
+            batch = await self._collect()
+            self._process(batch)
+
+    def _process(self, batch):
+        """Score one batch and resolve its futures"""
+        quotes = [quote for quote, _ in batch]
+        futures = [future for _, future in batch]
+        try:
+            results = self.model.quote_batch(quotes_to_frame(quotes))
+        except Exception:
+            # Score the batch one quote at a time so a bad quote fails only its own request
+            results = []
+            for quote, future in zip(quotes, futures):
+                try:
+                    results.append(self.model.quote_batch(quotes_to_frame([quote]))[0])
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                    results.append(None)
+
+        for future, result in zip(futures, results):
+            if not future.done() and result is not None:
+                future.set_result(result)
+        self.batches_processed += 1
+        self.requests_processed += len(batch)
+
+def validate_quote(quote):
+    """Coerce one quote request to typed values, raising ValueError for bad fields"""
+    clean = {}
+    for field in FareQuoteServer.REQUIRED_FIELDS:
+        try:
+            clean[field] = float(quote[field])
+        except (TypeError, ValueError):
+            raise ValueError(f"{field} must be a number, got {quote[field]!r}")
+        if not np.isfinite(clean[field]):
+            raise ValueError(f"{field} must be finite, got {quote[field]!r}")
+    if quote.get('passenger_count') is not None:
+        try:
+            clean['passenger_count'] = int(quote['passenger_count'])
+        except (TypeError, ValueError):
+            raise ValueError(f"passenger_count must be an integer, got {quote['passenger_count']!r}")
+    if quote.get('pickup_datetime') is not None:
+        try:
+            pickup = pd.Timestamp(quote['pickup_datetime'])
+        except (TypeError, ValueError):
+            raise ValueError(f"pickup_datetime is not a date/time: {quote['pickup_datetime']!r}")
+        if pd.isna(pickup):
+            raise ValueError(f"pickup_datetime is not a date/time: {quote['pickup_datetime']!r}")
+        # Naive times are UTC; parsed here so one batch never mixes string formats
+        clean['pickup_datetime'] = pickup.tz_localize('UTC') if pickup.tzinfo is None else pickup.tz_convert('UTC')
+    return clean
+
+def quotes_to_frame(quotes):
+    """Convert a list of quote request dicts into a feature-ready DataFrame"""
+    frame = pd.DataFrame.from_records(quotes)
+    if 'pickup_datetime' in frame.columns:
+        pickup_datetime = pd.to_datetime(frame['pickup_datetime'], utc=True).fillna(pd.Timestamp.now(tz='UTC'))
+    else:
+        pickup_datetime = pd.Series(pd.Timestamp.now(tz='UTC'), index=frame.index)
+    frame['pickup_hour'] = pickup_datetime.dt.hour
+    frame['pickup_weekday'] = pickup_datetime.dt.dayofweek
+    if 'passenger_count' not in frame.columns:
+        frame['passenger_count'] = 1
+    frame['passenger_count'] = frame['passenger_count'].fillna(1)
+    return frame
+
+class FareQuoteServer:
+    """
+    Minimal HTTP/1.1 server exposing POST /quote and GET /health on localhost
+    """
+
+    REQUIRED_FIELDS = ['pickup_latitude', 'pickup_longitude', 'dropoff_latitude', 'dropoff_longitude']
+
+    def __init__(self, model, host='127.0.0.1', port=8080, max_batch_size=64, max_wait_ms=2.0):
+        """Initialize the server"""
+        self.host = host
+        self.port = port
+        self.batcher = MicroBatcher(model, max_batch_size, max_wait_ms)
+        self.server = None
+
+    async def start(self):
+        """Start listening"""
+        await self.batcher.start()
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        print(f"\n🚀 Fare quote service listening on http://{self.host}:{self.port}")
+        print(f"   • Max batch size: {self.batcher.max_batch_size}")
+        print(f"   • Max wait: {self.batcher.max_wait * 1000:.1f} ms")
+
+    async def stop(self):
+        """Stop listening and shut down the batcher"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def serve_forever(self):
+        """Start and serve until cancelled"""
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(self, reader, writer):
+        """Serve keep-alive requests on one connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                body = b''
+                if 'content-length' in headers:
+                    body = await reader.readexactly(int(headers['content-length']))
+
+                status, payload = await self._route(method, path, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        """Dispatch one request"""
+        if method == 'GET' and path == '/health':
+            batches = self.batcher.batches_processed
+            return '200 OK', {
+                'status': 'ok',
+                'batches_processed': batches,
+                'requests_processed': self.batcher.requests_processed,
+                'avg_batch_size': self.batcher.requests_processed / batches if batches else 0.0,
+            }
+        if method == 'POST' and path == '/quote':
+            try:
+                quote = json.loads(body)
+            except json.JSONDecodeError:
+                return '400 Bad Request', {'error': 'Request body must be JSON'}
+            if not isinstance(quote, dict):
+                return '400 Bad Request', {'error': 'Request body must be a JSON object'}
+            missing = [field for field in self.REQUIRED_FIELDS if field not in quote]
+            if missing:
+                return '400 Bad Request', {'error': f'Missing fields: {missing}'}
+            try:
+                quote = validate_quote(quote)
+            except ValueError as e:
+                return '400 Bad Request', {'error': str(e)}
+            try:
+                return '200 OK', await self.batcher.submit(quote)
+            except Exception as e:
+                return '500 Internal Server Error', {'error': str(e)}
+        return '404 Not Found', {'error': f'No route for {method} {path}'}
+
+class FareQuoteLoadTester:
+    """
+    Concurrent keep-alive load generator reporting throughput and latency percentiles
+    """
+
+    def __init__(self, host='127.0.0.1', port=8080, seed=42):
+        """Initialize the load tester"""
+        self.host = host
+        self.port = port
+        self.rng = np.random.default_rng(seed)
+
+    def random_quotes(self, n):
+        """Generate random trips inside Manhattan"""
+        pickup_lat = self.rng.uniform(40.70, 40.88, n)
+        pickup_lon = self.rng.uniform(-74.02, -73.93, n)
+        hours = self.rng.integers(0, 24, n)
+        return [
+            json.dumps({
+                'pickup_latitude': float(pickup_lat[i]),
+                'pickup_longitude': float(pickup_lon[i]),
+                'dropoff_latitude': float(pickup_lat[i] + self.rng.normal(0, 0.02)),
+                'dropoff_longitude': float(pickup_lon[i] + self.rng.normal(0, 0.02)),
+                'passenger_count': int(self.rng.integers(1, 7)),
+                'pickup_datetime': f'2015-03-{1 + i % 28:02d} {hours[i]:02d}:15:00',
+            }).encode()
+            for i in range(n)
+        ]
+
+    async def _request(self, reader, writer, method, path, body=b''):
+        """Send one request and read the response on an open connection"""
+        writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        payload = await reader.readexactly(length)
+        return int(status_line.split()[1]), json.loads(payload)
+
+    async def _worker(self, bodies, latencies, errors):
+        """Send requests sequentially over one keep-alive connection"""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            for body in bodies:
+                start = time.perf_counter()
+                status, _ = await self._request(reader, writer, 'POST', '/quote', body)
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors.append(status)
+        finally:
+            writer.close()
+
+    async def run(self, concurrency=64, total_requests=20000):
+        """Run the load test and return a results dict"""
+        print("\n" + "=" * 60)
+        print("FARE QUOTE LOAD TEST")
+        print("=" * 60)
+
+        bodies = self.random_quotes(total_requests)
+        latencies, errors = [], []
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            self._worker(bodies[i::concurrency], latencies, errors) for i in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        _, health = await self._request(reader, writer, 'GET', '/health')
+        writer.close()
+
+        latencies_ms = np.array(latencies) * 1000
+        results = {
+            'concurrency': concurrency,
+            'requests': len(latencies),
+            'errors': len(errors),
+            'elapsed_s': elapsed,
+            'throughput_rps': len(latencies) / elapsed,
+            'p50_ms': float(np.percentile(latencies_ms, 50)),
+            'p99_ms': float(np.percentile(latencies_ms, 99)),
+            'avg_batch_size': health['avg_batch_size'],
+        }
+
+        print(f"\n📊 Load test results:")
+        print(f"   • Concurrency: {concurrency}")
+        print(f"   • Requests: {results['requests']:,} ({results['errors']} errors)")
+        print(f"   • Throughput: {results['throughput_rps']:,.0f} requests/s")
+        print(f"   • Latency p50: {results['p50_ms']:.2f} ms")
+        print(f"   • Latency p99: {results['p99_ms']:.2f} ms")
+        print(f"   • Average batch size: {results['avg_batch_size']:.1f}")
+
+        return results
+
+def train_model(data_path='uber_enhanced.csv', model_path='fare_quote_model.npz'):
+    """Fit the fare model on the enhanced dataset and save it"""
+    print("=" * 80)
+    print("FARE QUOTE MODEL TRAINING")
+    print("=" * 80)
+
+    df = pd.read_csv(data_path, usecols=[
+        'fare_amount', 'pickup_latitude', 'pickup_longitude', 'dropoff_latitude',
+        'dropoff_longitude', 'passenger_count', 'pickup_hour', 'pickup_weekday'
+    ])
+    model = FareQuoteModel().fit(df)
+    model.save(model_path)
+
+    features, _, _, _ = model.build_features(df)
+    residuals = df['fare_amount'].to_numpy() - model.predict(features)
+    print(f"\n✅ Model trained on {len(df):,} trips")
+    print(f"   • MAE: ${np.abs(residuals).mean():.2f}")
+    for name, coef in zip(model.FEATURES, model.coefficients):
+        print(f"   • {name:25s} {coef:8.3f}")
+    print(f"\n💾 Model saved to: {model_path}")
+    return model
+
+async def run_server(args):
+    """Serve quotes until interrupted"""
+    server = FareQuoteServer(FareQuoteModel.load(args.model), args.host, args.port,
+                             args.max_batch_size, args.max_wait_ms)
+    await server.serve_forever()
+
+async def run_load_test(args):
+    """Run the load generator, optionally against an in-process server"""
+    server = None
+    port = args.port
+    if args.with_server:
+        server = FareQuoteServer(FareQuoteModel.load(args.model), args.host, 0,
+                                 args.max_batch_size, args.max_wait_ms)
+        await server.start()
+        port = server.port
+    try:
+        return await FareQuoteLoadTester(args.host, port).run(args.concurrency, args.requests)
+    finally:
+        if server is not None:
+            await server.stop()
+
+def main():
+    """Main function to train, serve or load test the fare quote service"""
+    parser = argparse.ArgumentParser(description='Micro-batched fare quote service')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = subparsers.add_parser('train', help='Fit the fare model on uber_enhanced.csv')
+    train_parser.add_argument('--data', default='uber_enhanced.csv')
+    train_parser.add_argument('--model', default='fare_quote_model.npz')
+
+    for name, help_text in [('serve', 'Serve quotes over HTTP'), ('loadtest', 'Run the load generator')]:
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('--host', default='127.0.0.1')
+        sub.add_argument('--port', type=int, default=8080)
+        sub.add_argument('--model', default='fare_quote_model.npz')
+        sub.add_argument('--max-batch-size', type=int, default=64)
+        sub.add_argument('--max-wait-ms', type=float, default=2.0)
+
+    load_parser = subparsers.choices['loadtest']
+    load_parser.add_argument('--concurrency', type=int, default=64)
+    load_parser.add_argument('--requests', type=int, default=20000)
+    load_parser.add_argument('--with-server', action='store_true',
+                             help='Start an in-process server on a free port for the test')
+
+    args = parser.parse_args()
+    if args.command == 'train':
+        train_model(args.data, args.model)
+    elif args.command == 'serve':
+        try:
+            asyncio.run(run_server(args))
+        except KeyboardInterrupt:
+            print(f"\n🛑 Fare quote service stopped")
+    else:
+        asyncio.run(run_load_test(args))
+
+if __name__ == "__main__":
+    main()
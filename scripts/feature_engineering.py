@@ -3,37 +3,303 @@
 Feature Engineering for Uber Fares Dataset
 """
 
+import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
+from data_cleaning import NYC_BOUNDS
+from instrumentation import instrumented
+from partitioned_store import write_partitioned
+from time_sorted_store import write_time_sorted
 import warnings
 warnings.filterwarnings('ignore')
 
+# Times Square, used as the city center reference point
+TIMES_SQUARE_LAT, TIMES_SQUARE_LON = 40.7580, -73.9855
+
+# Approximate NYC borough bounding boxes, checked in this order
+# (min_lon, max_lon, min_lat, max_lat)
+BOROUGH_BOUNDS = [
+    ('Manhattan', (-74.02, -73.93, 40.70, 40.88)),
+    ('Brooklyn', (-74.05, -73.83, 40.57, 40.74)),
+    ('Queens', (-73.96, -73.70, 40.54, 40.80)),
+    ('Bronx', (-73.93, -73.77, 40.79, 40.92)),
+    ('Staten Island', (-74.26, -74.05, 40.48, 40.65)),
+]
+
+# Landmarks for the proximity features: (name, category, latitude, longitude, radius_km)
+LANDMARKS = [
+    ('JFK Airport', 'airport', 40.6413, -73.7781, 2.5),
+    ('LaGuardia Airport', 'airport', 40.7769, -73.8740, 1.5),
+    ('Newark Airport', 'airport', 40.6895, -74.1745, 2.5),
+    ('Penn Station', 'station', 40.7506, -73.9935, 0.3),
+    ('Grand Central Terminal', 'station', 40.7527, -73.9772, 0.3),
+    ('Port Authority Bus Terminal', 'station', 40.7570, -73.9903, 0.3),
+    ('Atlantic Terminal', 'station', 40.6840, -73.9772, 0.3),
+    ('Jamaica Station', 'station', 40.6995, -73.8083, 0.3),
+    ('Times Square', 'hub', TIMES_SQUARE_LAT, TIMES_SQUARE_LON, 0.5),
+    ('Financial District', 'hub', 40.7069, -74.0113, 0.5),
+    ('World Trade Center', 'hub', 40.7118, -74.0131, 0.4),
+    ('Union Square', 'hub', 40.7359, -73.9911, 0.4),
+    ('Columbus Circle', 'hub', 40.7681, -73.9819, 0.4),
+    ('Barclays Center', 'hub', 40.6826, -73.9754, 0.4),
+    ('Yankee Stadium', 'hub', 40.8296, -73.9262, 0.5),
+]
+
+EARTH_RADIUS_KM = 6371
+
+# Widths (minutes) of the rolling demand windows and grid size (degrees) of their zones
+DEMAND_WINDOWS_MINUTES = (15, 60)
+DEMAND_CELL_SIZE = 0.01
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Calculate the great circle distance between two points on earth"""
+    # Convert decimal degrees to radians
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+    
+    # Haversine formula
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    c = 2 * np.arcsin(np.sqrt(a))
+    
+    # Radius of earth in kilometers
+    r = EARTH_RADIUS_KM
+    return c * r
+
+def classify_borough(lat, lon):
+    """Approximate borough classification for arrays of coordinates"""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    conditions = [
+        (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+        for _, (min_lon, max_lon, min_lat, max_lat) in BOROUGH_BOUNDS
+    ]
+    names = [name for name, _ in BOROUGH_BOUNDS]
+    return np.select(conditions, names, default='Other')
+
+def peak_hour_indicator(hour, weekday):
+    """Rush hour flag: 7-9 AM and 5-7 PM on weekdays, 11 AM-2 PM and 6-8 PM on weekends"""
+    hour = np.asarray(hour)
+    weekday = np.asarray(weekday)
+    weekday_peak = ((hour >= 7) & (hour <= 9)) | ((hour >= 17) & (hour <= 19))
+    weekend_peak = ((hour >= 11) & (hour <= 14)) | ((hour >= 18) & (hour <= 20))
+    return np.where(weekday < 5, weekday_peak, weekend_peak).astype(int)
+
+def distance_from_center(lat, lon):
+    """Approximate planar distance (km) from Times Square"""
+    return np.sqrt((lat - TIMES_SQUARE_LAT)**2 + (lon - TIMES_SQUARE_LON)**2) * 111
+
+def grid_shape(cell_size=0.01):
+    """(rows, columns) of the grid_zone grid; zone ids run from 0 to rows * columns - 1"""
+    n_rows = int(round((NYC_BOUNDS['max_latitude'] - NYC_BOUNDS['min_latitude']) / cell_size))
+    n_cols = int(round((NYC_BOUNDS['max_longitude'] - NYC_BOUNDS['min_longitude']) / cell_size))
+    return n_rows, n_cols
+
+def grid_zone(lat, lon, cell_size=0.01):
+    """Integer zone id of a regular lat/lon grid laid over the NYC bounds"""
+    n_rows, n_cols = grid_shape(cell_size)
+    row = np.clip(((np.asarray(lat) - NYC_BOUNDS['min_latitude']) / cell_size).astype(np.int64), 0, n_rows - 1)
+    col = np.clip(((np.asarray(lon) - NYC_BOUNDS['min_longitude']) / cell_size).astype(np.int64), 0, n_cols - 1)
+    return row * n_cols + col
+
+def hour_of_week(hour, weekday):
+    """Hour of the week, 0 (Monday 00:00) to 167 (Sunday 23:00)"""
+    return np.asarray(weekday) * 24 + np.asarray(hour)
+
+def epoch_seconds(timestamps):
+    """Integer seconds since 1970 of a datetime Series (tz-aware values are taken in UTC)"""
+    if getattr(timestamps.dtype, 'tz', None) is not None:
+        timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
+    return timestamps.to_numpy('datetime64[s]').astype(np.int64)
+
+def window_aggregates(event_keys, event_times, query_keys, query_times, widths, values=None, leading=False):
+    """
+    Count (and sum values of) events sharing each query's key within a time window of it
+
+    Events are sorted by (key, time) once and every window bound is a
+    searchsorted into that order, so all widths together cost
+    O((n + m) log n) instead of a scan per row. Trailing windows are
+    [t - width, t) and leading windows are (t, t + width], so a query never
+    counts an event at its own timestamp. Keys are non-negative integers and
+    times and widths integers in one unit. Returns ({width: counts},
+    {width: sums}), the sums being empty without values.
+    """
+    event_keys = np.asarray(event_keys, dtype=np.int64)
+    event_times = np.asarray(event_times, dtype=np.int64)
+    query_keys = np.asarray(query_keys, dtype=np.int64)
+    query_times = np.asarray(query_times, dtype=np.int64)
+    if len(event_times) == 0 or len(query_times) == 0:
+        zeros = np.zeros(len(query_times), dtype=np.int64)
+        return {w: zeros for w in widths}, ({w: zeros.astype(float) for w in widths} if values is not None else {})
+
+    # One sortable int64 per (key, time); the padding keeps every window inside its own key's range
+    pad = max(widths)
+    base = min(event_times.min(), query_times.min()) - pad
+    span = max(event_times.max(), query_times.max()) - base + pad + 1
+    composite = event_keys * span + (event_times - base)
+    order = np.argsort(composite, kind='stable')
+    events = composite[order]
+    # Queries are searched in sorted order too, which keeps the binary searches cache-friendly
+    queries = query_keys * span + (query_times - base)
+    query_order = order if np.array_equal(queries, composite) else np.argsort(queries, kind='stable')
+    queries = queries[query_order]
+    if values is not None:
+        prefix = np.concatenate([[0.0], np.cumsum(np.nan_to_num(np.asarray(values, dtype=float))[order])])
+
+    counts, sums = {}, {}
+    for width in widths:
+        if leading:
+            lo = np.searchsorted(events, queries, side='right')
+            hi = np.searchsorted(events, queries + width, side='right')
+        else:
+            lo = np.searchsorted(events, queries - width, side='left')
+            hi = np.searchsorted(events, queries, side='left')
+        counts[width] = np.empty(len(queries), dtype=np.int64)
+        counts[width][query_order] = hi - lo
+        if values is not None:
+            sums[width] = np.empty(len(queries))
+            sums[width][query_order] = prefix[hi] - prefix[lo]
+    return counts, sums
+
+def load_landmarks(source=None):
+    """Landmark table (name, category, latitude, longitude, radius_km) from LANDMARKS, a CSV path or a list"""
+    columns = ['name', 'category', 'latitude', 'longitude', 'radius_km']
+    if source is None:
+        source = LANDMARKS
+    if isinstance(source, pd.DataFrame):
+        landmarks = source
+    elif isinstance(source, str):
+        landmarks = pd.read_csv(source)
+    else:
+        landmarks = pd.DataFrame(list(source), columns=columns)
+    return landmarks[columns].reset_index(drop=True)
+
+def _unit_vectors(lat, lon):
+    """Points on the unit sphere, so straight-line (chord) order is great-circle order"""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+def _chord_to_km(chord):
+    """Great-circle distance for a chord length on the unit sphere"""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord, 2.0) / 2)
+
+def _km_to_chord(km):
+    """Chord length on the unit sphere for a great-circle distance"""
+    return 2 * np.sin(np.asarray(km, dtype=float) / (2 * EARTH_RADIUS_KM))
+
+class LandmarkIndex:
+    """
+    KD-trees over landmarks on the unit sphere for batched proximity queries
+
+    One tree covers every landmark (nearest landmark and its great-circle
+    distance). Within each category, one tree per distinct radius answers
+    the within-radius checks with one bounded nearest-neighbour query, so
+    any landmark table gives exact flags. Each chunk of points is converted
+    once and queried with all cores, and only points near some landmark are
+    checked against the category trees, so memory stays bounded for tens
+    of millions of points.
+    """
+
+    def __init__(self, landmarks=None, chunk_size=2_000_000):
+        """Build the trees"""
+        from scipy.spatial import cKDTree
+
+        self.landmarks = load_landmarks(landmarks)
+        self.chunk_size = chunk_size
+        self.names = self.landmarks['name'].to_numpy(dtype=object)
+        points = _unit_vectors(self.landmarks['latitude'], self.landmarks['longitude'])
+        self.tree = cKDTree(points)
+        self.categories = {}
+        for category, group in self.landmarks.groupby('category', sort=True):
+            # Landmarks sharing a radius share a tree, so the nearest one of each tree decides
+            self.categories[category] = [(cKDTree(points[same.index]), float(_km_to_chord(radius_km)))
+                                         for radius_km, same in group.groupby('radius_km', sort=True)]
+
+    def query(self, lat, lon):
+        """(nearest landmark index, distance in km, {category: within-radius flags}) for every point"""
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        nearest = np.empty(len(lat), dtype=np.int64)
+        chord = np.empty(len(lat))
+        within = {category: np.zeros(len(lat), dtype=bool) for category in self.categories}
+        for start in range(0, len(lat), self.chunk_size):
+            chunk = slice(start, start + self.chunk_size)
+            points = _unit_vectors(lat[chunk], lon[chunk])
+            chord[chunk], nearest[chunk] = self.tree.query(points, workers=-1)
+            for category, trees in self.categories.items():
+                # Only points whose nearest landmark of any kind is inside the largest radius can qualify
+                candidates = np.flatnonzero(chord[chunk] <= trees[-1][1])
+                if len(candidates) == 0:
+                    continue
+                flags = np.zeros(len(candidates), dtype=bool)
+                for tree, radius in trees:
+                    # The bound is exclusive; nudge it so points exactly on the radius count
+                    distances, _ = tree.query(points[candidates], distance_upper_bound=np.nextafter(radius, np.inf),
+                                              workers=-1)
+                    flags |= distances <= radius
+                within[category][start + candidates] = flags
+        return nearest, _chord_to_km(chord), within
+
+def brute_force_landmarks(landmarks, lat, lon):
+    """LandmarkIndex.query by a full haversine scan of every point against every landmark"""
+    landmarks = load_landmarks(landmarks)
+    lat = np.asarray(lat, dtype=float)[:, None]
+    lon = np.asarray(lon, dtype=float)[:, None]
+    distances = haversine_distance(lat, lon, landmarks['latitude'].to_numpy()[None, :],
+                                   landmarks['longitude'].to_numpy()[None, :])
+    inside = distances <= landmarks['radius_km'].to_numpy()[None, :]
+    within = {category: inside[:, group.index].any(axis=1)
+              for category, group in landmarks.groupby('category', sort=True)}
+    return distances.argmin(axis=1), distances.min(axis=1), within
+
+# Custom table for the landmark check: nine small hubs 2 km north of a hub with a 3 km radius, so for
+# points north of them the big hub is only the tenth-nearest hub although they lie inside its radius
+MIXED_RADIUS_LANDMARKS = [(f'Hub {i}', 'hub', 40.768, -73.912 + 0.003 * i, 0.2) for i in range(9)] + [
+    ('Big Hub', 'hub', 40.75, -73.90, 3.0), ('Airport', 'airport', 40.6413, -73.7781, 2.5)]
+
+def check_landmark_index(landmarks=None, n_points=20000, seed=42):
+    """Compare LandmarkIndex with the brute-force scan on random points in NYC_BOUNDS"""
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(NYC_BOUNDS['min_latitude'], NYC_BOUNDS['max_latitude'], n_points)
+    lon = rng.uniform(NYC_BOUNDS['min_longitude'], NYC_BOUNDS['max_longitude'], n_points)
+    nearest, distance, within = LandmarkIndex(landmarks).query(lat, lon)
+    expected_nearest, expected_distance, expected_within = brute_force_landmarks(landmarks, lat, lon)
+    return {
+        'nearest_mismatches': int((nearest != expected_nearest).sum()),
+        'max_distance_error_km': float(np.abs(distance - expected_distance).max()),
+        'flag_mismatches': {category: int((flags != expected_within[category]).sum())
+                            for category, flags in within.items()},
+    }
+
+@instrumented('df_enhanced')
 class UberFeatureEngineer:
     """
     Comprehensive feature engineering class for Uber Fares dataset
     """
     
-    def __init__(self, data_path='uber_cleaned.csv'):
-        """Initialize the feature engineer"""
+    def __init__(self, data_path='uber_cleaned.csv', landmarks=None):
+        """Initialize the feature engineer (landmarks: LANDMARKS by default, a CSV path or a list)"""
         self.data_path = data_path
+        self.landmarks = landmarks
         self.df = None
         self.df_enhanced = None
         
-    def load_cleaned_data(self):
-        """Load the cleaned dataset"""
+    def load_cleaned_data(self, df=None):
+        """Load the cleaned dataset (or take an in-memory frame)"""
         print("=" * 80)
         print("UBER FARES DATASET - FEATURE ENGINEERING")
         print("=" * 80)
         
-        self.df = pd.read_csv(self.data_path)
+        self.df = df if df is not None else pd.read_csv(self.data_path)
         # Convert pickup_datetime back to datetime if it's not already
         if self.df['pickup_datetime'].dtype == 'object':
             self.df['pickup_datetime'] = pd.to_datetime(self.df['pickup_datetime'])
         
-        self.df_enhanced = self.df.copy()
+        # Shallow copy: features are added as new columns, self.df keeps the originals
+        self.df_enhanced = self.df.copy(deep=False)
         
         print(f"\n📊 Cleaned dataset loaded:")
         print(f"   • Shape: {self.df.shape}")
@@ -78,16 +344,8 @@ class UberFeatureEngineer:
         self.df_enhanced['is_weekend'] = (self.df_enhanced['pickup_weekday'] >= 5).astype(int)
         
         # Create peak hours indicator (rush hours)
-        def is_peak_hour(hour, weekday):
-            # Weekday rush hours: 7-9 AM and 5-7 PM
-            # Weekend peak: 11 AM - 2 PM and 6-8 PM
-            if weekday < 5:  # Weekday
-                return 1 if (7 <= hour <= 9) or (17 <= hour <= 19) else 0
-            else:  # Weekend
-                return 1 if (11 <= hour <= 14) or (18 <= hour <= 20) else 0
-        
-        self.df_enhanced['is_peak_hour'] = self.df_enhanced.apply(
-            lambda row: is_peak_hour(row['pickup_hour'], row['pickup_weekday']), axis=1
+        self.df_enhanced['is_peak_hour'] = peak_hour_indicator(
+            self.df_enhanced['pickup_hour'], self.df_enhanced['pickup_weekday']
         )
         
         print(f"\n✅ Extracted temporal features:")
@@ -110,21 +368,6 @@ class UberFeatureEngineer:
         print("2. CALCULATING DISTANCE FEATURES")
         print("=" * 60)
         
-        def haversine_distance(lat1, lon1, lat2, lon2):
-            """Calculate the great circle distance between two points on earth"""
-            # Convert decimal degrees to radians
-            lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
-            
-            # Haversine formula
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-            c = 2 * np.arcsin(np.sqrt(a))
-            
-            # Radius of earth in kilometers
-            r = 6371
-            return c * r
-        
         # Calculate trip distance
         self.df_enhanced['trip_distance_km'] = haversine_distance(
             self.df_enhanced['pickup_latitude'],
@@ -175,33 +418,12 @@ class UberFeatureEngineer:
         print("3. CREATING LOCATION FEATURES")
         print("=" * 60)
         
-        # NYC borough boundaries (approximate)
-        def get_borough(lat, lon):
-            """Approximate borough classification based on coordinates"""
-            # Manhattan
-            if -74.02 <= lon <= -73.93 and 40.70 <= lat <= 40.88:
-                return 'Manhattan'
-            # Brooklyn
-            elif -74.05 <= lon <= -73.83 and 40.57 <= lat <= 40.74:
-                return 'Brooklyn'
-            # Queens
-            elif -73.96 <= lon <= -73.70 and 40.54 <= lat <= 40.80:
-                return 'Queens'
-            # Bronx
-            elif -73.93 <= lon <= -73.77 and 40.79 <= lat <= 40.92:
-                return 'Bronx'
-            # Staten Island
-            elif -74.26 <= lon <= -74.05 and 40.48 <= lat <= 40.65:
-                return 'Staten Island'
-            else:
-                return 'Other'
-        
-        # Get pickup and dropoff boroughs
-        self.df_enhanced['pickup_borough'] = self.df_enhanced.apply(
-            lambda row: get_borough(row['pickup_latitude'], row['pickup_longitude']), axis=1
+        # Get pickup and dropoff boroughs (approximate NYC borough boundaries)
+        self.df_enhanced['pickup_borough'] = classify_borough(
+            self.df_enhanced['pickup_latitude'], self.df_enhanced['pickup_longitude']
         )
-        self.df_enhanced['dropoff_borough'] = self.df_enhanced.apply(
-            lambda row: get_borough(row['dropoff_latitude'], row['dropoff_longitude']), axis=1
+        self.df_enhanced['dropoff_borough'] = classify_borough(
+            self.df_enhanced['dropoff_latitude'], self.df_enhanced['dropoff_longitude']
         )
         
         # Create inter-borough trip indicator
@@ -210,16 +432,11 @@ class UberFeatureEngineer:
         ).astype(int)
         
         # Distance from city center (Times Square: 40.7580, -73.9855)
-        times_square_lat, times_square_lon = 40.7580, -73.9855
-        
-        def distance_from_center(lat, lon):
-            return np.sqrt((lat - times_square_lat)**2 + (lon - times_square_lon)**2) * 111  # Approximate km
-        
-        self.df_enhanced['pickup_distance_from_center'] = self.df_enhanced.apply(
-            lambda row: distance_from_center(row['pickup_latitude'], row['pickup_longitude']), axis=1
+        self.df_enhanced['pickup_distance_from_center'] = distance_from_center(
+            self.df_enhanced['pickup_latitude'], self.df_enhanced['pickup_longitude']
         )
-        self.df_enhanced['dropoff_distance_from_center'] = self.df_enhanced.apply(
-            lambda row: distance_from_center(row['dropoff_latitude'], row['dropoff_longitude']), axis=1
+        self.df_enhanced['dropoff_distance_from_center'] = distance_from_center(
+            self.df_enhanced['dropoff_latitude'], self.df_enhanced['dropoff_longitude']
         )
         
         print(f"\n✅ Created location features:")
@@ -263,6 +480,92 @@ class UberFeatureEngineer:
         print(f"   • Average fare per passenger: ${self.df_enhanced['fare_per_passenger'].mean():.2f}")
         print(f"   • Passenger categories: {self.df_enhanced['passenger_category'].value_counts().to_dict()}")
     
+    def create_landmark_features(self):
+        """Nearest landmark, its distance and within-radius flags for pickups and dropoffs"""
+        print("\n" + "=" * 60)
+        print("5. CREATING LANDMARK FEATURES")
+        print("=" * 60)
+        
+        index = LandmarkIndex(self.landmarks)
+        for end in ('pickup', 'dropoff'):
+            nearest, distance, within = index.query(self.df_enhanced[f'{end}_latitude'],
+                                                    self.df_enhanced[f'{end}_longitude'])
+            self.df_enhanced[f'{end}_nearest_landmark'] = index.names[nearest]
+            self.df_enhanced[f'{end}_landmark_distance_km'] = distance
+            for category, flags in within.items():
+                self.df_enhanced[f'{end}_near_{category}'] = flags.astype(int)
+        
+        if 'airport' in index.categories:
+            # Airport trips follow their own fare rules (flat fares and surcharges)
+            self.df_enhanced['is_airport_trip'] = (
+                self.df_enhanced['pickup_near_airport'] | self.df_enhanced['dropoff_near_airport']
+            ).astype(int)
+        
+        print(f"\n✅ Created landmark features ({len(index.landmarks)} landmarks: "
+              f"{', '.join(f'{n} {c}' for c, n in index.landmarks['category'].value_counts().sort_index().items())}):")
+        print(f"   • pickup/dropoff_nearest_landmark")
+        print(f"   • pickup/dropoff_landmark_distance_km")
+        for category in index.categories:
+            print(f"   • pickup/dropoff_near_{category}")
+        if 'airport' in index.categories:
+            print(f"   • is_airport_trip")
+        
+        print(f"\n📊 Landmark statistics:")
+        print(f"   • Most common pickup landmarks: "
+              f"{self.df_enhanced['pickup_nearest_landmark'].value_counts().head(3).to_dict()}")
+        print(f"   • Median pickup distance to nearest landmark: "
+              f"{self.df_enhanced['pickup_landmark_distance_km'].median():.2f} km")
+        if 'airport' in index.categories:
+            airport = self.df_enhanced['is_airport_trip'] == 1
+            print(f"   • Airport trips: {airport.sum():,} ({airport.mean() * 100:.1f}%), "
+                  f"avg fare ${self.df_enhanced.loc[airport, 'fare_amount'].mean():.2f} vs "
+                  f"${self.df_enhanced.loc[~airport, 'fare_amount'].mean():.2f}")
+    
+    def create_demand_features(self, windows_minutes=DEMAND_WINDOWS_MINUTES, cell_size=DEMAND_CELL_SIZE):
+        """Rolling counts of pickups and dropoffs around each trip's pickup zone and time"""
+        print("\n" + "=" * 60)
+        print("6. CREATING DEMAND WINDOW FEATURES")
+        print("=" * 60)
+        
+        df = self.df_enhanced
+        times = epoch_seconds(df['pickup_datetime'])
+        pickup_zone = grid_zone(df['pickup_latitude'].to_numpy(), df['pickup_longitude'].to_numpy(), cell_size)
+        dropoff_zone = grid_zone(df['dropoff_latitude'].to_numpy(), df['dropoff_longitude'].to_numpy(), cell_size)
+        widths = [int(minutes) * 60 for minutes in windows_minutes]
+        
+        previous, fare_sums = window_aggregates(pickup_zone, times, pickup_zone, times, widths,
+                                                values=df['fare_amount'].to_numpy())
+        upcoming, _ = window_aggregates(pickup_zone, times, pickup_zone, times, widths, leading=True)
+        # The data has no dropoff times, so trips heading into a zone are timed by their pickup
+        inbound, _ = window_aggregates(dropoff_zone, times, pickup_zone, times, widths)
+        
+        created = []
+        for minutes, width in zip(windows_minutes, widths):
+            df[f'zone_pickups_prev_{minutes}m'] = previous[width]
+            df[f'zone_pickups_next_{minutes}m'] = upcoming[width]
+            df[f'zone_dropoffs_prev_{minutes}m'] = inbound[width]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                df[f'zone_avg_fare_prev_{minutes}m'] = np.where(previous[width] > 0,
+                                                                fare_sums[width] / previous[width], np.nan)
+            created += [f'zone_pickups_prev_{minutes}m', f'zone_pickups_next_{minutes}m',
+                        f'zone_dropoffs_prev_{minutes}m', f'zone_avg_fare_prev_{minutes}m']
+        
+        print(f"\n✅ Created demand window features ({cell_size}° zones, windows: "
+              f"{', '.join(f'{m} min' for m in windows_minutes)}):")
+        for col in created:
+            print(f"   • {col}")
+        
+        longest = max(windows_minutes)
+        busy = df[f'zone_pickups_prev_{longest}m'] > 0
+        print(f"\n📊 Demand statistics:")
+        print(f"   • Trips with another pickup in their zone in the previous {longest} min: "
+              f"{busy.sum():,} ({busy.mean() * 100:.1f}%)")
+        print(f"   • Max pickups in one zone in the previous {longest} min: "
+              f"{df[f'zone_pickups_prev_{longest}m'].max():,}")
+        if busy.any():
+            print(f"   • Avg fare with recent zone demand: ${df.loc[busy, 'fare_amount'].mean():.2f} vs "
+                  f"${df.loc[~busy, 'fare_amount'].mean():.2f} without")
+    
     def generate_feature_summary(self):
         """Generate a comprehensive feature summary"""
         print("\n" + "=" * 80)
@@ -287,26 +590,55 @@ class UberFeatureEngineer:
         print(f"   • Shape: {self.df_enhanced.shape}")
         print(f"   • Memory usage: {self.df_enhanced.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
     
-    def save_enhanced_data(self, output_path='uber_enhanced.csv'):
-        """Save the enhanced dataset"""
+    def save_enhanced_data(self, output_path='uber_enhanced.csv', partitioned=False, time_sorted=False):
+        """Save the enhanced dataset (partitioned / time_sorted: also a year/month layout / pickup-ordered store)"""
         self.df_enhanced.to_csv(output_path, index=False)
         print(f"\n💾 Enhanced dataset saved to: {output_path}")
+        if partitioned:
+            print(f"💾 Year/month partitions saved to: {write_partitioned(self.df_enhanced, output_path)}/")
+        if time_sorted:
+            print(f"💾 Time-sorted store saved to: {write_time_sorted(self.df_enhanced, output_path)}/")
         return output_path
     
-    def run_feature_engineering(self):
+    def run_feature_engineering(self, df=None):
         """Run the complete feature engineering pipeline"""
-        self.load_cleaned_data()
+        self.load_cleaned_data(df)
         self.extract_temporal_features()
         self.calculate_distance_features()
         self.create_location_features()
         self.create_passenger_features()
+        self.create_landmark_features()
+        self.create_demand_features()
         self.generate_feature_summary()
         
         return self.df_enhanced
 
 def main():
     """Main function to run feature engineering"""
-    engineer = UberFeatureEngineer('uber_cleaned.csv')
+    parser = argparse.ArgumentParser(description='Feature engineering for the cleaned Uber dataset')
+    parser.add_argument('--data', default='uber_cleaned.csv', help='Cleaned dataset')
+    parser.add_argument('--landmarks', default=None, help='Landmark CSV (name, category, latitude, longitude, '
+                                                          'radius_km) instead of the built-in table')
+    parser.add_argument('--check-landmarks', action='store_true',
+                        help='Only compare the landmark index with a brute-force haversine scan')
+    args = parser.parse_args()
+
+    if args.check_landmarks:
+        print("=" * 80)
+        print("LANDMARK INDEX CHECK")
+        print("=" * 80)
+        tables = {'built-in': None, 'mixed radii': MIXED_RADIUS_LANDMARKS}
+        if args.landmarks:
+            tables[args.landmarks] = args.landmarks
+        for label, landmarks in tables.items():
+            report = check_landmark_index(landmarks)
+            ok = report['nearest_mismatches'] == 0 and not any(report['flag_mismatches'].values())
+            print(f"\n{'✅' if ok else '❌'} {label}: nearest mismatches {report['nearest_mismatches']}, "
+                  f"max distance error {report['max_distance_error_km'] * 1000:.3g} m, "
+                  f"flag mismatches {report['flag_mismatches']}")
+        return None
+
+    engineer = UberFeatureEngineer(args.data, args.landmarks)
     enhanced_df = engineer.run_feature_engineering()
     output_file = engineer.save_enhanced_data()
     
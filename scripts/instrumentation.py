@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Method-Level Instrumentation: JSON Timing/Memory/IO Events and Opt-In Per-Stage Profiles
+"""
+
+import argparse
+import cProfile
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+import pandas as pd
+
+class PeakRSSMeter:
+    """
+    Peak resident set size of the current process
+
+    On Linux the kernel high-water mark is reset before each method by
+    writing to /proc/self/clear_refs, so every reading is the peak of that
+    method alone. Elsewhere the reading is the process-lifetime peak.
+    """
+
+    def __init__(self):
+        """Detect whether per-method peaks are available"""
+        self.resettable = os.path.exists('/proc/self/clear_refs')
+
+    def reset(self):
+        """Restart peak tracking at the current RSS"""
+        if self.resettable:
+            try:
+                with open('/proc/self/clear_refs', 'w') as f:
+                    f.write('5')
+            except OSError:
+                self.resettable = False
+
+    def peak_mb(self):
+        """Peak RSS in MB since the last reset"""
+        if self.resettable:
+            with open('/proc/self/status') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1]) / 1024
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+def io_counters():
+    """(bytes read, bytes written) by this process through read/write calls, or (None, None)"""
+    try:
+        with open('/proc/self/io') as f:
+            fields = dict(line.split(':') for line in f)
+        return int(fields['rchar']), int(fields['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+class SamplingProfiler:
+    """
+    Samples the profiled thread's Python stack every interval_ms from a helper thread
+
+    Output is in folded-stack format (one 'outer;inner count' line per
+    distinct stack), which flamegraph tools read directly.
+    """
+
+    def __init__(self, interval_ms=5):
+        """Initialize the profiler"""
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        """Sampling loop"""
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def enable(self):
+        """Start sampling the calling thread"""
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def disable(self):
+        """Stop sampling"""
+        self._stop.set()
+        self._thread.join()
+
+    def dump_stats(self, path):
+        """Write folded stacks"""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class _InstrumentationState:
+    """Process-wide configuration; sink is None while instrumentation is disabled"""
+
+    def __init__(self):
+        self.sink = None
+        self.profile = None
+        self.profile_dir = None
+        self.meter = PeakRSSMeter()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+_state = _InstrumentationState()
+
+def configure(events_path=None, profile=None, profile_dir='profiles'):
+    """
+    Enable instrumentation: events go to events_path as JSON lines ('-' for stderr)
+
+    profile is None, 'deterministic' (cProfile) or 'sampling'; a profile is
+    captured for every top-level (stage) method call and written to profile_dir.
+    Calling configure() with no events_path disables instrumentation again.
+    """
+    if _state.sink not in (None, sys.stderr):
+        _state.sink.close()
+    if profile not in (None, 'deterministic', 'sampling'):
+        raise ValueError(f"Unknown profile mode {profile}; use 'deterministic' or 'sampling'")
+    _state.sink = None if events_path is None else (sys.stderr if events_path == '-' else open(events_path, 'a'))
+    _state.profile = profile
+    _state.profile_dir = profile_dir
+    if profile:
+        os.makedirs(profile_dir, exist_ok=True)
+
+def configure_from_env():
+    """Enable instrumentation from UBER_INSTRUMENT (events path) and UBER_PROFILE (profile mode)"""
+    if os.environ.get('UBER_INSTRUMENT'):
+        configure(os.environ['UBER_INSTRUMENT'], os.environ.get('UBER_PROFILE') or None,
+                  os.environ.get('UBER_PROFILE_DIR', 'profiles'))
+
+def emit(event):
+    """Write one JSON event if instrumentation is enabled"""
+    if _state.sink is None:
+        return
+    with _state.lock:
+        _state.sink.write(json.dumps(event) + '\n')
+        _state.sink.flush()
+
+def _rows(instance, attr, value=None):
+    """Row count of the instance's working frame (or of a returned frame)"""
+    frame = getattr(instance, attr, None) if attr else None
+    if not isinstance(frame, pd.DataFrame) and isinstance(value, pd.DataFrame):
+        frame = value
+    return len(frame) if isinstance(frame, pd.DataFrame) else None
+
+def _instrument_method(cls_name, method, rows_attr):
+    """Wrap one method; the disabled path is a single global check"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if _state.sink is None:
+            return method(self, *args, **kwargs)
+
+        stack = _state.local.__dict__.setdefault('stack', [])
+        depth = len(stack)
+        if stack:
+            # The meter is about to be reset, so bank the caller's peak so far
+            stack[-1] = max(stack[-1], _state.meter.peak_mb())
+        stack.append(0.0)  # Peak of nested calls, folded into this call's peak
+        profiler = None
+        if depth == 0 and _state.profile:
+            profiler = cProfile.Profile() if _state.profile == 'deterministic' else SamplingProfiler()
+            profiler.enable()
+
+        rows_in = _rows(self, rows_attr)
+        read_before, written_before = io_counters()
+        _state.meter.reset()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        error, result = None, None
+        try:
+            result = method(self, *args, **kwargs)
+            return result
+        except Exception as e:
+            error, result = repr(e), None
+            raise
+        finally:
+            wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+            peak = max(_state.meter.peak_mb(), stack.pop())
+            if stack:
+                stack[-1] = max(stack[-1], peak)
+            read_after, written_after = io_counters()
+            event = {
+                'event': 'method',
+                'timestamp': time.time(),
+                'class': cls_name,
+                'method': method.__name__,
+                'depth': depth,
+                'wall_s': wall,
+                'cpu_s': cpu,
+                'peak_rss_mb': peak,
+                'rows_in': rows_in,
+                'rows_out': _rows(self, rows_attr, result),
+                'bytes_read': None if read_before is None else read_after - read_before,
+                'bytes_written': None if written_before is None else written_after - written_before,
+            }
+            if error:
+                event['error'] = error
+            if profiler is not None:
+                profiler.disable()
+                extension = 'prof' if _state.profile == 'deterministic' else 'folded'
+                path = os.path.join(_state.profile_dir, f"{cls_name}.{method.__name__}.{extension}")
+                profiler.dump_stats(path)
+                event['profile'] = path
+            emit(event)
+
+    return wrapper
+
+def instrumented(rows_attr='df', exclude=()):
+    """
+    Class decorator: instrument every public method of the class not in exclude
+
+    rows_attr names the instance attribute holding the working DataFrame,
+    used for the rows in/out of each call.
+    """
+    def decorate(cls):
+        for name, member in list(vars(cls).items()):
+            if (callable(member) and not isinstance(member, (staticmethod, classmethod))
+                    and not name.startswith('_') and name not in exclude):
+                setattr(cls, name, _instrument_method(cls.__name__, member, rows_attr))
+        return cls
+    return decorate
+
+def summarize_events(events_path, top=15):
+    """Print the slowest top-level and nested calls from an events file"""
+    events = pd.read_json(events_path, lines=True)
+    events = events[events['event'] == 'method']
+
+    print("=" * 80)
+    print("INSTRUMENTATION SUMMARY")
+    print("=" * 80)
+    print(f"\n📊 {len(events):,} method events from {events_path}")
+    for depth, label in ((0, 'Stages (top-level calls)'), (None, 'Slowest methods')):
+        subset = events[events['depth'] == depth] if depth is not None else events
+        print(f"\n⏱️ {label}:")
+        for row in subset.nlargest(top, 'wall_s').to_dict('records'):
+            rows = '' if pd.isna(row['rows_in']) else f", rows {int(row['rows_in']):,} -> {int(row['rows_out']):,}"
+            print(f"   • {row['class']}.{row['method']}: {row['wall_s']:.3f}s wall, {row['cpu_s']:.3f}s CPU, "
+                  f"{row['peak_rss_mb']:.0f} MB peak{rows}")
+
+def main():
+    """Main function to summarize an events file"""
+    parser = argparse.ArgumentParser(description='Summarize instrumentation events')
+    parser.add_argument('events', help='JSON-lines events file written with UBER_INSTRUMENT or --instrument')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+    summarize_events(args.events, args.top)
+
+configure_from_env()
+
+if __name__ == "__main__":
+    main()
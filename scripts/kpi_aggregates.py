@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Incremental KPI and Aggregation Refresh from Per-Day Partial Aggregates
+"""
+
+import argparse
+import os
+import time
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+class PartialAggregateStore:
+    """
+    Mergeable per-(day, hour, pickup borough) counts and sums
+
+    Fares are kept in integer cents and distances in integer millimetres so
+    that sums are exact: merging partials in any order gives exactly the
+    same totals as aggregating the full frame at once.
+    """
+
+    KEYS = ['pickup_year', 'pickup_month', 'pickup_day', 'pickup_hour', 'day_of_week', 'pickup_borough']
+    SUMS = ['rides_count', 'fare_cents', 'distance_mm', 'passengers', 'inter_borough_rides']
+
+    def __init__(self, partials=None):
+        """Initialize the store, optionally from an existing partials table"""
+        self.partials = partials if partials is not None else pd.DataFrame(columns=self.KEYS + self.SUMS)
+
+    @classmethod
+    def partials_from_frame(cls, df):
+        """Partial aggregates for an enhanced trip frame"""
+        keyed = df[cls.KEYS].assign(
+            rides_count=1,
+            fare_cents=np.round(df['fare_amount'].to_numpy() * 100).astype(np.int64),
+            distance_mm=np.round(df['trip_distance_km'].to_numpy() * 1e6).astype(np.int64),
+            passengers=df['passenger_count'].astype(np.int64),
+            inter_borough_rides=df['is_inter_borough'].astype(np.int64),
+        )
+        # observed=True: categorical keys (column cache) group like text keys
+        return keyed.groupby(cls.KEYS, sort=True, as_index=False, observed=True)[cls.SUMS].sum()
+
+    @classmethod
+    def from_frame(cls, df):
+        """Store built from a full enhanced frame"""
+        return cls(cls.partials_from_frame(df))
+
+    @classmethod
+    def load(cls, path):
+        """Load partials saved with save()"""
+        return cls(pd.read_csv(path))
+
+    def save(self, path):
+        """Save partials as CSV"""
+        self.partials.to_csv(path, index=False)
+        return path
+
+    def add(self, df_new):
+        """Fold new trips in; days already present are replaced, not double counted"""
+        new_partials = self.partials_from_frame(df_new)
+        day_keys = ['pickup_year', 'pickup_month', 'pickup_day']
+        new_days = new_partials[day_keys].drop_duplicates()
+        if self.partials.empty:
+            self.partials = new_partials
+            return len(new_days)
+        existing = self.partials.merge(new_days, on=day_keys, how='left', indicator=True)
+        kept = self.partials[(existing['_merge'] == 'left_only').to_numpy()]
+        self.partials = (pd.concat([kept, new_partials], ignore_index=True)
+                         .sort_values(self.KEYS, kind='stable').reset_index(drop=True))
+        return len(new_days)
+
+    def merge(self, new_partials):
+        """Add partials of newly streamed trips to the stored ones (same keys are summed, not replaced)"""
+        if len(new_partials) == 0:
+            return 0
+        combined = new_partials if self.partials.empty else pd.concat([self.partials, new_partials], ignore_index=True)
+        self.partials = combined.groupby(self.KEYS, sort=True, as_index=False, observed=True)[self.SUMS].sum()
+        return len(new_partials)
+
+    def _grouped(self, key):
+        """Exact sums per key"""
+        return self.partials.groupby(key, observed=True)[self.SUMS].sum()
+
+    def _aggregation(self, key):
+        """Tableau aggregation table (same layout as the full-frame groupby)"""
+        sums = self._grouped(key)
+        rides = sums['rides_count']
+        agg = pd.DataFrame({
+            'rides_count': rides,
+            'avg_fare': sums['fare_cents'] / 100 / rides,
+            'total_revenue': sums['fare_cents'] / 100,
+            'avg_distance': sums['distance_mm'] / 1e6 / rides,
+            'avg_passengers': sums['passengers'] / rides,
+        }).round(2)
+        return agg
+
+    def hourly_aggregation(self):
+        """Metrics per pickup hour"""
+        return self._aggregation('pickup_hour')
+
+    def daily_aggregation(self):
+        """Metrics per day of week"""
+        return self._aggregation('day_of_week')
+
+    def borough_aggregation(self):
+        """Metrics per pickup borough"""
+        return self._aggregation('pickup_borough')
+
+    def kpi_summary(self):
+        """Key performance indicators in the uber_kpi_summary.csv layout"""
+        totals = self.partials[self.SUMS].sum()
+        total_rides = int(totals['rides_count'])
+        total_revenue = totals['fare_cents'] / 100
+        avg_fare = total_revenue / total_rides
+        avg_distance = totals['distance_mm'] / 1e6 / total_rides
+        avg_duration = avg_distance / 25 * 60  # Assuming 25 km/h average speed
+
+        busiest_hour = self._grouped('pickup_hour')['rides_count'].idxmax()
+        busiest_day = self._grouped('day_of_week')['rides_count'].idxmax()
+        peak_month = self._grouped('pickup_month')['rides_count'].idxmax()
+        top_borough = self._grouped('pickup_borough')['rides_count'].sort_values(ascending=False, kind='stable').index[0]
+        inter_borough_pct = totals['inter_borough_rides'] / total_rides * 100
+
+        return pd.DataFrame({
+            'Metric': [
+                'Total Rides', 'Total Revenue', 'Average Fare', 'Average Distance',
+                'Average Duration (min)', 'Busiest Hour', 'Busiest Day', 'Peak Month',
+                'Top Borough', 'Inter-Borough Trips (%)'
+            ],
+            'Value': [
+                f"{total_rides:,}",
+                f"${total_revenue:,.2f}",
+                f"${avg_fare:.2f}",
+                f"{avg_distance:.2f} km",
+                f"{avg_duration:.1f}",
+                f"{busiest_hour}:00",
+                busiest_day,
+                f"Month {peak_month}",
+                top_borough,
+                f"{inter_borough_pct:.1f}%"
+            ]
+        })
+
+    def write_outputs(self, output_dir='.'):
+        """Write the KPI summary and the three aggregation files"""
+        outputs = {
+            'uber_kpi_summary.csv': self.kpi_summary(),
+            'uber_hourly_aggregation.csv': self.hourly_aggregation().reset_index(),
+            'uber_daily_aggregation.csv': self.daily_aggregation().reset_index(),
+            'uber_borough_aggregation.csv': self.borough_aggregation().reset_index(),
+        }
+        for name, frame in outputs.items():
+            frame.to_csv(os.path.join(output_dir, name), index=False)
+        return list(outputs)
+
+def main():
+    """Main function to fold new days of enhanced trips into the stored partials"""
+    parser = argparse.ArgumentParser(description='Incremental KPI and aggregation refresh')
+    parser.add_argument('new_data', help='Enhanced CSV with the new day(s) of trips')
+    parser.add_argument('--partials', default='uber_partial_aggregates.csv')
+    parser.add_argument('--output-dir', default='.')
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("UBER FARES DATASET - INCREMENTAL KPI REFRESH")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    store = PartialAggregateStore.load(args.partials) if os.path.exists(args.partials) else PartialAggregateStore()
+    df_new = pd.read_csv(args.new_data, usecols=PartialAggregateStore.KEYS + [
+        'fare_amount', 'trip_distance_km', 'passenger_count', 'is_inter_borough'
+    ])
+    days_added = store.add(df_new)
+    store.save(args.partials)
+    written = store.write_outputs(args.output_dir)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n✅ Folded {len(df_new):,} trips ({days_added} days) into {len(store.partials):,} partial rows "
+          f"in {elapsed:.2f}s")
+    for name in written:
+        print(f"   • {name}")
+
+    print(f"\n📊 Key Performance Indicators:")
+    for metric, value in store.kpi_summary().itertuples(index=False):
+        print(f"   • {metric}: {value}")
+
+if __name__ == "__main__":
+    main()
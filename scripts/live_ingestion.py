@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+"""
+Live Trip Ingestion: Micro-Batched Cleaning and Features with Continuously Published KPIs
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import pandas as pd
+import numpy as np
+from data_cleaning import MAX_REASONABLE_FARE, clean_trip_batch, fare_bounds
+from feature_engineering import UberFeatureEngineer, epoch_seconds
+from kpi_aggregates import PartialAggregateStore
+import warnings
+warnings.filterwarnings('ignore')
+
+SOURCE_KINDS = ('file', 'socket', 'fifo')
+
+# Raw columns parsed as numbers; unparseable values become NaN and fail the cleaning rules
+NUMERIC_COLUMNS = ['fare_amount', 'pickup_longitude', 'pickup_latitude', 'dropoff_longitude',
+                   'dropoff_latitude', 'passenger_count']
+
+# Raw columns the cleaning rules read; a stream whose header lacks any of them is refused
+RAW_COLUMNS = ['pickup_datetime'] + NUMERIC_COLUMNS
+
+# Feature steps the KPIs need; each works row by row, so micro-batches get the batch results
+FEATURE_STEPS = ['extract_temporal_features', 'calculate_distance_features', 'create_location_features',
+                 'create_passenger_features']
+
+READ_SIZE = 1 << 16
+
+def parse_source(spec):
+    """'file:PATH', 'socket:PATH' or 'fifo:PATH' -> (kind, path); a bare path is a file"""
+    kind, sep, path = spec.partition(':')
+    if not sep or kind not in SOURCE_KINDS:
+        return 'file', spec
+    return kind, path
+
+def reference_fare_bounds(data_path):
+    """Fare bounds the batch cleaner would derive from a raw CSV"""
+    fares = pd.read_csv(data_path, usecols=['fare_amount', 'dropoff_longitude', 'dropoff_latitude'])
+    return fare_bounds(fares.dropna(subset=['dropoff_longitude', 'dropoff_latitude'])['fare_amount'])
+
+class LiveTripIngestor:
+    """
+    Consume raw trip records from a local source and keep the KPI outputs live
+
+    Sources are CSV streams in the uber.csv layout, each starting with its
+    header line: a followed file (like tail -f), a Unix socket (one stream per
+    connection) or a named pipe. The event loop only does I/O; micro-batches
+    are cleaned, featurized and aggregated on one worker thread, which also
+    publishes the snapshots, so the aggregates never need a lock.
+
+    Each status also reports the staleness of the snapshot: seconds from
+    reading the oldest record it newly includes to publishing it.
+
+    A record is late when its pickup time is older than the watermark, the
+    newest pickup time seen before it minus the allowed lateness. Late
+    records are counted and dropped; anything newer is folded in even when
+    it arrives out of order. Snapshots replace the KPI summary and the
+    hourly, daily and borough aggregation files atomically, next to a status
+    file with the watermark and the ingest counters.
+    """
+
+    def __init__(self, source='file:uber_live_trips.csv', output_dir='live_kpis',
+                 bounds=(-np.inf, MAX_REASONABLE_FARE), allowed_lateness='1h', snapshot_interval=1.0,
+                 max_batch_rows=5000, max_wait_ms=50.0, poll_interval=0.05, follow=True):
+        """Initialize the ingestor"""
+        self.kind, self.path = parse_source(source)
+        self.output_dir = output_dir
+        self.bounds = bounds
+        self.lateness_s = int(pd.Timedelta(allowed_lateness).total_seconds())
+        self.snapshot_interval = snapshot_interval
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self.poll_interval = poll_interval
+        self.follow = follow
+
+        self.store = PartialAggregateStore()
+        self.pending = []
+        self.columns = None
+        self.newest_event_s = None
+        self.queue = None
+        self.worker = ThreadPoolExecutor(max_workers=1)
+        self.server = None
+        self.tasks = []
+
+        self.records_read = 0
+        self.records_applied = 0
+        self.trips_accepted = 0
+        self.dirty_dropped = 0
+        self.late_dropped = 0
+        self.failed_dropped = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.first_read = None
+        self.last_applied = None
+        self.unpublished_since = None
+        self.snapshots = []
+
+    async def _put(self, lines, name):
+        """Queue the data lines of one read (waits while the queue is full)"""
+        lines = [line.rstrip(b'\r') for line in lines if line.strip()]
+        if not lines:
+            return
+        now = time.perf_counter()
+        if self.first_read is None:
+            self.first_read = now
+        self.records_read += len(lines)
+        await self.queue.put((now, lines))
+
+    def _accept_header(self, header, name):
+        """Take the first stream's header as the record layout; streams with another layout are refused"""
+        columns = header.decode('utf-8').strip().split(',')
+        if self.columns is None:
+            missing = [col for col in RAW_COLUMNS if col not in columns]
+            if missing:
+                print(f"⚠️  {name}: header {columns} lacks {missing} - stream ignored")
+                return False
+            self.columns = columns
+        elif columns != self.columns:
+            print(f"⚠️  {name}: header {columns} differs from {self.columns} - stream ignored")
+            return False
+        return True
+
+    async def _consume(self, read, name):
+        """Split a byte stream into lines; its first line is the header, the rest are queued"""
+        carry = b''
+        header = None
+        while True:
+            data = await read()
+            if not data:
+                break
+            lines = (carry + data).split(b'\n')
+            carry = lines.pop()
+            if header is None and lines:
+                header = lines.pop(0)
+                if not self._accept_header(header, name):
+                    return
+            await self._put(lines, name)
+        if header is not None:
+            await self._put([carry], name)
+
+    async def _tail_file(self):
+        """Follow a growing file from its start; without follow, stop at its end"""
+        while not os.path.exists(self.path):
+            await asyncio.sleep(self.poll_interval)
+        with open(self.path, 'rb') as f:
+            async def read():
+                while True:
+                    data = f.read(READ_SIZE)
+                    if data or not self.follow:
+                        return data
+                    await asyncio.sleep(self.poll_interval)
+            await self._consume(read, self.path)
+
+    async def _handle_connection(self, reader, writer):
+        """One socket connection is one stream"""
+        try:
+            await self._consume(lambda: reader.read(READ_SIZE), f'socket {self.path}')
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_fifo(self):
+        """Read a named pipe (created if missing), reopening it for each new writer"""
+        if not os.path.exists(self.path):
+            os.mkfifo(self.path)
+        loop = asyncio.get_running_loop()
+        while True:
+            # Opening blocks until a writer appears, so it runs off the event loop
+            fd = await loop.run_in_executor(None, os.open, self.path, os.O_RDONLY)
+            reader = asyncio.StreamReader()
+            transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader),
+                                                        os.fdopen(fd, 'rb', buffering=0))
+            try:
+                await self._consume(lambda: reader.read(READ_SIZE), f'fifo {self.path}')
+            finally:
+                transport.close()
+            if not self.follow:
+                break
+
+    async def _batches(self):
+        """Gather queued reads into micro-batches and apply each on the worker thread"""
+        loop = asyncio.get_running_loop()
+        while True:
+            chunks = [await self.queue.get()]
+            rows = len(chunks[0][1])
+            deadline = loop.time() + self.max_wait
+            while rows < self.max_batch_rows:
+                if self.queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        chunks.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    chunks.append(self.queue.get_nowait())
+                rows += len(chunks[-1][1])
+            try:
+                await loop.run_in_executor(self.worker, self._apply, chunks)
+            except Exception as e:
+                self._drop_batch(chunks, e)
+
+    def _drop_batch(self, chunks, error):
+        """Count the records of a micro-batch that failed to apply, so ingestion goes on without it"""
+        records = sum(len(chunk) for _, chunk in chunks)
+        self.records_applied += records
+        self.failed_dropped += records
+        self.failed_batches += 1
+        print(f"⚠️  Micro-batch of {records:,} records failed and was dropped: {type(error).__name__}: {error}")
+
+    def _apply(self, chunks):
+        """Clean, featurize and aggregate one micro-batch (worker thread)"""
+        lines = [line for _, chunk in chunks for line in chunk]
+        raw = pd.read_csv(io.BytesIO(b'\n'.join(lines)), names=self.columns, header=None, on_bad_lines='skip')
+        raw = raw.assign(**{col: pd.to_numeric(raw[col], errors='coerce')
+                            for col in NUMERIC_COLUMNS if col in raw.columns and raw[col].dtype == object})
+        cleaned = clean_trip_batch(raw, self.bounds)
+
+        # Watermark of each record: the newest pickup seen up to it (in arrival order) minus the lateness
+        times = epoch_seconds(cleaned['pickup_datetime'])
+        newest = np.maximum.accumulate(times)
+        if self.newest_event_s is not None:
+            newest = np.maximum(newest, self.newest_event_s)
+        late = times < newest - self.lateness_s
+        if len(times):
+            self.newest_event_s = int(newest[-1])
+        on_time = cleaned[~late]
+
+        if len(on_time):
+            engineer = UberFeatureEngineer()
+            with contextlib.redirect_stdout(io.StringIO()):
+                engineer.load_cleaned_data(on_time.reset_index(drop=True))
+                for step in FEATURE_STEPS:
+                    getattr(engineer, step)()
+            # Partials are merged into the store at the next snapshot
+            self.pending.append(PartialAggregateStore.partials_from_frame(engineer.df_enhanced))
+
+        self.records_applied += len(lines)
+        self.trips_accepted += len(on_time)
+        self.dirty_dropped += len(lines) - len(cleaned)
+        self.late_dropped += int(late.sum())
+        self.batches += 1
+        self.last_applied = time.perf_counter()
+        if self.unpublished_since is None:
+            self.unpublished_since = chunks[0][0]
+
+    def watermark(self):
+        """Current watermark as a UTC timestamp, or None before the first trip"""
+        if self.newest_event_s is None:
+            return None
+        return pd.Timestamp(self.newest_event_s - self.lateness_s, unit='s', tz='UTC')
+
+    def ingest_rate(self):
+        """Records applied per second since the first read"""
+        if self.first_read is None or self.last_applied is None or self.last_applied <= self.first_read:
+            return 0.0
+        return self.records_applied / (self.last_applied - self.first_read)
+
+    def _finalized_days(self):
+        """Days whose end is behind the watermark, so no later record can change them"""
+        if self.store.partials.empty or self.newest_event_s is None:
+            return 0
+        days = self.store.partials[['pickup_year', 'pickup_month', 'pickup_day']].drop_duplicates()
+        day_end = pd.to_datetime(days.rename(columns={'pickup_year': 'year', 'pickup_month': 'month',
+                                                      'pickup_day': 'day'})) + pd.Timedelta(days=1)
+        return int((day_end.to_numpy('datetime64[s]').astype(np.int64)
+                    <= self.newest_event_s - self.lateness_s).sum())
+
+    def _write_atomically(self, name, write):
+        """Write one output through a temporary file renamed over the published one"""
+        temp_path = os.path.join(self.output_dir, f'.{name}.tmp')
+        write(temp_path)
+        os.replace(temp_path, os.path.join(self.output_dir, name))
+
+    def _publish(self, final=False):
+        """Merge pending partials and replace the published snapshot (worker thread)"""
+        if self.snapshots and self.unpublished_since is None and not final:
+            return None
+        if self.pending:
+            self.store.merge(pd.concat(self.pending, ignore_index=True))
+            self.pending = []
+
+        if not self.store.partials.empty:
+            outputs = {
+                'uber_kpi_summary.csv': self.store.kpi_summary(),
+                'uber_hourly_aggregation.csv': self.store.hourly_aggregation().reset_index(),
+                'uber_daily_aggregation.csv': self.store.daily_aggregation().reset_index(),
+                'uber_borough_aggregation.csv': self.store.borough_aggregation().reset_index(),
+            }
+            for name, frame in outputs.items():
+                self._write_atomically(name, lambda path, frame=frame: frame.to_csv(path, index=False))
+
+        now = time.perf_counter()
+        staleness = None if self.unpublished_since is None else now - self.unpublished_since
+        watermark = self.watermark()
+        status = {
+            'published_at': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'records_read': self.records_read,
+            'records_applied': self.records_applied,
+            'trips_accepted': self.trips_accepted,
+            'dirty_dropped': self.dirty_dropped,
+            'late_dropped': self.late_dropped,
+            'failed_dropped': self.failed_dropped,
+            'batches': self.batches,
+            'failed_batches': self.failed_batches,
+            'watermark': watermark.isoformat() if watermark is not None else None,
+            'allowed_lateness_s': self.lateness_s,
+            'finalized_days': self._finalized_days(),
+            'ingest_rate_per_s': round(self.ingest_rate(), 1),
+            'staleness_s': None if staleness is None else round(staleness, 3),
+        }
+
+        def write_status(path):
+            with open(path, 'w') as f:
+                json.dump(status, f, indent=2)
+        self._write_atomically('uber_live_status.json', write_status)
+
+        self.unpublished_since = None
+        self.snapshots.append((time.perf_counter(), self.records_applied))
+        print(f"📡 Snapshot {len(self.snapshots)}: {self.trips_accepted:,} trips, "
+              f"{self.dirty_dropped:,} dirty, {self.late_dropped:,} late, watermark {status['watermark']}, "
+              f"{status['ingest_rate_per_s']:,.0f} records/s")
+        return status
+
+    async def _snapshots(self):
+        """Publish a snapshot every snapshot_interval seconds"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            await loop.run_in_executor(self.worker, self._publish)
+
+    async def start(self):
+        """Open the source and start the batching and snapshot tasks"""
+        print("=" * 80)
+        print("UBER FARES DATASET - LIVE TRIP INGESTION")
+        print("=" * 80)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.queue = asyncio.Queue(maxsize=256)
+        if self.kind == 'socket':
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self.server = await asyncio.start_unix_server(self._handle_connection, path=self.path)
+        elif self.kind == 'fifo':
+            self.tasks.append(asyncio.create_task(self._read_fifo()))
+        else:
+            self.tasks.append(asyncio.create_task(self._tail_file()))
+        self.tasks.append(asyncio.create_task(self._batches()))
+        self.tasks.append(asyncio.create_task(self._snapshots()))
+
+        print(f"\n🚀 Ingesting from {self.kind} {self.path}")
+        print(f"   • Micro-batches: up to {self.max_batch_rows:,} records or {self.max_wait * 1000:.0f} ms")
+        print(f"   • Allowed lateness: {self.lateness_s:,}s, fare bounds: "
+              f"[{self.bounds[0]:.2f}, {self.bounds[1]:.2f}]")
+        print(f"   • Snapshots every {self.snapshot_interval}s to {self.output_dir}/")
+
+    async def drain(self, records):
+        """Wait until the given number of records has been read and applied"""
+        while self.records_applied < records:
+            await asyncio.sleep(0.005)
+
+    async def stop(self):
+        """Stop reading and publish a final snapshot"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.kind == 'fifo':
+            # Release a reader still blocked opening the pipe
+            with contextlib.suppress(OSError):
+                os.close(os.open(self.path, os.O_WRONLY | os.O_NONBLOCK))
+        for task in self.tasks:
+            task.cancel()
+        for task in self.tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self.tasks = []
+        await asyncio.get_running_loop().run_in_executor(self.worker, self._publish, True)
+        self.worker.shutdown()
+
+    async def serve_forever(self):
+        """Ingest until cancelled"""
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+class SyntheticTripReplay:
+    """
+    Feed generated raw trips into a live source at a target rate, some of them late
+
+    Trips come from SyntheticTripGenerator, dirty rows included, in pickup
+    order. A share of them is held back by a random event-time delay of up to
+    twice the allowed lateness; those overtaken by trips more than the
+    allowed lateness newer arrive behind the watermark.
+    """
+
+    def __init__(self, n_trips=200_000, rate=50_000, late_share=0.01, allowed_lateness='1h', seed=42):
+        """Initialize the replay (rate 0 sends as fast as the source accepts)"""
+        self.n_trips = n_trips
+        self.rate = rate
+        self.late_share = late_share
+        self.lateness_s = int(pd.Timedelta(allowed_lateness).total_seconds())
+        self.seed = seed
+        self.frame = None
+        self.marks = []
+
+    def records(self):
+        """Header line and data lines (bytes with newlines) in arrival order"""
+        from synthetic_trips import SyntheticTripGenerator
+
+        frame = SyntheticTripGenerator(seed=self.seed).generate_frame(self.n_trips)
+        rng = np.random.default_rng(self.seed)
+        times = pd.to_datetime(frame['pickup_datetime'], errors='coerce').fillna(pd.Timestamp(0, tz='UTC'))
+        delay = np.where(rng.random(len(frame)) < self.late_share,
+                         rng.uniform(0, 2 * self.lateness_s, len(frame)), 0.0)
+        self.frame = frame.iloc[np.argsort(epoch_seconds(times) + delay, kind='stable')]
+        lines = self.frame.to_csv(index=False).encode('utf-8').splitlines(keepends=True)
+        return lines[0], lines[1:]
+
+    async def _open(self, kind, path):
+        """(write coroutine, close function) for the sink"""
+        loop = asyncio.get_running_loop()
+        if kind == 'socket':
+            _, writer = await asyncio.open_unix_connection(path)
+        elif kind == 'fifo':
+            fd = await loop.run_in_executor(None, os.open, path, os.O_WRONLY)
+            transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin,
+                                                                os.fdopen(fd, 'wb', buffering=0))
+            writer = asyncio.StreamWriter(transport, protocol, None, loop)
+        else:
+            f = open(path, 'ab')
+
+            async def write_file(data):
+                f.write(data)
+                f.flush()
+            return write_file, f.close
+
+        async def write_stream(data):
+            writer.write(data)
+            await writer.drain()
+        return write_stream, writer.close
+
+    async def send(self, kind, path, header, lines):
+        """Write the header and lines at the target rate, recording (send time, lines sent)"""
+        loop = asyncio.get_running_loop()
+        write, close = await self._open(kind, path)
+        step = max(1, int(self.rate * 0.01)) if self.rate else 5000
+        try:
+            await write(header)
+            start = loop.time()
+            sent = 0
+            while sent < len(lines):
+                if self.rate:
+                    delay = start + sent / self.rate - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                block = lines[sent:sent + step]
+                await write(b''.join(block))
+                sent += len(block)
+                self.marks.append((time.perf_counter(), sent))
+                if not self.rate:
+                    await asyncio.sleep(0)
+        finally:
+            close()
+        return self.marks
+
+def replay_lags(marks, snapshots):
+    """Seconds from each sent block to the first snapshot including it, one value per record"""
+    publish_times = np.array([t for t, _ in snapshots])
+    published = np.array([n for _, n in snapshots])
+    sent_times = np.array([t for t, _ in marks])
+    sent_counts = np.array([n for _, n in marks])
+    first = np.searchsorted(published, sent_counts, side='left')
+    included = first < len(published)
+    block_sizes = np.diff(np.r_[0, sent_counts])
+    return np.repeat(publish_times[first[included]] - sent_times[included], block_sizes[included])
+
+async def run_replay(args):
+    """Replay synthetic trips into an in-process ingestor and report throughput and lag"""
+    replay = SyntheticTripReplay(args.trips, args.rate, args.late_share, args.lateness, args.seed)
+    header, lines = replay.records()
+    if args.reference:
+        bounds = reference_fare_bounds(args.reference)
+    else:
+        # Without a reference, judge fares like a batch run over the replayed trips would
+        raw = replay.frame.dropna(subset=['dropoff_longitude', 'dropoff_latitude'])
+        bounds = fare_bounds(raw['fare_amount'])
+
+    kind, path = parse_source(args.source)
+    if kind == 'file' and os.path.exists(path):
+        os.remove(path)
+    ingestor = LiveTripIngestor(args.source, args.output_dir, bounds, args.lateness, args.snapshot_interval,
+                                args.max_batch_rows, args.max_wait_ms)
+    await ingestor.start()
+
+    print(f"\n🎬 Replaying {len(lines):,} synthetic trips at "
+          f"{f'{args.rate:,} records/s' if args.rate else 'full speed'} ({args.late_share * 100:.1f}% delayed)")
+    start = time.perf_counter()
+    marks = await replay.send(kind, path, header, lines)
+    send_s = time.perf_counter() - start
+    await ingestor.drain(len(lines))
+    await ingestor.stop()
+    total_s = time.perf_counter() - start
+
+    lags = replay_lags(marks, ingestor.snapshots)
+    print("\n" + "=" * 60)
+    print("REPLAY SUMMARY")
+    print("=" * 60)
+    print(f"\n📊 Records:")
+    print(f"   • Sent: {len(lines):,} in {send_s:.2f}s ({len(lines) / max(send_s, 1e-9):,.0f} records/s offered)")
+    print(f"   • Accepted: {ingestor.trips_accepted:,}, dirty dropped: {ingestor.dirty_dropped:,}, "
+          f"late dropped: {ingestor.late_dropped:,}, failed batches dropped: {ingestor.failed_dropped:,}")
+    batches = ingestor.batches + ingestor.failed_batches
+    print(f"   • Micro-batches: {batches:,} ({ingestor.failed_batches:,} failed, "
+          f"avg {ingestor.records_applied / max(batches, 1):,.0f} records)")
+    print(f"\n⏱️ Throughput and lag:")
+    print(f"   • Sustained ingest: {ingestor.ingest_rate():,.0f} records/s ({total_s:.2f}s end to end)")
+    if len(lags):
+        print(f"   • Send-to-snapshot lag: p50 {np.percentile(lags, 50):.2f}s, p95 {np.percentile(lags, 95):.2f}s, "
+              f"max {lags.max():.2f}s (snapshot interval {args.snapshot_interval}s)")
+    print(f"   • Snapshots published: {len(ingestor.snapshots)}, watermark {ingestor.watermark()}")
+    print(f"\n💾 Live KPIs in: {args.output_dir}/")
+    return ingestor
+
+async def run_service(args):
+    """Ingest from the configured source until interrupted"""
+    bounds = reference_fare_bounds(args.reference) if args.reference else (-np.inf, MAX_REASONABLE_FARE)
+    ingestor = LiveTripIngestor(args.source, args.output_dir, bounds, args.lateness, args.snapshot_interval,
+                                args.max_batch_rows, args.max_wait_ms)
+    await ingestor.serve_forever()
+
+def main():
+    """Main function to run the live ingestion service or a synthetic replay"""
+    parser = argparse.ArgumentParser(description='Live trip ingestion with continuously published KPIs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name, help_text in [('serve', 'Ingest from a local source until interrupted'),
+                            ('replay', 'Replay synthetic trips into an in-process ingestor')]:
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('--source', default='file:uber_live_trips.csv',
+                         help='file:PATH (followed), socket:PATH (Unix socket) or fifo:PATH (named pipe)')
+        sub.add_argument('--output-dir', default='live_kpis')
+        sub.add_argument('--lateness', default='1h', help='Allowed lateness behind the newest pickup, e.g. 30min')
+        sub.add_argument('--snapshot-interval', type=float, default=1.0, help='Seconds between snapshots')
+        sub.add_argument('--max-batch-rows', type=int, default=5000)
+        sub.add_argument('--max-wait-ms', type=float, default=50.0)
+        sub.add_argument('--reference', default='uber.csv' if name == 'serve' and os.path.exists('uber.csv') else None,
+                         help='Raw CSV the fare bounds are derived from')
+
+    replay_parser = subparsers.choices['replay']
+    replay_parser.add_argument('--trips', type=int, default=200_000)
+    replay_parser.add_argument('--rate', type=int, default=50_000, help='Records per second (0: full speed)')
+    replay_parser.add_argument('--late-share', type=float, default=0.01, help='Share of trips sent delayed')
+    replay_parser.add_argument('--seed', type=int, default=42)
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        try:
+            asyncio.run(run_service(args))
+        except KeyboardInterrupt:
+            print(f"\n🛑 Live ingestion stopped")
+    else:
+        asyncio.run(run_replay(args))
+        print(f"\n🎯 Live ingestion replay completed successfully!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Concurrent EDA, Advanced Analysis and Tableau Stages over One Shared-Memory Dataset
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import pandas as pd
+import numpy as np
+from column_cache import decode_column, encode_column, read_csv_cached
+from instrumentation import PeakRSSMeter
+import warnings
+warnings.filterwarnings('ignore')
+
+ANALYSIS_STAGES = ['eda', 'advanced', 'tableau']
+
+# Column offsets in the shared block are aligned to cache lines
+ALIGNMENT = 64
+
+def private_mb():
+    """Memory of this process not shared with any other (Linux), or None"""
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = {line.split(':')[0]: int(line.split()[1]) for line in f if line.endswith('kB\n')}
+        return (fields['Private_Clean'] + fields['Private_Dirty']) / 1024
+    except (OSError, KeyError):
+        return None
+
+class SharedFrame:
+    """
+    Encoded columns of a DataFrame in one shared-memory block
+
+    Columns use the column cache encoding (numbers as they are, timestamps
+    as int64 nanoseconds, text as integer codes plus a dictionary). The spec
+    handed to workers holds only names, offsets and dictionaries, so workers
+    attach to the block and build read-only column views on it without
+    pickling or copying any data.
+    """
+
+    def __init__(self, shm, spec):
+        """Wrap an attached block"""
+        self.shm = shm
+        self.spec = spec
+
+    @classmethod
+    def create(cls, df):
+        """Copy a frame's columns into a new shared block"""
+        encoded = []
+        size = 0
+        for col in df.columns:
+            values, entry = encode_column(df[col])
+            values = np.ascontiguousarray(values)
+            entry.update(name=col, dtype=values.dtype.str, offset=size, length=len(values))
+            encoded.append((values, entry))
+            size += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for values, entry in encoded:
+            np.ndarray(values.shape, values.dtype, buffer=shm.buf, offset=entry['offset'])[:] = values
+        return cls(shm, {'name': shm.name, 'rows': len(df), 'nbytes': size,
+                         'columns': [entry for _, entry in encoded]})
+
+    @classmethod
+    def attach(cls, spec):
+        """Attach to a block created in another process"""
+        return cls(shared_memory.SharedMemory(name=spec['name']), spec)
+
+    def frame(self):
+        """DataFrame whose columns are read-only views of the shared block"""
+        data = {}
+        for entry in self.spec['columns']:
+            values = np.ndarray((entry['length'],), np.dtype(entry['dtype']), buffer=self.shm.buf,
+                                offset=entry['offset'])
+            values.flags.writeable = False
+            data[entry['name']] = decode_column(values, entry)
+        return pd.DataFrame(data, copy=False)
+
+    def close(self):
+        """Detach from the block (views still referenced keep it mapped until exit)"""
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+
+    def unlink(self):
+        """Free the block once every process is done with it"""
+        self.close()
+        self.shm.unlink()
+
+def _run_analysis(stage, spec):
+    """Run one analysis stage in a worker process on the shared dataset"""
+    import matplotlib
+    matplotlib.use('Agg')
+    from run_pipeline import UberPipeline, enable_copy_on_write
+
+    # Shared columns are read-only; copy-on-write copies a column before any stage modifies it
+    enable_copy_on_write()
+    meter = PeakRSSMeter()
+    shared = SharedFrame.attach(spec)
+    output = io.StringIO()
+    start = time.perf_counter()
+    pipeline = UberPipeline(stages=[stage])
+    pipeline.df_enhanced = shared.frame()
+    with contextlib.redirect_stdout(output):
+        getattr(pipeline, f'run_{stage}')()
+    result = {'stage': stage, 'wall_s': time.perf_counter() - start, 'peak_rss_mb': meter.peak_mb(),
+              'private_mb': private_mb(), 'output': output.getvalue()}
+    del pipeline
+    shared.close()
+    return result
+
+class UberParallelAnalysis:
+    """
+    Load the enhanced dataset once into shared memory and run the analyses concurrently
+    """
+
+    def __init__(self, data_path='uber_enhanced.csv', stages=None, show_output=True):
+        """Initialize the orchestrator"""
+        self.data_path = data_path
+        self.stages = [stage for stage in ANALYSIS_STAGES if stage in (stages or ANALYSIS_STAGES)]
+        self.show_output = show_output
+        self.shared = None
+        self.results = []
+
+    def load_shared(self):
+        """Load the enhanced dataset into one shared-memory block"""
+        print("=" * 80)
+        print("UBER FARES DATASET - CONCURRENT ANALYSIS")
+        print("=" * 80)
+
+        start = time.perf_counter()
+        df = read_csv_cached(self.data_path)
+        if df['pickup_datetime'].dtype == 'object':
+            df['pickup_datetime'] = pd.to_datetime(df['pickup_datetime'])
+        self.shared = SharedFrame.create(df)
+
+        print(f"\n📊 Enhanced dataset in shared memory ({time.perf_counter() - start:.2f}s):")
+        print(f"   • Shape: {df.shape}")
+        print(f"   • Shared block: {self.shared.spec['nbytes'] / 1024**2:.2f} MB")
+        return self.shared
+
+    def run(self):
+        """Run every selected analysis in its own worker and collect results as they finish"""
+        if self.shared is None:
+            self.load_shared()
+
+        start = time.perf_counter()
+        context = multiprocessing.get_context('spawn')
+        try:
+            with ProcessPoolExecutor(max_workers=len(self.stages), mp_context=context) as pool:
+                futures = [pool.submit(_run_analysis, stage, self.shared.spec) for stage in self.stages]
+                for future in as_completed(futures):
+                    result = future.result()
+                    self.results.append(result)
+                    if self.show_output:
+                        print(result['output'], end='')
+                    print(f"\n✅ {result['stage']} finished after {time.perf_counter() - start:.2f}s")
+        finally:
+            self.shared.unlink()
+        wall = time.perf_counter() - start
+
+        print("\n" + "=" * 80)
+        print("CONCURRENT ANALYSIS SUMMARY")
+        print("=" * 80)
+        print(f"\n⏱️ Stage timings (in workers):")
+        for result in self.results:
+            private = '' if result['private_mb'] is None else f", {result['private_mb']:.0f} MB private"
+            print(f"   • {result['stage']}: {result['wall_s']:.2f}s, {result['peak_rss_mb']:.0f} MB peak RSS{private}")
+        slowest = max(result['wall_s'] for result in self.results)
+        print(f"   • Wall time: {wall:.2f}s (slowest stage {slowest:.2f}s, "
+              f"sequential sum {sum(result['wall_s'] for result in self.results):.2f}s)")
+        print(f"   • Dataset held once: {self.shared.spec['nbytes'] / 1024**2:.2f} MB shared by {len(self.results)} workers")
+        return self.results
+
+def main():
+    """Main function to run the analyses concurrently"""
+    parser = argparse.ArgumentParser(description='Run the EDA, advanced and Tableau stages concurrently')
+    parser.add_argument('--data', default='uber_enhanced.csv', help='Enhanced dataset')
+    parser.add_argument('--stages', default=','.join(ANALYSIS_STAGES),
+                        help=f'Comma-separated subset of: {",".join(ANALYSIS_STAGES)}')
+    parser.add_argument('--quiet', action='store_true', help="Do not print the stages' own output")
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(ANALYSIS_STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {sorted(unknown)}; choose from {ANALYSIS_STAGES}")
+
+    UberParallelAnalysis(args.data, stages, show_output=not args.quiet).run()
+    print(f"\n🎯 Concurrent analysis completed successfully!")
+
+if __name__ == "__main__":
+    main()
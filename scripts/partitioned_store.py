@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Year/Month Partitioned Dataset Layout with Partition Pruning on Date Filters
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+import pandas as pd
+import numpy as np
+from column_cache import dictionary_categories, read_csv_cached
+import warnings
+warnings.filterwarnings('ignore')
+
+PARTITION_KEYS = ['pickup_year', 'pickup_month']
+
+# Column the date-range predicates apply to
+DATE_COLUMN = 'pickup_datetime'
+
+def partition_dir_for(data_path):
+    """Partitioned layout that sits next to a CSV: uber_enhanced.csv -> uber_enhanced_partitions/"""
+    return os.path.splitext(data_path)[0] + '_partitions'
+
+def to_utc(value):
+    """Timestamp of a date-range bound ('2012-03', '2012-03-15 08:00', ...); naive bounds are UTC"""
+    if value is None:
+        return None
+    value = pd.Timestamp(value)
+    return value.tz_localize('UTC') if value.tzinfo is None else value.tz_convert('UTC')
+
+def month_range(month):
+    """[start, end) of one month given as 'YYYY-MM'"""
+    start = to_utc(month)
+    return start, start + pd.DateOffset(months=1)
+
+def add_date_range_arguments(parser):
+    """--month/--start/--end options of the stages that can load a date range"""
+    parser.add_argument('--month', default=None, help='Only pickups in this month, YYYY-MM')
+    parser.add_argument('--start', default=None, help='Only pickups from this date/time on (inclusive)')
+    parser.add_argument('--end', default=None, help='Only pickups before this date/time (exclusive)')
+
+def date_range(args):
+    """(start, end) selected by the date-range options"""
+    return month_range(args.month) if args.month else (args.start, args.end)
+
+def _column_stats(series):
+    """JSON-safe min/max of a numeric or timestamp column, or None"""
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = series.dropna()
+        if values.empty:
+            return None
+        return {'min': values.min().isoformat(), 'max': values.max().isoformat()}
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        values = series.dropna()
+        if values.empty:
+            return None
+        return {'min': values.min().item(), 'max': values.max().item()}
+    return None
+
+def _parse_dates(df):
+    """Parse the date column of a partition read back from CSV"""
+    if DATE_COLUMN in df.columns and df[DATE_COLUMN].dtype == 'object':
+        df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN], format='ISO8601', utc=True)
+    return df
+
+def _in_range(df, start, end):
+    """Rows whose pickup time lies in [start, end)"""
+    mask = np.ones(len(df), dtype=bool)
+    times = df[DATE_COLUMN]
+    if times.dt.tz is None:
+        times = times.dt.tz_localize('UTC')
+    if start is not None:
+        mask &= (times >= start).to_numpy()
+    if end is not None:
+        mask &= (times < end).to_numpy()
+    return df.loc[mask]
+
+class PartitionedDataset:
+    """
+    One CSV per (pickup_year, pickup_month) plus a manifest
+
+    Files live under pickup_year=YYYY/pickup_month=MM/ and keep the columns
+    of the flat dataset, so a wildcard union of the files is the flat file.
+    The manifest lists every partition with its row count, file size and
+    the min/max of each numeric and timestamp column; readers compare
+    date-range predicates with the pickup_datetime bounds and open only the
+    partitions that can hold matching rows. It also keeps the categories of
+    the text columns the column cache dictionary-encodes, so reads return
+    the same Categorical columns as the cache and the time-sorted store.
+    """
+
+    def __init__(self, directory):
+        """Initialize the dataset for one directory"""
+        self.directory = directory
+        self.manifest = None
+        self.last_scan = None
+
+    def _read_manifest(self):
+        """Manifest of the layout, or None if there is none"""
+        try:
+            with open(os.path.join(self.directory, 'manifest.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _source_stamp(source_path):
+        """Size and modification time identifying one version of the flat file"""
+        stat = os.stat(source_path)
+        return {'path': os.path.basename(source_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def is_fresh(self, source_path):
+        """True if the layout was written from the current version of source_path"""
+        manifest = self._read_manifest()
+        return (manifest is not None and os.path.exists(source_path) and 'categories' in manifest
+                and manifest.get('source') == self._source_stamp(source_path))
+
+    def write(self, df, source_path=None):
+        """Write one file per year/month, replacing the layout as a whole once all files are complete"""
+        staging = f"{self.directory}.tmp{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        # Timestamps are parsed so the manifest holds their bounds
+        df = _parse_dates(df.copy(deep=False))
+        # Cleaned data has no year/month columns yet; keys come from the (UTC) pickup time
+        if all(key in df.columns for key in PARTITION_KEYS):
+            keys = [df[key].to_numpy() for key in PARTITION_KEYS]
+        else:
+            times = df[DATE_COLUMN]
+            keys = [times.dt.year.to_numpy(), times.dt.month.to_numpy()]
+
+        # Categories come from the whole dataset, as in the column cache, so every partition shares them
+        categories = {col: dictionary_categories(df[col]) for col in df.columns
+                      if df[col].dtype == object or isinstance(df[col].dtype, pd.CategoricalDtype)}
+        manifest = {'keys': PARTITION_KEYS, 'rows': len(df), 'columns': list(df.columns), 'source': None,
+                    'categories': {col: values for col, values in categories.items() if values is not None},
+                    'partitions': []}
+        for (year, month), positions in pd.DataFrame({'year': keys[0], 'month': keys[1]}).groupby(
+                ['year', 'month'], sort=True).indices.items():
+            part = df.iloc[positions]
+            path = os.path.join(f'pickup_year={int(year)}', f'pickup_month={int(month):02d}', 'part.csv')
+            os.makedirs(os.path.join(staging, os.path.dirname(path)))
+            part.to_csv(os.path.join(staging, path), index=False)
+            stats = {col: _column_stats(part[col]) for col in part.columns}
+            manifest['partitions'].append({
+                'pickup_year': int(year), 'pickup_month': int(month), 'path': path, 'rows': len(part),
+                'bytes': os.path.getsize(os.path.join(staging, path)),
+                'stats': {col: value for col, value in stats.items() if value is not None},
+            })
+        if source_path:
+            manifest['source'] = self._source_stamp(source_path)
+        with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory, ignore_errors=True)
+        os.rename(staging, self.directory)
+        self.manifest = manifest
+        return self.directory
+
+    def partitions(self, start=None, end=None):
+        """Manifest entries of the partitions that can hold pickups in [start, end)"""
+        self.manifest = self._read_manifest()
+        if self.manifest is None:
+            raise FileNotFoundError(f"No partitioned dataset in {self.directory}")
+        start, end = to_utc(start), to_utc(end)
+        selected = []
+        for entry in self.manifest['partitions']:
+            bounds = entry['stats'].get(DATE_COLUMN)
+            if bounds is None:
+                # No timestamps to compare with: fall back to the year/month key
+                first = pd.Timestamp(year=entry['pickup_year'], month=entry['pickup_month'], day=1, tz='UTC')
+                bounds = {'min': first, 'max': first + pd.DateOffset(months=1) - pd.Timedelta(1)}
+            if start is not None and to_utc(bounds['max']) < start:
+                continue
+            if end is not None and to_utc(bounds['min']) >= end:
+                continue
+            selected.append(entry)
+        return selected
+
+    def read(self, start=None, end=None, columns=None):
+        """Rows with pickups in [start, end), reading only the partitions that can hold them"""
+        start, end = to_utc(start), to_utc(end)
+        selected = self.partitions(start, end)
+        usecols = None if columns is None else list(dict.fromkeys(
+            list(columns) + ([DATE_COLUMN] if start is not None or end is not None else [])))
+        frames = []
+        for entry in selected:
+            part = _parse_dates(pd.read_csv(os.path.join(self.directory, entry['path']), usecols=usecols))
+            bounds = entry['stats'].get(DATE_COLUMN)
+            inside = bounds is not None and (start is None or to_utc(bounds['min']) >= start) and (
+                end is None or to_utc(bounds['max']) < end)
+            frames.append(part if inside else _in_range(part, start, end))
+        if frames:
+            df = pd.concat(frames, ignore_index=True)
+        else:
+            df = pd.DataFrame(columns=usecols or self.manifest['columns'])
+        if columns is not None:
+            df = df[list(columns)]
+        for col, categories in self.manifest.get('categories', {}).items():
+            if col in df.columns:
+                df[col] = pd.Categorical(df[col], categories=categories)
+
+        self.last_scan = {'partitions_read': len(selected), 'partitions_total': len(self.manifest['partitions']),
+                          'bytes_read': sum(entry['bytes'] for entry in selected),
+                          'bytes_total': sum(entry['bytes'] for entry in self.manifest['partitions'])}
+        return df
+
+def write_partitioned(df, data_path):
+    """Write the partitioned layout of a dataset just saved to data_path"""
+    return PartitionedDataset(partition_dir_for(data_path)).write(df, source_path=data_path)
+
+def read_dataset(data_path, start=None, end=None, columns=None):
+    """
+    Load a dataset, or only the pickups in [start, end)
+
+    A date-range read slices the time-sorted store next to data_path, or
+    opens only the matching partitions of the partitioned layout, while
+    either matches the CSV's size and modification time; otherwise the
+    whole dataset is loaded (via its column cache) and filtered.
+    """
+    if start is None and end is None:
+        return read_csv_cached(data_path, columns)
+    from time_sorted_store import TimeSortedStore, time_sorted_dir_for
+    store = TimeSortedStore(time_sorted_dir_for(data_path))
+    if store.is_fresh(data_path):
+        return store.slice(start, end, columns)
+    dataset = PartitionedDataset(partition_dir_for(data_path))
+    if dataset.is_fresh(data_path):
+        return dataset.read(start, end, columns)
+    df = _parse_dates(read_csv_cached(data_path))
+    df = _in_range(df, to_utc(start), to_utc(end)).reset_index(drop=True)
+    return df if columns is None else df[list(columns)]
+
+def main():
+    """Main function to build partitioned layouts and compare pruned reads with full reads"""
+    parser = argparse.ArgumentParser(description='Year/month partitioned layouts of CSV datasets')
+    parser.add_argument('data', nargs='+', help='CSV files, e.g. uber_cleaned.csv uber_enhanced.csv')
+    add_date_range_arguments(parser)
+    args = parser.parse_args()
+
+    start, end = date_range(args)
+
+    print("=" * 80)
+    print("UBER FARES DATASET - PARTITIONED LAYOUT")
+    print("=" * 80)
+
+    for data_path in args.data:
+        dataset = PartitionedDataset(partition_dir_for(data_path))
+        if not dataset.is_fresh(data_path):
+            build_start = time.perf_counter()
+            write_partitioned(pd.read_csv(data_path), data_path)
+            print(f"\n✅ Built {dataset.directory}/ in {time.perf_counter() - build_start:.2f}s")
+
+        entries = dataset.partitions()
+        print(f"\n📊 {data_path} -> {dataset.directory}/:")
+        print(f"   • Rows: {dataset.manifest['rows']:,} in {len(entries)} year/month partitions")
+        print(f"   • Range: {entries[0]['pickup_year']}-{entries[0]['pickup_month']:02d} to "
+              f"{entries[-1]['pickup_year']}-{entries[-1]['pickup_month']:02d}")
+
+        if start is None and end is None:
+            continue
+        read_start = time.perf_counter()
+        pruned = dataset.read(start, end)
+        pruned_s = time.perf_counter() - read_start
+        read_start = time.perf_counter()
+        full = _in_range(_parse_dates(pd.read_csv(data_path)), to_utc(start), to_utc(end))
+        full_s = time.perf_counter() - read_start
+
+        scan = dataset.last_scan
+        print(f"\n🎯 Pickups in [{start}, {end}): {len(pruned):,} rows")
+        print(f"   • Partitions read: {scan['partitions_read']} of {scan['partitions_total']} "
+              f"({scan['bytes_read'] / 1024**2:.1f} of {scan['bytes_total'] / 1024**2:.1f} MB)")
+        print(f"⏱️ Pruned read {pruned_s * 1000:.1f} ms vs full CSV read and filter {full_s * 1000:.1f} ms")
+        if len(full) != len(pruned):
+            print(f"⚠️  Full read found {len(full):,} rows")
+
+    print(f"\n🎯 Partitioned layout ready!")
+
+if __name__ == "__main__":
+    main()
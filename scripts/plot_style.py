@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Plotting Libraries Imported and Styled on First Use
+"""
+
+_styled = False
+
+def pyplot():
+    """matplotlib.pyplot with the project style (seaborn-v0_8, husl palette) applied once"""
+    global _styled
+    import matplotlib.pyplot as plt
+    if not _styled:
+        import seaborn as sns
+        plt.style.use('seaborn-v0_8')
+        sns.set_palette("husl")
+        _styled = True
+    return plt
+
+def seaborn():
+    """seaborn, with the project style applied"""
+    pyplot()
+    import seaborn as sns
+    return sns
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+In-Process Pipeline Runner: Cleaning, Feature Engineering and Analysis in One Process
+"""
+
+import argparse
+import os
+import time
+import pandas as pd
+import warnings
+warnings.filterwarnings('ignore')
+
+from data_cleaning import UberDataCleaner
+from feature_engineering import UberFeatureEngineer
+from comprehensive_eda import UberEDA
+from advanced_analysis import UberAdvancedAnalysis
+from tableau_prep_and_interactive_viz import TableauDataPrep
+from instrumentation import configure, instrumented
+
+STAGES = ['clean', 'features', 'eda', 'advanced', 'tableau']
+
+def enable_copy_on_write():
+    """Turn on pandas copy-on-write (always on from pandas 3)"""
+    if int(pd.__version__.split('.')[0]) < 3:
+        pd.set_option('mode.copy_on_write', True)
+
+@instrumented('df_enhanced', exclude=('run',))
+class UberPipeline:
+    """
+    Run the selected stages in order, handing DataFrames from stage to stage in memory
+
+    With copy-on-write enabled every hand-off is a shallow copy: stages share
+    the column buffers of the previous stage and only a column a stage
+    actually modifies gets copied. A stage whose input was not produced in
+    this run falls back to reading its usual CSV.
+    """
+
+    def __init__(self, raw_path='uber.csv', cleaned_path='uber_cleaned.csv', enhanced_path='uber_enhanced.csv',
+                 stages=None, save_intermediate=False, partitioned=False, time_sorted=False):
+        """Initialize the pipeline"""
+        self.raw_path = raw_path
+        self.cleaned_path = cleaned_path
+        self.enhanced_path = enhanced_path
+        self.stages = [stage for stage in STAGES if stage in (stages or STAGES)]
+        self.save_intermediate = save_intermediate
+        self.partitioned = partitioned
+        self.time_sorted = time_sorted
+        self.df_cleaned = None
+        self.df_enhanced = None
+        self.timings = {}
+
+    def _handoff(self, df):
+        """Isolated view of an upstream frame for the next stage (no data copied under copy-on-write)"""
+        return None if df is None else df.copy(deep=False)
+
+    def run_clean(self):
+        """Clean the raw dataset"""
+        cleaner = UberDataCleaner(self.raw_path)
+        # Reset to the RangeIndex a CSV round-trip would give, without copying data
+        self.df_cleaned = cleaner.run_full_cleaning().reset_index(drop=True)
+        if self.save_intermediate:
+            cleaner.df_cleaned = self.df_cleaned
+            cleaner.save_cleaned_data(self.cleaned_path, partitioned=self.partitioned)
+
+    def run_features(self):
+        """Engineer features on the cleaned frame"""
+        engineer = UberFeatureEngineer(self.cleaned_path)
+        self.df_enhanced = engineer.run_feature_engineering(self._handoff(self.df_cleaned))
+        if self.save_intermediate:
+            engineer.save_enhanced_data(self.enhanced_path, partitioned=self.partitioned,
+                                        time_sorted=self.time_sorted)
+
+    def run_eda(self):
+        """Comprehensive EDA charts"""
+        eda = UberEDA(self.enhanced_path)
+        eda.load_data(self._handoff(self.df_enhanced))
+        eda.fare_distribution_analysis()
+        eda.temporal_analysis()
+        eda.geographical_analysis()
+
+    def run_advanced(self):
+        """Correlation, fare factor and seasonal analysis"""
+        analyzer = UberAdvancedAnalysis(self.enhanced_path)
+        analyzer.load_data(self._handoff(self.df_enhanced))
+        analyzer.correlation_analysis()
+        analyzer.fare_prediction_factors()
+        analyzer.seasonal_analysis()
+
+    def run_tableau(self):
+        """Tableau exports, dashboard and KPI files"""
+        prep = TableauDataPrep(self.enhanced_path)
+        prep.load_and_prepare_data(self._handoff(self.df_enhanced))
+        prep.create_tableau_optimized_dataset()
+        prep.create_interactive_dashboard()
+        prep.create_summary_statistics()
+        prep.generate_tableau_instructions()
+
+    def run(self):
+        """Run every selected stage and report stage timings"""
+        enable_copy_on_write()
+        for stage in self.stages:
+            start = time.perf_counter()
+            getattr(self, f'run_{stage}')()
+            self.timings[stage] = time.perf_counter() - start
+
+        print("\n" + "=" * 80)
+        print("PIPELINE SUMMARY")
+        print("=" * 80)
+        print(f"\n⏱️ Stage timings:")
+        for stage, elapsed in self.timings.items():
+            print(f"   • {stage}: {elapsed:.2f}s")
+        print(f"   • Total: {sum(self.timings.values()):.2f}s")
+        if self.save_intermediate:
+            print(f"\n💾 Intermediate files: {', '.join(p for p in (self.cleaned_path, self.enhanced_path) if os.path.exists(p))}")
+        return self.timings
+
+def main():
+    """Main function to run the selected pipeline stages in one process"""
+    parser = argparse.ArgumentParser(description='Run the Uber fares pipeline in one process')
+    parser.add_argument('--data', default='uber.csv', help='Raw dataset for the clean stage')
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f'Comma-separated subset of: {",".join(STAGES)}')
+    parser.add_argument('--save-intermediate', action='store_true',
+                        help='Also write uber_cleaned.csv and uber_enhanced.csv')
+    parser.add_argument('--partitioned', action='store_true',
+                        help='With --save-intermediate, also write year/month partitioned layouts of both')
+    parser.add_argument('--time-sorted', action='store_true',
+                        help='With --save-intermediate, also write the enhanced dataset in pickup order')
+    parser.add_argument('--instrument', default=None, metavar='EVENTS_PATH',
+                        help="Write per-method JSON events to this file ('-' for stderr)")
+    parser.add_argument('--profile', choices=['deterministic', 'sampling'], default=None,
+                        help='Also capture one profile per stage (needs --instrument)')
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {sorted(unknown)}; choose from {STAGES}")
+
+    if args.instrument:
+        configure(args.instrument, args.profile)
+    elif args.profile:
+        parser.error("--profile needs --instrument")
+
+    if (args.partitioned or args.time_sorted) and not args.save_intermediate:
+        parser.error("--partitioned and --time-sorted need --save-intermediate")
+
+    UberPipeline(args.data, stages=stages, save_intermediate=args.save_intermediate,
+                 partitioned=args.partitioned, time_sorted=args.time_sorted).run()
+    print(f"\n🎯 Pipeline completed successfully!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Spatial Radius, Bounding-Box and Origin-Destination Queries over Pickups and Dropoffs
+"""
+
+import argparse
+import json
+import os
+import time
+import pandas as pd
+import numpy as np
+from feature_engineering import EARTH_RADIUS_KM, haversine_distance
+import warnings
+warnings.filterwarnings('ignore')
+
+# Grid cell size in degrees (about 220 m north-south and 170 m east-west in NYC)
+CELL_SIZE = 0.002
+
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+
+# Candidate points tested per step of a query (bounds the temporary arrays of large batches)
+CHUNK_CANDIDATES = 1_000_000
+
+ENDPOINTS = ['pickup', 'dropoff']
+
+def radius_boxes(lat, lon, radius_m):
+    """(min_lat, min_lon, max_lat, max_lon) arrays of the boxes enclosing circles of radius_m"""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    dlat = np.broadcast_to(np.asarray(radius_m, dtype=float) / 1000 / KM_PER_DEGREE, lat.shape)
+    # A circle is widest in longitude at its pole-side edge
+    dlon = dlat / np.cos(np.radians(np.minimum(np.abs(lat) + dlat, 89.0)))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+def _expand(starts, stops):
+    """Every position of the runs [starts[i], stops[i]) and the run each came from"""
+    lengths = np.maximum(stops - starts, 0)
+    run = np.repeat(np.arange(len(starts)), lengths)
+    positions = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return run, positions
+
+class GridIndex:
+    """
+    Points bucketed into a regular lat/lon grid and stored in cell order
+
+    key = cell_x * n_y + cell_y, so the cells of one grid column are
+    contiguous: a box covers one run of sorted points per column, found with
+    two binary searches. Only points in the covered cells are tested exactly
+    against the box or circle, so a query costs O(columns x log n) plus the
+    candidates near its area, which is proportional to the hits.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        """Initialize an empty index"""
+        self.cell_size = cell_size
+        self.origin = None
+        self.n_x = self.n_y = 0
+        self.keys = None
+        self.rows = None
+        self.lat = None
+        self.lon = None
+        self.cos_lat = None
+
+    def _cell_x(self, lon):
+        """Grid column of longitudes (clipped to the grid)"""
+        return np.clip(np.floor((np.asarray(lon) - self.origin[1]) / self.cell_size), 0, self.n_x - 1).astype(np.int64)
+
+    def _cell_y(self, lat):
+        """Grid row of latitudes (clipped to the grid)"""
+        return np.clip(np.floor((np.asarray(lat) - self.origin[0]) / self.cell_size), 0, self.n_y - 1).astype(np.int64)
+
+    def build(self, lat, lon):
+        """Sort the points by cell once (row numbers within a cell stay in order)"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        self.origin = (float(lat.min()), float(lon.min()))
+        self.n_y = int((lat.max() - self.origin[0]) // self.cell_size) + 1
+        self.n_x = int((lon.max() - self.origin[1]) // self.cell_size) + 1
+        keys = self._cell_x(lon) * self.n_y + self._cell_y(lat)
+        self.rows = np.argsort(keys, kind='stable')
+        self.keys = keys[self.rows]
+        self.lat = lat[self.rows]
+        self.lon = lon[self.rows]
+        self.cos_lat = np.cos(np.radians(self.lat))
+        return self
+
+    def candidate_runs(self, min_lat, min_lon, max_lat, max_lon):
+        """(query, start, stop) of the sorted-point runs covering each box, one run per grid column"""
+        min_lat, min_lon, max_lat, max_lon = (np.atleast_1d(np.asarray(v, dtype=float))
+                                              for v in (min_lat, min_lon, max_lat, max_lon))
+        x0, x1 = self._cell_x(min_lon), self._cell_x(max_lon)
+        y0, y1 = self._cell_y(min_lat), self._cell_y(max_lat)
+        query, columns = _expand(x0, x1 + 1)
+        starts = np.searchsorted(self.keys, columns * self.n_y + y0[query], side='left')
+        stops = np.searchsorted(self.keys, columns * self.n_y + y1[query], side='right')
+        return query, starts, stops
+
+    def count_candidates(self, min_lat, min_lon, max_lat, max_lon):
+        """Points in the cells covering each box (an upper bound of its hits, no points read)"""
+        query, starts, stops = self.candidate_runs(min_lat, min_lon, max_lat, max_lon)
+        return np.bincount(query, weights=stops - starts, minlength=len(np.atleast_1d(min_lat))).astype(np.int64)
+
+    def _filter(self, runs, keep):
+        """(query, row) of the candidates in runs for which keep(query, sorted positions) is true"""
+        query, starts, stops = runs
+        ends = np.cumsum(np.maximum(stops - starts, 0))
+        hit_queries, hit_rows = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+        first = 0
+        while first < len(ends):
+            done = ends[first - 1] if first else 0
+            last = max(int(np.searchsorted(ends, done + CHUNK_CANDIDATES, side='right')), first + 1)
+            run, positions = _expand(starts[first:last], stops[first:last])
+            candidate_queries = query[first:last][run]
+            inside = keep(candidate_queries, positions)
+            hit_queries.append(candidate_queries[inside])
+            hit_rows.append(self.rows[positions[inside]])
+            first = last
+        return self._ordered(np.concatenate(hit_queries), np.concatenate(hit_rows))
+
+    def _ordered(self, query, rows):
+        """Hits sorted by query, then row (one sort of a combined int64 key)"""
+        n_rows = max(len(self.rows), 1)
+        keys = np.sort(query.astype(np.int64) * n_rows + rows)
+        return keys // n_rows, keys % n_rows
+
+    def bbox_batch(self, min_lat, min_lon, max_lat, max_lon):
+        """(query, row) pairs of the points inside each box (bounds inclusive)"""
+        min_lat, min_lon, max_lat, max_lon = (np.atleast_1d(np.asarray(v, dtype=float))
+                                              for v in (min_lat, min_lon, max_lat, max_lon))
+
+        def keep(query, positions):
+            lat, lon = self.lat[positions], self.lon[positions]
+            return ((lat >= min_lat[query]) & (lat <= max_lat[query])
+                    & (lon >= min_lon[query]) & (lon <= max_lon[query]))
+
+        return self._filter(self.candidate_runs(min_lat, min_lon, max_lat, max_lon), keep)
+
+    def radius_batch(self, lat, lon, radius_m):
+        """(query, row) pairs of the points within radius_m (scalar or per center) of each center"""
+        lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        lon = np.atleast_1d(np.asarray(lon, dtype=float))
+        radius_km = np.broadcast_to(np.asarray(radius_m, dtype=float) / 1000, lat.shape)
+        # Haversine test without the arcsine: hav(d / R) <= hav(radius / R)
+        threshold = np.sin(radius_km / (2 * EARTH_RADIUS_KM)) ** 2
+        cos_lat = np.cos(np.radians(lat))
+
+        def keep(query, positions):
+            half_dlat = np.radians(self.lat[positions] - lat[query]) / 2
+            half_dlon = np.radians(self.lon[positions] - lon[query]) / 2
+            hav = np.sin(half_dlat) ** 2 + cos_lat[query] * self.cos_lat[positions] * np.sin(half_dlon) ** 2
+            return hav <= threshold[query]
+
+        return self._filter(self.candidate_runs(*radius_boxes(lat, lon, radius_km * 1000)), keep)
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """Rows of the points inside one box, ascending"""
+        return self.bbox_batch(min_lat, min_lon, max_lat, max_lon)[1]
+
+    def radius(self, lat, lon, radius_m):
+        """Rows of the points within radius_m of one center, ascending"""
+        return self.radius_batch(lat, lon, radius_m)[1]
+
+    def save(self, directory):
+        """Write the sorted arrays as .npy plus a manifest"""
+        os.makedirs(directory, exist_ok=True)
+        for name in ('keys', 'rows', 'lat', 'lon', 'cos_lat'):
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+        manifest = {'cell_size': self.cell_size, 'origin': list(self.origin), 'n_x': self.n_x, 'n_y': self.n_y,
+                    'points': len(self.rows)}
+        with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Open a saved index; arrays are memory-mapped so only queried pages are read"""
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            manifest = json.load(f)
+        index = cls(manifest['cell_size'])
+        index.origin = tuple(manifest['origin'])
+        index.n_x, index.n_y = manifest['n_x'], manifest['n_y']
+        for name in ('keys', 'rows', 'lat', 'lon', 'cos_lat'):
+            setattr(index, name, np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r' if mmap else None))
+        return index
+
+class TripSpatialIndex:
+    """
+    Grid indexes over the pickups and the dropoffs of the same trips
+
+    Row numbers are positions in the frame the index was built from (CSV
+    row order). An origin-destination query starts from whichever endpoint
+    box has fewer candidates and checks the other endpoint of those trips
+    only, so it never scans both sides.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        """Initialize empty pickup and dropoff indexes"""
+        self.cell_size = cell_size
+        self.grids = {endpoint: GridIndex(cell_size) for endpoint in ENDPOINTS}
+        self.coordinates = {}
+
+    def build(self, df):
+        """Index the pickup and dropoff coordinates of a trip frame"""
+        for endpoint in ENDPOINTS:
+            lat = df[f'{endpoint}_latitude'].to_numpy(dtype=np.float64)
+            lon = df[f'{endpoint}_longitude'].to_numpy(dtype=np.float64)
+            self.grids[endpoint].build(lat, lon)
+            self.coordinates[endpoint] = (lat, lon)
+        return self
+
+    def radius(self, lat, lon, radius_m, endpoint='pickup'):
+        """Trips whose pickup (or dropoff) is within radius_m of a point"""
+        return self.grids[endpoint].radius(lat, lon, radius_m)
+
+    def radius_batch(self, lat, lon, radius_m, endpoint='pickup'):
+        """(center, trip) pairs for many centers at once"""
+        return self.grids[endpoint].radius_batch(lat, lon, radius_m)
+
+    def bbox(self, box, endpoint='pickup'):
+        """Trips whose pickup (or dropoff) is inside box = (min_lat, min_lon, max_lat, max_lon)"""
+        return self.grids[endpoint].bbox(*box)
+
+    def bbox_batch(self, boxes, endpoint='pickup'):
+        """(box, trip) pairs for an array of boxes, one (min_lat, min_lon, max_lat, max_lon) per row"""
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        return self.grids[endpoint].bbox_batch(*boxes.T)
+
+    def od_batch(self, origin_boxes, destination_boxes):
+        """(pair, trip) pairs of trips picked up in origin_boxes[i] and dropped off in destination_boxes[i]"""
+        boxes = {'pickup': np.asarray(origin_boxes, dtype=float).reshape(-1, 4),
+                 'dropoff': np.asarray(destination_boxes, dtype=float).reshape(-1, 4)}
+        # Pair by pair, search the endpoint with fewer candidates and test the other endpoint directly
+        counts = {endpoint: self.grids[endpoint].count_candidates(*boxes[endpoint].T) for endpoint in ENDPOINTS}
+        from_pickup = counts['pickup'] <= counts['dropoff']
+        pairs, trips = [], []
+        for endpoint, other, use in (('pickup', 'dropoff', from_pickup), ('dropoff', 'pickup', ~from_pickup)):
+            selected = np.flatnonzero(use)
+            if len(selected) == 0:
+                continue
+            query, rows = self.grids[endpoint].bbox_batch(*boxes[endpoint][selected].T)
+            lat, lon = (values[rows] for values in self.coordinates[other])
+            box = boxes[other][selected[query]]
+            inside = (lat >= box[:, 0]) & (lat <= box[:, 2]) & (lon >= box[:, 1]) & (lon <= box[:, 3])
+            pairs.append(selected[query[inside]])
+            trips.append(rows[inside])
+        return self.grids['pickup']._ordered(np.concatenate(pairs), np.concatenate(trips))
+
+    def od(self, origin_box, destination_box):
+        """Trips from one box to another"""
+        return self.od_batch([origin_box], [destination_box])[1]
+
+    def save(self, directory):
+        """Write both grids and the trip coordinates"""
+        for endpoint in ENDPOINTS:
+            self.grids[endpoint].save(os.path.join(directory, endpoint))
+            for axis, values in zip(('latitude', 'longitude'), self.coordinates[endpoint]):
+                np.save(os.path.join(directory, endpoint, f'trip_{axis}.npy'), values)
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Open a saved trip index"""
+        index = None
+        for endpoint in ENDPOINTS:
+            grid = GridIndex.load(os.path.join(directory, endpoint), mmap)
+            index = index or cls(grid.cell_size)
+            index.grids[endpoint] = grid
+            index.coordinates[endpoint] = tuple(
+                np.load(os.path.join(directory, endpoint, f'trip_{axis}.npy'), mmap_mode='r' if mmap else None)
+                for axis in ('latitude', 'longitude'))
+        return index
+
+class UberSpatialIndexBuilder:
+    """
+    Build the pickup/dropoff spatial index and compare its queries with full boolean masks
+    """
+
+    def __init__(self, data_path='uber_cleaned.csv', output_dir='spatial_index', cell_size=CELL_SIZE):
+        """Initialize the builder"""
+        self.data_path = data_path
+        self.output_dir = output_dir
+        self.cell_size = cell_size
+        self.df = None
+        self.index = None
+
+    def load_data(self):
+        """Load the trip coordinates"""
+        print("=" * 80)
+        print("UBER FARES DATASET - SPATIAL QUERY INDEX")
+        print("=" * 80)
+
+        self.df = pd.read_csv(self.data_path, usecols=[
+            'pickup_longitude', 'pickup_latitude', 'dropoff_longitude', 'dropoff_latitude'
+        ])
+
+        print(f"\n📊 Trips loaded: {len(self.df):,}")
+        return True
+
+    def build_index(self):
+        """Build and save the index"""
+        print("\n" + "=" * 60)
+        print("1. BUILDING THE SPATIAL INDEX")
+        print("=" * 60)
+
+        start = time.perf_counter()
+        self.index = TripSpatialIndex(self.cell_size).build(self.df)
+        elapsed = time.perf_counter() - start
+        path = self.index.save(self.output_dir)
+
+        grid = self.index.grids['pickup']
+        print(f"\n✅ Pickup and dropoff grids built in {elapsed:.2f}s")
+        print(f"   • Cell size: {self.cell_size}° ({grid.n_x} x {grid.n_y} cells per endpoint)")
+        print(f"   💾 Saved to: {path}")
+
+    def _timed(self, function, repeat=3):
+        """Fastest of repeat runs, in seconds, and the result"""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def benchmark_queries(self, n_queries=200, batch_size=5000, radius_m=300, seed=42):
+        """Time radius, box, origin-destination and batch queries against full-column masks"""
+        print("\n" + "=" * 60)
+        print("2. QUERY BENCHMARK")
+        print("=" * 60)
+
+        rng = np.random.default_rng(seed)
+        lat = {endpoint: self.df[f'{endpoint}_latitude'].to_numpy() for endpoint in ENDPOINTS}
+        lon = {endpoint: self.df[f'{endpoint}_longitude'].to_numpy() for endpoint in ENDPOINTS}
+        centers = rng.integers(0, len(self.df), n_queries)
+
+        def mask_box(endpoint, box):
+            return np.flatnonzero((lat[endpoint] >= box[0]) & (lat[endpoint] <= box[2])
+                                  & (lon[endpoint] >= box[1]) & (lon[endpoint] <= box[3]))
+
+        checks = {
+            f'radius {radius_m} m': (
+                lambda c: self.index.radius(lat['pickup'][c], lon['pickup'][c], radius_m),
+                lambda c: np.flatnonzero(haversine_distance(lat['pickup'][c], lon['pickup'][c], lat['pickup'],
+                                                            lon['pickup']) <= radius_m / 1000)),
+            'box 1 x 1 km': (
+                lambda c: self.index.bbox(self._box(lat['pickup'][c], lon['pickup'][c], 1000)),
+                lambda c: mask_box('pickup', self._box(lat['pickup'][c], lon['pickup'][c], 1000))),
+            'od 1 km boxes': (
+                lambda c: self.index.od(self._box(lat['pickup'][c], lon['pickup'][c], 1000),
+                                        self._box(lat['dropoff'][c], lon['dropoff'][c], 1000)),
+                lambda c: np.intersect1d(mask_box('pickup', self._box(lat['pickup'][c], lon['pickup'][c], 1000)),
+                                         mask_box('dropoff', self._box(lat['dropoff'][c], lon['dropoff'][c], 1000)))),
+        }
+
+        print(f"\n📊 {n_queries} queries per kind centred on random trips (best of 3 each):")
+        for label, (indexed, masked) in checks.items():
+            index_ms, mask_ms, hits, identical = [], [], [], True
+            for c in centers:
+                elapsed, rows = self._timed(lambda: indexed(c))
+                index_ms.append(elapsed * 1000)
+                elapsed, expected = self._timed(lambda: masked(c), repeat=1)
+                mask_ms.append(elapsed * 1000)
+                hits.append(len(rows))
+                identical &= np.array_equal(rows, expected)
+            print(f"   {'✅' if identical else '❌'} {label:14s} mean {np.mean(hits):8.1f} hits: "
+                  f"index p50 {np.percentile(index_ms, 50):.3f} ms / p99 {np.percentile(index_ms, 99):.3f} ms, "
+                  f"mask p50 {np.percentile(mask_ms, 50):.2f} ms")
+
+        batch = rng.integers(0, len(self.df), batch_size)
+        elapsed, (query, rows) = self._timed(
+            lambda: self.index.radius_batch(lat['pickup'][batch], lon['pickup'][batch], radius_m), repeat=1)
+        print(f"\n⏱️ Batch: {batch_size:,} radius queries in {elapsed * 1000:.1f} ms "
+              f"({elapsed / batch_size * 1e6:.1f} µs per center, {len(rows):,} hits)")
+        sample = rng.choice(batch_size, min(20, batch_size), replace=False)
+        same = all(np.array_equal(rows[query == i], self.index.radius(lat['pickup'][batch[i]],
+                                                                       lon['pickup'][batch[i]], radius_m))
+                   for i in sample)
+        print(f"   {'✅' if same else '❌'} Batch results match single queries")
+
+    @staticmethod
+    def _box(lat, lon, size_m):
+        """(min_lat, min_lon, max_lat, max_lon) of a square of size_m centred on a point"""
+        min_lat, min_lon, max_lat, max_lon = radius_boxes(lat, lon, size_m / 2)
+        return (float(min_lat), float(min_lon), float(max_lat), float(max_lon))
+
+def main():
+    """Main function to build the spatial index"""
+    parser = argparse.ArgumentParser(description='Spatial radius, box and origin-destination query index')
+    parser.add_argument('--data', default='uber_cleaned.csv')
+    parser.add_argument('--output-dir', default='spatial_index')
+    parser.add_argument('--cell-size', type=float, default=CELL_SIZE, help='Grid cell size in degrees')
+    parser.add_argument('--queries', type=int, default=200, help='Queries per kind in the benchmark')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Centers in the batch radius query')
+    parser.add_argument('--radius-m', type=float, default=300)
+    args = parser.parse_args()
+
+    builder = UberSpatialIndexBuilder(args.data, args.output_dir, args.cell_size)
+    builder.load_data()
+    builder.build_index()
+    builder.benchmark_queries(args.queries, args.batch_size, args.radius_m)
+
+    print(f"\n🎯 Spatial index completed successfully!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Vectorized Synthetic Trip Generator Calibrated from the Committed Aggregates
+"""
+
+import argparse
+import os
+import time
+import pandas as pd
+import numpy as np
+from data_cleaning import NYC_BOUNDS
+from feature_engineering import BOROUGH_BOUNDS, TIMES_SQUARE_LAT, TIMES_SQUARE_LON, haversine_distance
+import warnings
+warnings.filterwarnings('ignore')
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+AGGREGATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'aggregated_data')
+
+RAW_COLUMNS = ['Unnamed: 0', 'key', 'fare_amount', 'pickup_datetime', 'pickup_longitude', 'pickup_latitude',
+               'dropoff_longitude', 'dropoff_latitude', 'passenger_count']
+
+# Share of all rows that get each kind of defect the cleaner removes
+DEFAULT_DIRTY_RATES = {
+    'missing_dropoff': 0.0001,
+    'zero_fare': 0.0003,
+    'negative_fare': 0.0001,
+    'out_of_bounds': 0.02,
+    'passenger_zero': 0.0035,
+    'passenger_over_6': 0.0001,
+}
+
+# Trip dates span the same period as the original dataset
+DATE_START, DATE_END = np.datetime64('2009-01-05', 's'), np.datetime64('2015-06-29', 's')  # Mondays
+
+# Relative frequency of 2-6 passenger trips, scaled per borough to match the average passenger count
+GROUP_SIZES = np.array([2, 3, 4, 5, 6])
+GROUP_WEIGHTS = np.array([0.148, 0.044, 0.021, 0.070, 0.021])
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+class SyntheticTripGenerator:
+    """
+    Generate uber.csv-schema trips whose marginals follow the committed aggregation files
+
+    Pickup weekday and hour follow the daily and hourly ride counts, the pickup
+    borough follows the borough ride counts, and trip distances are lognormal
+    with the per-borough mean scaled by the per-hour distance profile. Fares
+    are a linear function of distance fitted to the average fares of the
+    hourly and borough tables, with multiplicative noise. Every chunk is drawn
+    from its own seeded generator, so the same seed and chunk size always
+    produce the same file.
+    """
+
+    def __init__(self, aggregates_dir=AGGREGATES_DIR, dirty_rates=None, seed=42):
+        """Initialize the generator and calibrate it from the aggregation files"""
+        self.aggregates_dir = aggregates_dir
+        self.dirty_rates = {**DEFAULT_DIRTY_RATES, **(dirty_rates or {})}
+        unknown = set(self.dirty_rates) - set(DEFAULT_DIRTY_RATES)
+        if unknown:
+            raise ValueError(f"Unknown dirty row kinds: {sorted(unknown)}; choose from {list(DEFAULT_DIRTY_RATES)}")
+        self.seed = seed
+        self.calibrate()
+
+    def calibrate(self):
+        """Derive sampling distributions from the hourly, daily and borough aggregates and the KPI summary"""
+        hourly = pd.read_csv(os.path.join(self.aggregates_dir, 'uber_hourly_aggregation.csv')).sort_values('pickup_hour')
+        daily = pd.read_csv(os.path.join(self.aggregates_dir, 'uber_daily_aggregation.csv')).set_index('day_of_week')
+        borough = pd.read_csv(os.path.join(self.aggregates_dir, 'uber_borough_aggregation.csv'))
+        kpis = pd.read_csv(os.path.join(self.aggregates_dir, 'uber_kpi_summary.csv')).set_index('Metric')['Value']
+
+        self.hour_p = (hourly['rides_count'] / hourly['rides_count'].sum()).to_numpy()
+        daily = daily.reindex(WEEKDAYS)
+        self.weekday_p = (daily['rides_count'] / daily['rides_count'].sum()).to_numpy()
+        self.boroughs = borough['pickup_borough'].tolist()
+        self.borough_p = (borough['rides_count'] / borough['rides_count'].sum()).to_numpy()
+        # Hour of week (weekday * 24 + hour) drawn jointly, assuming independent weekday and hour profiles
+        self.hour_of_week_cdf = np.cumsum(np.outer(self.weekday_p, self.hour_p).ravel())
+        self.borough_cdf = np.cumsum(self.borough_p)
+
+        self.target_distance = np.average(hourly['avg_distance'], weights=hourly['rides_count'])
+        self.target_fare = np.average(hourly['avg_fare'], weights=hourly['rides_count'])
+        self.inter_borough_share = float(kpis['Inter-Borough Trips (%)'].rstrip('%')) / 100
+        self.hour_distance_factor = (hourly['avg_distance'] / self.target_distance).to_numpy()
+        self.borough_distance = borough['avg_distance'].to_numpy()
+
+        # Fare = base + per_km * distance, weighted least squares over the group means
+        points = pd.concat([hourly[['avg_distance', 'avg_fare', 'rides_count']],
+                            borough[['avg_distance', 'avg_fare', 'rides_count']]])
+        weights = np.sqrt(points['rides_count'].to_numpy())
+        design = np.column_stack([np.ones(len(points)), points['avg_distance']]) * weights[:, None]
+        (self.fare_base, self.fare_per_km), *_ = np.linalg.lstsq(design, points['avg_fare'].to_numpy() * weights,
+                                                                  rcond=None)
+
+        group_mean = (GROUP_SIZES * GROUP_WEIGHTS).sum() / GROUP_WEIGHTS.sum()
+        self.group_share = np.clip((borough['avg_passengers'].to_numpy() - 1) / (group_mean - 1), 0, 1)
+        self.group_cdf = np.cumsum(GROUP_WEIGHTS / GROUP_WEIGHTS.sum())
+        self.n_weeks = int((DATE_END - DATE_START).astype(np.int64) // (7 * 86400))
+
+        self.distance_scale, self.fare_scale = 1.0, 1.0
+        self._fit_cleaning_bias()
+
+    def _fit_cleaning_bias(self, n_pilot=200_000, rounds=3):
+        """
+        Scale distances and fares so the trips that survive cleaning match the aggregates
+
+        The aggregates describe cleaned data, and the cleaner's IQR fare trim
+        removes the upper tail, so a pilot sample is trimmed the same way and
+        the scales are adjusted until its means hit the targets.
+        """
+        for _ in range(rounds):
+            pilot = self._clean_columns(np.random.default_rng([self.seed, 2**32 - 1]), n_pilot)
+            fare = pilot['fare_amount']
+            q1, q3 = np.quantile(fare, [0.25, 0.75])
+            kept = (fare >= q1 - 1.5 * (q3 - q1)) & (fare <= min(q3 + 1.5 * (q3 - q1), 100))
+            distance = haversine_distance(pilot['pickup_latitude'], pilot['pickup_longitude'],
+                                          pilot['dropoff_latitude'], pilot['dropoff_longitude'])
+            self.distance_scale *= self.target_distance / distance[kept].mean()
+            self.fare_scale *= self.target_fare / fare[kept].mean()
+
+    def summary(self):
+        """Print the calibrated distributions"""
+        print(f"\n📊 Calibrated from {os.path.normpath(self.aggregates_dir)}:")
+        print(f"   • Busiest hour: {int(self.hour_p.argmax())}:00 ({self.hour_p.max():.1%} of trips)")
+        print(f"   • Busiest day: {WEEKDAYS[int(self.weekday_p.argmax())]} ({self.weekday_p.max():.1%} of trips)")
+        print(f"   • Boroughs: " + ', '.join(f"{b} {p:.1%}" for b, p in zip(self.boroughs, self.borough_p)))
+        print(f"   • Fare model: ${self.fare_base:.2f} + ${self.fare_per_km:.2f}/km "
+              f"(cleaning-bias scales: distance x{self.distance_scale:.3f}, fare x{self.fare_scale:.3f})")
+        print(f"   • Inter-borough trips: {self.inter_borough_share:.1%}")
+        print(f"   • Dirty row rates: " + ', '.join(f"{k} {v:.4%}" for k, v in self.dirty_rates.items()))
+
+    @staticmethod
+    def _draw(rng, cdf, n):
+        """n category indices from a cumulative distribution"""
+        return np.minimum(cdf.searchsorted(rng.random(n), side='right'), len(cdf) - 1)
+
+    @staticmethod
+    def _first_box(lat, lon):
+        """Index into BOROUGH_BOUNDS of the first box containing each point (len for none), as classify_borough"""
+        index = np.full(len(lat), len(BOROUGH_BOUNDS))
+        for i in range(len(BOROUGH_BOUNDS) - 1, -1, -1):
+            min_lon, max_lon, min_lat, max_lat = BOROUGH_BOUNDS[i][1]
+            index[(lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)] = i
+        return index
+
+    def _pickups(self, rng, borough_codes):
+        """Pickup points that classify_borough assigns to each trip's borough (rejection sampling)"""
+        n = len(borough_codes)
+        lat, lon = np.empty(n), np.empty(n)
+        boxes = dict(BOROUGH_BOUNDS)
+        box_index = {name: i for i, (name, _) in enumerate(BOROUGH_BOUNDS)}
+        for code, name in enumerate(self.boroughs):
+            pending = np.flatnonzero(borough_codes == code)
+            if name in boxes:
+                min_lon, max_lon, min_lat, max_lat = boxes[name]
+                center = ((TIMES_SQUARE_LON, TIMES_SQUARE_LAT) if name == 'Manhattan'
+                          else ((min_lon + max_lon) / 2, (min_lat + max_lat) / 2))
+                spread = ((max_lon - min_lon) / 4, (max_lat - min_lat) / 4)
+            while len(pending):
+                size = max(int(1.25 * len(pending)), 1024)
+                if name in boxes:
+                    cand_lon = rng.normal(center[0], spread[0], size)
+                    cand_lat = rng.normal(center[1], spread[1], size)
+                else:
+                    cand_lon = rng.uniform(NYC_BOUNDS['min_longitude'], NYC_BOUNDS['max_longitude'], size)
+                    cand_lat = rng.uniform(NYC_BOUNDS['min_latitude'], NYC_BOUNDS['max_latitude'], size)
+                target = box_index.get(name, len(BOROUGH_BOUNDS))
+                accepted = np.flatnonzero(self._first_box(cand_lat, cand_lon) == target)[:len(pending)]
+                lat[pending[:len(accepted)]] = cand_lat[accepted]
+                lon[pending[:len(accepted)]] = cand_lon[accepted]
+                pending = pending[len(accepted):]
+        return lat, lon
+
+    def _inject_dirty_rows(self, rng, columns):
+        """Overwrite a configurable share of rows with the defects the cleaner removes"""
+        n = len(columns['fare_amount'])
+        masks = {kind: rng.random(n) < rate for kind, rate in self.dirty_rates.items()}
+
+        columns['dropoff_longitude'][masks['missing_dropoff']] = np.nan
+        columns['dropoff_latitude'][masks['missing_dropoff']] = np.nan
+        columns['fare_amount'][masks['zero_fare']] = 0.0
+        columns['fare_amount'][masks['negative_fare']] *= -1
+        # Half of the out-of-bounds rows are (0, 0) pickups, the rest are shifted far outside the city
+        out = np.flatnonzero(masks['out_of_bounds'])
+        zeroed, shifted = out[::2], out[1::2]
+        columns['pickup_longitude'][zeroed] = 0.0
+        columns['pickup_latitude'][zeroed] = 0.0
+        columns['dropoff_latitude'][shifted] += rng.uniform(1, 50, len(shifted))
+        columns['passenger_count'][masks['passenger_zero']] = 0
+        columns['passenger_count'][masks['passenger_over_6']] = rng.integers(7, 209, masks['passenger_over_6'].sum())
+        return columns
+
+    def _dropoffs(self, rng, pickup_lat, pickup_lon, distance, max_rounds=8):
+        """Dropoff points at the given distances; bearings are re-drawn until the inter-borough share matches"""
+        def place(lat0, lon0, km):
+            bearing = rng.uniform(0, 2 * np.pi, len(km))
+            return (np.clip(lat0 + km * np.cos(bearing) / 111.0, NYC_BOUNDS['min_latitude'], NYC_BOUNDS['max_latitude']),
+                    np.clip(lon0 + km * np.sin(bearing) / (111.0 * np.cos(np.radians(lat0))),
+                            NYC_BOUNDS['min_longitude'], NYC_BOUNDS['max_longitude']))
+
+        pickup_box = self._first_box(pickup_lat, pickup_lon)
+        lat, lon = place(pickup_lat, pickup_lon, distance)
+        crossing = np.flatnonzero(self._first_box(lat, lon) != pickup_box)
+        # Keep just enough of the first-round crossings to reach the target share; re-draw the rest
+        keep_p = min(1.0, self.inter_borough_share * len(distance) / max(len(crossing), 1))
+        pending = crossing[rng.random(len(crossing)) >= keep_p]
+        for _ in range(max_rounds):
+            if not len(pending):
+                break
+            lat[pending], lon[pending] = place(pickup_lat[pending], pickup_lon[pending], distance[pending])
+            pending = pending[self._first_box(lat[pending], lon[pending]) != pickup_box[pending]]
+        return lat, lon
+
+    def _clean_columns(self, rng, n_rows, row_offset=0):
+        """Trips without injected defects"""
+        # Pickup time: week of the period, then weekday and hour from the ride count profiles
+        week = rng.integers(0, self.n_weeks, n_rows)
+        hour_of_week = self._draw(rng, self.hour_of_week_cdf, n_rows)
+        hour = hour_of_week % 24
+        seconds = (DATE_START.astype(np.int64) + week * 7 * 86400 + hour_of_week * 3600
+                   + rng.integers(0, 3600, n_rows))
+
+        borough_codes = self._draw(rng, self.borough_cdf, n_rows)
+        pickup_lat, pickup_lon = self._pickups(rng, borough_codes)
+
+        # Lognormal distance with mean = borough mean x hour-of-day factor
+        sigma = 0.7
+        mean_km = self.distance_scale * self.borough_distance[borough_codes] * self.hour_distance_factor[hour]
+        distance = np.exp(np.log(mean_km) - sigma**2 / 2 + sigma * rng.standard_normal(n_rows))
+        dropoff_lat, dropoff_lon = self._dropoffs(rng, pickup_lat, pickup_lon, distance)
+
+        noise = np.exp(0.2 * rng.standard_normal(n_rows) - 0.02)
+        fare = np.maximum(np.round(self.fare_scale * (self.fare_base + self.fare_per_km * distance) * noise, 1), 2.5)
+
+        passengers = np.ones(n_rows, dtype=np.int64)
+        groups = np.flatnonzero(rng.random(n_rows) < self.group_share[borough_codes])
+        passengers[groups] = GROUP_SIZES[self._draw(rng, self.group_cdf, len(groups))]
+
+        columns = {
+            'Unnamed: 0': np.arange(row_offset, row_offset + n_rows, dtype=np.int64),
+            'fare_amount': fare,
+            'pickup_seconds': seconds,
+            'pickup_longitude': np.round(pickup_lon, 6),
+            'pickup_latitude': np.round(pickup_lat, 6),
+            'dropoff_longitude': np.round(dropoff_lon, 6),
+            'dropoff_latitude': np.round(dropoff_lat, 6),
+            'passenger_count': passengers,
+        }
+        return columns
+
+    def generate_columns(self, n_rows, chunk_index=0, row_offset=0):
+        """One chunk of trips, defects included, as numpy arrays (pickup times as epoch seconds)"""
+        rng = np.random.default_rng([self.seed, chunk_index])
+        return self._inject_dirty_rows(rng, self._clean_columns(rng, n_rows, row_offset))
+
+    def _to_table(self, columns):
+        """Arrow table in the raw schema; timestamp strings are built by Arrow compute"""
+        # Casting a timestamp[s] to string gives 'YYYY-MM-DD HH:MM:SS' and is much faster than strftime
+        stamps = pc.cast(pa.array(columns['pickup_seconds'], type=pa.timestamp('s')), pa.string())
+        digit = pc.cast(pa.array(columns['Unnamed: 0'] % 9 + 1), pa.string())
+        arrays = {name: columns[name] for name in RAW_COLUMNS if name in columns}
+        arrays['key'] = pc.binary_join_element_wise(stamps, '.000000', digit, '')
+        arrays['pickup_datetime'] = pc.binary_join_element_wise(stamps, ' UTC', '')
+        return pa.table({name: arrays[name] for name in RAW_COLUMNS})
+
+    def _to_frame(self, columns):
+        """DataFrame in the raw schema (used when pyarrow is unavailable)"""
+        stamps = np.char.replace(np.datetime_as_string(columns['pickup_seconds'].astype('datetime64[s]')), 'T', ' ')
+        digit = (columns['Unnamed: 0'] % 9 + 1).astype(str)
+        frame = {name: columns[name] for name in RAW_COLUMNS if name in columns}
+        frame['key'] = np.char.add(np.char.add(stamps, '.000000'), digit)
+        frame['pickup_datetime'] = np.char.add(stamps, ' UTC')
+        return pd.DataFrame({name: frame[name] for name in RAW_COLUMNS})
+
+    def generate_frame(self, n_rows, chunk_size=1_000_000):
+        """All rows in memory as a raw-schema DataFrame"""
+        chunks = []
+        for chunk_index, offset in enumerate(range(0, n_rows, chunk_size)):
+            columns = self.generate_columns(min(chunk_size, n_rows - offset), chunk_index, offset)
+            chunks.append(self._to_table(columns).to_pandas() if pa is not None else self._to_frame(columns))
+        return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+    def write_csv(self, output_path, n_rows, chunk_size=1_000_000):
+        """Stream n_rows to a CSV chunk by chunk; memory is bounded by the chunk size"""
+        print("=" * 80)
+        print("UBER FARES DATASET - SYNTHETIC TRIP GENERATOR")
+        print("=" * 80)
+        self.summary()
+
+        start = time.perf_counter()
+        generate_time = 0.0
+        writer = None
+        try:
+            for chunk_index, offset in enumerate(range(0, n_rows, chunk_size)):
+                chunk_start = time.perf_counter()
+                columns = self.generate_columns(min(chunk_size, n_rows - offset), chunk_index, offset)
+                generate_time += time.perf_counter() - chunk_start
+                if pa is not None:
+                    table = self._to_table(columns)
+                    writer = writer or pa_csv.CSVWriter(
+                        output_path, table.schema, write_options=pa_csv.WriteOptions(quoting_style='none'))
+                    writer.write_table(table)
+                else:
+                    self._to_frame(columns).to_csv(output_path, mode='w' if offset == 0 else 'a',
+                                                   header=offset == 0, index=False)
+        finally:
+            if writer is not None:
+                writer.close()
+        elapsed = time.perf_counter() - start
+
+        print(f"\n✅ {n_rows:,} trips written to {output_path} in {elapsed:.2f}s")
+        print(f"   • Generation: {n_rows / generate_time:,.0f} rows/s")
+        print(f"   • End to end (including CSV): {n_rows / elapsed:,.0f} rows/s")
+        print(f"   • File size: {os.path.getsize(output_path) / 1024**2:.1f} MB")
+        return output_path
+
+def main():
+    """Main function to generate a synthetic uber.csv"""
+    parser = argparse.ArgumentParser(description='Calibrated synthetic Uber trip generator')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--output', default='uber_synthetic.csv')
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--aggregates-dir', default=AGGREGATES_DIR)
+    parser.add_argument('--dirty', action='append', default=[], metavar='KIND=RATE',
+                        help=f'Override a dirty row rate; kinds: {", ".join(DEFAULT_DIRTY_RATES)}')
+    args = parser.parse_args()
+
+    try:
+        rates = {kind: float(rate) for kind, rate in (item.split('=') for item in args.dirty)}
+        generator = SyntheticTripGenerator(args.aggregates_dir, rates, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    generator.write_csv(args.output, args.rows, args.chunk_size)
+
+    print(f"\n🎯 Synthetic data generation completed successfully!")
+
+if __name__ == "__main__":
+    main()
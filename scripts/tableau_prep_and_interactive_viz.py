@@ -3,33 +3,127 @@
 Tableau Data Preparation and Interactive Visualizations
 """
 
+import argparse
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.offline as pyo
 from datetime import datetime
+import json
+import os
+import time
+from kpi_aggregates import PartialAggregateStore
+from instrumentation import instrumented
+from partitioned_store import add_date_range_arguments, date_range, read_dataset
+from dataframe_engine import get_engine
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # CSV falls back to pandas, no columnar output
+    pa = None
+
+def _label_column(codes, labels):
+    """Categorical column from integer codes into a small label table (no per-row Python objects)"""
+    return pd.Categorical.from_codes(codes, categories=pd.Index(labels))
+
+def tableau_time_fields(pickup_datetime):
+    """Derive pickup_date, pickup_time, year_month and hour_minute with integer arithmetic"""
+    if pickup_datetime.dt.tz is not None:
+        pickup_datetime = pickup_datetime.dt.tz_localize(None)
+    seconds = pickup_datetime.to_numpy(dtype='datetime64[s]').astype(np.int64)
+    days = seconds // 86400
+    second_of_day = seconds - days * 86400
+
+    first_day, last_day = int(days.min()), int(days.max())
+    date_labels = np.arange(first_day, last_day + 1).astype('datetime64[D]').astype(str)
+
+    # Civil year/month from days since epoch, then one label per month in range
+    months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    first_month, last_month = int(months.min()), int(months.max())
+    month_labels = np.arange(first_month, last_month + 1).astype('datetime64[M]').astype(str)
+
+    # 'HH:MM' for every minute of the day and 'HH:MM:SS' for every second
+    minute_of_day = np.arange(1440)
+    minute_labels = np.char.add(np.char.add(np.char.zfill((minute_of_day // 60).astype(str), 2), ':'),
+                                np.char.zfill((minute_of_day % 60).astype(str), 2))
+    second_labels = np.char.zfill(np.arange(60).astype(str), 2)
+    time_labels = np.char.add(np.char.add(np.repeat(minute_labels, 60), ':'), np.tile(second_labels, 1440))
+
+    return {
+        'pickup_date': _label_column(days - first_day, date_labels),
+        'pickup_time': _label_column(second_of_day, time_labels),
+        'year_month': _label_column(months - first_month, month_labels),
+        'hour_minute': _label_column(second_of_day // 60, minute_labels),
+    }
+
+def grid_decimate(x, y, max_points=2000, values=None):
+    """
+    Density-aware decimation: collapse points into grid cells and return one
+    row per occupied cell (centroid, count, mean value), coarsening the grid
+    until at most max_points cells remain
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x_min, x_span = x.min(), max(np.ptp(x), 1e-12)
+    y_min, y_span = y.min(), max(np.ptp(y), 1e-12)
+
+    grid = int(np.ceil(np.sqrt(max_points))) * 4
+    while True:
+        cx = np.minimum(((x - x_min) / x_span * grid).astype(np.int64), grid - 1)
+        cy = np.minimum(((y - y_min) / y_span * grid).astype(np.int64), grid - 1)
+        cells, inverse = np.unique(cx * grid + cy, return_inverse=True)
+        if len(cells) <= max_points or grid == 1:
+            break
+        grid = max(grid // 2, 1)
+
+    counts = np.bincount(inverse)
+    decimated = pd.DataFrame({
+        'x': np.bincount(inverse, weights=x) / counts,
+        'y': np.bincount(inverse, weights=y) / counts,
+        'count': counts,
+    })
+    if values is not None:
+        decimated['value'] = np.bincount(inverse, weights=np.asarray(values, dtype=float)) / counts
+    return decimated
+
+def writes_without_quotes(table):
+    """True if Arrow can write the table without quoting: no text value holds a comma, quote or line break"""
+    if table is None:
+        return False
+    import pyarrow.compute as pc
+    for column in table.columns:
+        for chunk in column.chunks:
+            values = chunk.dictionary if pa.types.is_dictionary(chunk.type) else chunk
+            if not (pa.types.is_string(values.type) or pa.types.is_large_string(values.type)):
+                continue
+            if pc.any(pc.match_substring_regex(values, '[,"\r\n]')).as_py():
+                return False
+    return True
+
+@instrumented()
 class TableauDataPrep:
     """
     Prepare data for Tableau and create interactive visualizations
     """
     
-    def __init__(self, data_path='uber_enhanced.csv'):
-        """Initialize the Tableau data prep"""
+    def __init__(self, data_path='uber_enhanced.csv', engine=None):
+        """Initialize the Tableau data prep (engine: 'pandas', 'duckdb' or None for UBER_ENGINE)"""
         self.data_path = data_path
+        self.engine = get_engine(engine)
         self.df = None
         
-    def load_and_prepare_data(self):
-        """Load and prepare data for Tableau"""
+    def load_and_prepare_data(self, df=None, start=None, end=None):
+        """Load (only pickups in [start, end) if given) and prepare data for Tableau, or take an in-memory frame"""
         print("=" * 80)
         print("TABLEAU DATA PREPARATION & INTERACTIVE VISUALIZATIONS")
         print("=" * 80)
         
-        self.df = pd.read_csv(self.data_path)
+        self.df = df if df is not None else read_dataset(self.data_path, start, end)
+        if self.df.empty:
+            print(f"\n❌ No pickups in [{start or 'the first trip'}, {end or 'the last trip'}) - nothing to analyze")
+            return False
         
         # Convert pickup_datetime back to datetime if needed
         if self.df['pickup_datetime'].dtype == 'object':
@@ -38,49 +132,83 @@ class TableauDataPrep:
         print(f"\n📊 Dataset loaded for Tableau preparation:")
         print(f"   • Shape: {self.df.shape}")
         print(f"   • Features: {len(self.df.columns)}")
+        if start is not None or end is not None:
+            print(f"   • Pickups from {start or 'the first trip'} to {end or 'the last trip'} (end exclusive)")
         
         return True
     
-    def create_tableau_optimized_dataset(self):
+    def create_tableau_optimized_dataset(self, output_path='uber_tableau_ready.csv', columnar=True):
         """Create an optimized dataset for Tableau"""
         print("\n" + "=" * 60)
         print("1. CREATING TABLEAU-OPTIMIZED DATASET")
         print("=" * 60)
         
-        # Create a subset with key features for Tableau
-        tableau_df = self.df.copy()
-        
-        # Add additional calculated fields that are useful for Tableau
-        tableau_df['pickup_date'] = tableau_df['pickup_datetime'].dt.date
-        tableau_df['pickup_time'] = tableau_df['pickup_datetime'].dt.time
-        tableau_df['year_month'] = tableau_df['pickup_datetime'].dt.to_period('M').astype(str)
-        tableau_df['hour_minute'] = tableau_df['pickup_datetime'].dt.strftime('%H:%M')
+        # Derived fields are built as new columns next to the original frame
+        # instead of copying it; date/time labels come from small lookup tables
+        derived = tableau_time_fields(self.df['pickup_datetime'])
         
         # Create revenue metrics
-        tableau_df['total_revenue'] = tableau_df['fare_amount']
-        tableau_df['revenue_per_km'] = tableau_df['fare_amount'] / (tableau_df['trip_distance_km'] + 0.001)
-        
-        # Create efficiency metrics
-        tableau_df['trips_per_hour'] = 1  # Will be aggregated in Tableau
+        derived['total_revenue'] = self.df['fare_amount']
+        derived['revenue_per_km'] = self.df['fare_amount'] / (self.df['trip_distance_km'] + 0.001)
         
         # Round coordinates for better performance in Tableau
-        tableau_df['pickup_lat_rounded'] = tableau_df['pickup_latitude'].round(4)
-        tableau_df['pickup_lon_rounded'] = tableau_df['pickup_longitude'].round(4)
-        tableau_df['dropoff_lat_rounded'] = tableau_df['dropoff_latitude'].round(4)
-        tableau_df['dropoff_lon_rounded'] = tableau_df['dropoff_longitude'].round(4)
-        
-        # Save the Tableau-optimized dataset
-        tableau_df.to_csv('uber_tableau_ready.csv', index=False)
+        derived['pickup_lat_rounded'] = self.df['pickup_latitude'].round(4)
+        derived['pickup_lon_rounded'] = self.df['pickup_longitude'].round(4)
+        derived['dropoff_lat_rounded'] = self.df['dropoff_latitude'].round(4)
+        derived['dropoff_lon_rounded'] = self.df['dropoff_longitude'].round(4)
+        
+        # Trip counts come from COUNT/Number of Records in Tableau, so no
+        # constant trips_per_hour column is written. The derived columns are
+        # added to a shallow copy, which shares the original columns' data
+        tableau_df = self.df.copy(deep=False)
+        for name, values in derived.items():
+            tableau_df[name] = values
+        
+        # Save the Tableau-optimized dataset. Both writers produce the same layout: pandas' minimal
+        # quoting, and pickup_datetime as a UTC wall-clock 'YYYY-MM-DD HH:MM:SS' without an offset
+        export_report = {}
+        start = time.perf_counter()
+        wall_clock = tableau_df['pickup_datetime']
+        if wall_clock.dt.tz is not None:
+            wall_clock = wall_clock.dt.tz_convert('UTC').dt.tz_localize(None)
+        table = None
+        if pa is not None:
+            table = pa.Table.from_pandas(tableau_df, preserve_index=False)
+            csv_table = table.set_column(
+                table.schema.get_field_index('pickup_datetime'), 'pickup_datetime',
+                pa.array(wall_clock.to_numpy(dtype='datetime64[s]'))
+            )
+        if writes_without_quotes(csv_table if table is not None else None):
+            # Arrow would quote every text value, so text that needs quotes goes through pandas
+            pa_csv.write_csv(csv_table, output_path,
+                             pa_csv.WriteOptions(quoting_style='none', quoting_header='none'))
+        else:
+            tableau_df.assign(pickup_datetime=wall_clock).to_csv(output_path, index=False,
+                                                                 date_format='%Y-%m-%d %H:%M:%S')
+        export_report['CSV'] = (output_path, time.perf_counter() - start)
+        
+        if columnar and pa is not None:
+            parquet_path = os.path.splitext(output_path)[0] + '.parquet'
+            start = time.perf_counter()
+            pq.write_table(table, parquet_path, compression='zstd')
+            export_report['Parquet'] = (parquet_path, time.perf_counter() - start)
+        elif columnar:
+            print(f"⚠️  pyarrow not installed - skipping columnar output")
         
         print(f"✅ Tableau-optimized dataset created:")
-        print(f"   • File: uber_tableau_ready.csv")
         print(f"   • Shape: {tableau_df.shape}")
-        print(f"   • Size: {tableau_df.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
+        for fmt, (path, elapsed) in export_report.items():
+            print(f"   • {fmt}: {path} ({os.path.getsize(path) / 1024**2:.2f} MB, {elapsed:.2f}s)")
         
         return tableau_df
     
-    def create_interactive_dashboard(self):
+    def create_interactive_dashboard(self, output_path='uber_interactive_dashboard.html',
+                                     max_points=2000, fare_bins=50, max_payload_kb=512):
         """Create interactive Plotly dashboard as reference for Tableau"""
+        import plotly.graph_objects as go
+        import plotly.offline as pyo
+        from plotly.subplots import make_subplots
+        from plotly.utils import PlotlyJSONEncoder
         print("\n" + "=" * 60)
         print("2. CREATING INTERACTIVE DASHBOARD")
         print("=" * 60)
@@ -91,23 +219,27 @@ class TableauDataPrep:
             subplot_titles=('Fare Distribution', 'Hourly Ride Patterns',
                           'Geographic Distribution', 'Temporal Heatmap',
                           'Distance vs Fare', 'Borough Analysis'),
-            specs=[[{"type": "histogram"}, {"type": "scatter"}],
+            specs=[[{"type": "bar"}, {"type": "scatter"}],
                    [{"type": "scattermapbox"}, {"type": "heatmap"}],
-                   [{"type": "scatter"}, {"type": "bar"}]]
+                   [{"type": "scattergl"}, {"type": "bar"}]]
         )
         
-        # 1. Fare Distribution
+        # Every trace is built from a precomputed aggregate whose size does not
+        # depend on the number of rows, so the HTML payload stays bounded
+        
+        # 1. Fare Distribution (pre-binned histogram)
+        fare_counts, fare_edges = np.histogram(self.df['fare_amount'], bins=fare_bins)
         fig.add_trace(
-            go.Histogram(x=self.df['fare_amount'], nbinsx=50, name='Fare Distribution',
-                        marker_color='skyblue', opacity=0.7),
+            go.Bar(x=(fare_edges[:-1] + fare_edges[1:]) / 2, y=fare_counts, width=np.diff(fare_edges),
+                   name='Fare Distribution', marker_color='skyblue', opacity=0.7),
             row=1, col=1
         )
         
         # 2. Hourly Ride Patterns
-        hourly_data = self.df.groupby('pickup_hour').agg({
-            'fare_amount': ['count', 'mean']
-        }).reset_index()
-        hourly_data.columns = ['hour', 'ride_count', 'avg_fare']
+        hourly_data = self.engine.group_agg(self.df, 'pickup_hour', {
+            'ride_count': ('fare_amount', 'count'),
+            'avg_fare': ('fare_amount', 'mean')
+        }).reset_index().rename(columns={'pickup_hour': 'hour'})
         
         fig.add_trace(
             go.Scatter(x=hourly_data['hour'], y=hourly_data['ride_count'],
@@ -116,43 +248,49 @@ class TableauDataPrep:
             row=1, col=2
         )
         
-        # 3. Geographic Distribution (sample for performance)
-        sample_df = self.df.sample(n=min(1000, len(self.df)), random_state=42)
+        # 3. Geographic Distribution (all pickups, decimated into density cells)
+        pickup_cells = grid_decimate(self.df['pickup_longitude'], self.df['pickup_latitude'],
+                                     max_points, values=self.df['fare_amount'])
         
         fig.add_trace(
             go.Scattermapbox(
-                lat=sample_df['pickup_latitude'],
-                lon=sample_df['pickup_longitude'],
+                lat=pickup_cells['y'],
+                lon=pickup_cells['x'],
                 mode='markers',
-                marker=dict(size=5, color=sample_df['fare_amount'], 
-                          colorscale='Viridis', showscale=True),
-                text=sample_df['fare_amount'],
+                marker=dict(size=np.clip(3 + 2 * np.log1p(pickup_cells['count']), 3, 15),
+                          color=pickup_cells['value'], colorscale='Viridis', showscale=True),
+                text=[f'{n:,} rides, avg ${v:.2f}' for n, v in zip(pickup_cells['count'], pickup_cells['value'])],
                 name='Pickup Locations'
             ),
             row=2, col=1
         )
         
-        # 4. Temporal Heatmap
-        pivot_data = self.df.groupby(['pickup_hour', 'pickup_weekday'])['fare_amount'].mean().unstack()
+        # 4. Temporal Heatmap (hour x weekday matrix)
+        pivot_data = self.engine.pivot_matrix(self.df, 'pickup_hour', 'pickup_weekday', 'fare_amount', 'mean',
+                                              range(24), range(7))
         
         fig.add_trace(
-            go.Heatmap(z=pivot_data.values, x=list(range(7)), y=list(range(24)),
+            go.Heatmap(z=pivot_data, x=list(range(7)), y=list(range(24)),
                       colorscale='YlOrRd', name='Fare Heatmap'),
             row=2, col=2
         )
         
-        # 5. Distance vs Fare
-        sample_df2 = self.df.sample(n=min(2000, len(self.df)), random_state=42)
+        # 5. Distance vs Fare (WebGL, decimated into density cells)
+        distance_cells = grid_decimate(self.df['trip_distance_km'], self.df['fare_amount'], max_points)
         
         fig.add_trace(
-            go.Scatter(x=sample_df2['trip_distance_km'], y=sample_df2['fare_amount'],
+            go.Scattergl(x=distance_cells['x'], y=distance_cells['y'],
                       mode='markers', name='Distance vs Fare',
-                      marker=dict(color='green', opacity=0.6)),
+                      marker=dict(color=np.log10(distance_cells['count']), colorscale='Greens', opacity=0.6),
+                      text=[f'{n:,} rides' for n in distance_cells['count']]),
             row=3, col=1
         )
         
         # 6. Borough Analysis
-        borough_stats = self.df.groupby('pickup_borough')['fare_amount'].agg(['mean', 'count']).reset_index()
+        borough_stats = self.engine.group_agg(self.df, 'pickup_borough', {
+            'mean': ('fare_amount', 'mean'),
+            'count': ('fare_amount', 'count')
+        }).reset_index()
         borough_stats = borough_stats[borough_stats['count'] > 100]  # Filter for significant data
         
         fig.add_trace(
@@ -178,57 +316,40 @@ class TableauDataPrep:
             )
         )
         
+        # Enforce the payload ceiling before writing anything
+        trace_sizes = [
+            (trace.name, len(json.dumps(trace.to_plotly_json(), cls=PlotlyJSONEncoder)))
+            for trace in fig.data
+        ]
+        total_payload = sum(size for _, size in trace_sizes)
+        if total_payload > max_payload_kb * 1024:
+            raise ValueError(f"Dashboard data payload {total_payload / 1024:.1f} KB exceeds "
+                             f"the {max_payload_kb} KB ceiling")
+        
         # Save interactive dashboard
-        pyo.plot(fig, filename='uber_interactive_dashboard.html', auto_open=False)
+        pyo.plot(fig, filename=output_path, auto_open=False)
         
         print(f"✅ Interactive dashboard created:")
-        print(f"   • File: uber_interactive_dashboard.html")
+        print(f"   • File: {output_path} ({os.path.getsize(output_path) / 1024**2:.2f} MB including plotly.js)")
+        print(f"   • Data payload: {total_payload / 1024:.1f} KB (ceiling {max_payload_kb} KB)")
+        for name, size in trace_sizes:
+            print(f"      - {name}: {size / 1024:.1f} KB")
         print(f"   • Open this file in a web browser to view the interactive dashboard")
     
-    def create_summary_statistics(self):
+    def create_summary_statistics(self, partials_path='uber_partial_aggregates.csv'):
         """Create summary statistics for Tableau dashboard"""
         print("\n" + "=" * 60)
         print("3. CREATING SUMMARY STATISTICS")
         print("=" * 60)
         
-        # Key Performance Indicators
-        total_rides = len(self.df)
-        total_revenue = self.df['fare_amount'].sum()
-        avg_fare = self.df['fare_amount'].mean()
-        avg_distance = self.df['trip_distance_km'].mean()
-        avg_duration = self.df['trip_distance_km'].mean() / 25 * 60  # Assuming 25 km/h average speed
-        
-        # Temporal insights
-        busiest_hour = self.df.groupby('pickup_hour').size().idxmax()
-        busiest_day = self.df.groupby('day_of_week').size().idxmax()
-        peak_month = self.df.groupby('pickup_month').size().idxmax()
-        
-        # Geographic insights
-        top_borough = self.df['pickup_borough'].value_counts().index[0]
-        inter_borough_pct = (self.df['is_inter_borough'].sum() / len(self.df)) * 100
+        # All KPIs and aggregations come from per-(day, hour, borough) partial
+        # aggregates; the partials are saved so later days can be folded in
+        # with kpi_aggregates.py instead of recomputing from the full frame
+        store = PartialAggregateStore.from_frame(self.df)
+        store.save(partials_path)
         
         # Create KPI summary
-        kpi_summary = {
-            'Metric': [
-                'Total Rides', 'Total Revenue', 'Average Fare', 'Average Distance',
-                'Average Duration (min)', 'Busiest Hour', 'Busiest Day', 'Peak Month',
-                'Top Borough', 'Inter-Borough Trips (%)'
-            ],
-            'Value': [
-                f"{total_rides:,}",
-                f"${total_revenue:,.2f}",
-                f"${avg_fare:.2f}",
-                f"{avg_distance:.2f} km",
-                f"{avg_duration:.1f}",
-                f"{busiest_hour}:00",
-                busiest_day,
-                f"Month {peak_month}",
-                top_borough,
-                f"{inter_borough_pct:.1f}%"
-            ]
-        }
-        
-        kpi_df = pd.DataFrame(kpi_summary)
+        kpi_df = store.kpi_summary()
         kpi_df.to_csv('uber_kpi_summary.csv', index=False)
         
         print(f"✅ KPI Summary created:")
@@ -236,41 +357,19 @@ class TableauDataPrep:
         
         # Print KPIs
         print(f"\n📊 Key Performance Indicators:")
-        for metric, value in zip(kpi_summary['Metric'], kpi_summary['Value']):
+        for metric, value in kpi_df.itertuples(index=False):
             print(f"   • {metric}: {value}")
         
         # Create aggregated data for Tableau
-        # Hourly aggregation
-        hourly_agg = self.df.groupby('pickup_hour').agg({
-            'fare_amount': ['count', 'mean', 'sum'],
-            'trip_distance_km': 'mean',
-            'passenger_count': 'mean'
-        }).round(2)
-        hourly_agg.columns = ['rides_count', 'avg_fare', 'total_revenue', 'avg_distance', 'avg_passengers']
-        hourly_agg.reset_index().to_csv('uber_hourly_aggregation.csv', index=False)
-        
-        # Daily aggregation
-        daily_agg = self.df.groupby('day_of_week').agg({
-            'fare_amount': ['count', 'mean', 'sum'],
-            'trip_distance_km': 'mean',
-            'passenger_count': 'mean'
-        }).round(2)
-        daily_agg.columns = ['rides_count', 'avg_fare', 'total_revenue', 'avg_distance', 'avg_passengers']
-        daily_agg.reset_index().to_csv('uber_daily_aggregation.csv', index=False)
-        
-        # Borough aggregation
-        borough_agg = self.df.groupby('pickup_borough').agg({
-            'fare_amount': ['count', 'mean', 'sum'],
-            'trip_distance_km': 'mean',
-            'passenger_count': 'mean'
-        }).round(2)
-        borough_agg.columns = ['rides_count', 'avg_fare', 'total_revenue', 'avg_distance', 'avg_passengers']
-        borough_agg.reset_index().to_csv('uber_borough_aggregation.csv', index=False)
+        store.hourly_aggregation().reset_index().to_csv('uber_hourly_aggregation.csv', index=False)
+        store.daily_aggregation().reset_index().to_csv('uber_daily_aggregation.csv', index=False)
+        store.borough_aggregation().reset_index().to_csv('uber_borough_aggregation.csv', index=False)
         
         print(f"\n✅ Aggregated datasets created for Tableau:")
         print(f"   • uber_hourly_aggregation.csv")
         print(f"   • uber_daily_aggregation.csv")
         print(f"   • uber_borough_aggregation.csv")
+        print(f"   • {partials_path} (partial aggregates for incremental refresh)")
     
     def generate_tableau_instructions(self):
         """Generate instructions for creating Tableau dashboard"""
@@ -365,8 +464,15 @@ TABLEAU PUBLIC DASHBOARD CREATION GUIDE
 
 def main():
     """Main function to run Tableau preparation"""
-    prep = TableauDataPrep('uber_enhanced.csv')
-    prep.load_and_prepare_data()
+    parser = argparse.ArgumentParser(description='Tableau exports and interactive dashboard')
+    parser.add_argument('--data', default='uber_enhanced.csv', help='Enhanced dataset')
+    add_date_range_arguments(parser)
+    args = parser.parse_args()
+    start, end = date_range(args)
+
+    prep = TableauDataPrep(args.data)
+    if not prep.load_and_prepare_data(start=start, end=end):
+        return
     tableau_df = prep.create_tableau_optimized_dataset()
     prep.create_interactive_dashboard()
     prep.create_summary_statistics()
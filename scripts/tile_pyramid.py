@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Multi-Zoom Geographic Tile Pyramid for Pickup and Dropoff Density Maps
+"""
+
+import argparse
+import json
+import os
+import time
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+def lonlat_to_tile(lon, lat, zoom):
+    """Web Mercator (slippy map) tile x/y for arrays of coordinates"""
+    n = 1 << zoom
+    lat_rad = np.radians(np.asarray(lat, dtype=float))
+    x = (np.asarray(lon, dtype=float) + 180.0) / 360.0 * n
+    y = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0 * n
+    return (np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64))
+
+def tile_to_lonlat(x, y, zoom):
+    """Longitude/latitude of the north-west corner of tiles"""
+    n = 1 << zoom
+    lon = np.asarray(x) / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y) / n))))
+    return lon, lat
+
+class TilePyramid:
+    """
+    Per-tile trip count and fare sum at every zoom level between min_zoom and max_zoom
+
+    Each level stores three parallel arrays sorted by tile key, where
+    key = x << zoom | y. Tiles of one x column are therefore contiguous and a
+    viewport query is one binary search per column.
+    """
+
+    def __init__(self, min_zoom=8, max_zoom=16):
+        """Initialize an empty pyramid"""
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.levels = {}
+
+    @staticmethod
+    def _aggregate(keys, counts, fare_sums):
+        """Sum counts and fares per unique key (output sorted by key)"""
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        return (unique_keys,
+                np.bincount(inverse, weights=counts).astype(np.uint32),
+                np.bincount(inverse, weights=fare_sums))
+
+    def build(self, lon, lat, fare):
+        """Aggregate points at the finest zoom, then derive coarser levels by summing children"""
+        x, y = lonlat_to_tile(lon, lat, self.max_zoom)
+        fare = np.asarray(fare, dtype=float)
+        keys, counts, fare_sums = self._aggregate((x << self.max_zoom) | y, np.ones(len(fare)), fare)
+        self.levels[self.max_zoom] = (keys, counts, fare_sums)
+
+        for zoom in range(self.max_zoom - 1, self.min_zoom - 1, -1):
+            child_zoom = zoom + 1
+            child_keys, child_counts, child_sums = self.levels[child_zoom]
+            parent_x = (child_keys >> child_zoom) >> 1
+            parent_y = (child_keys & ((1 << child_zoom) - 1)) >> 1
+            self.levels[zoom] = self._aggregate((parent_x << zoom) | parent_y, child_counts, child_sums)
+        return self
+
+    def query(self, min_lon, min_lat, max_lon, max_lat, zoom):
+        """Tiles intersecting a viewport at one zoom level"""
+        keys, counts, fare_sums = self.levels[zoom]
+        x0, y0 = lonlat_to_tile(min_lon, max_lat, zoom)
+        x1, y1 = lonlat_to_tile(max_lon, min_lat, zoom)
+        columns = np.arange(int(x0), int(x1) + 1, dtype=np.int64)
+        starts = np.searchsorted(keys, (columns << zoom) | int(y0), side='left')
+        ends = np.searchsorted(keys, (columns << zoom) | int(y1), side='right')
+
+        lengths = ends - starts
+        index = np.repeat(starts - np.cumsum(np.r_[0, lengths[:-1]]), lengths) + np.arange(lengths.sum())
+        tile_keys = np.asarray(keys[index])
+        tile_x = tile_keys >> zoom
+        tile_y = tile_keys & ((1 << zoom) - 1)
+        west, north = tile_to_lonlat(tile_x, tile_y, zoom)
+        east, south = tile_to_lonlat(tile_x + 1, tile_y + 1, zoom)
+        tile_counts = np.asarray(counts[index])
+        return pd.DataFrame({
+            'zoom': zoom,
+            'tile_x': tile_x,
+            'tile_y': tile_y,
+            'center_lon': (west + east) / 2,
+            'center_lat': (north + south) / 2,
+            'trip_count': tile_counts,
+            'mean_fare': np.asarray(fare_sums[index]) / tile_counts,
+        })
+
+    def save(self, directory):
+        """Write one .npy file per array per level plus a manifest"""
+        os.makedirs(directory, exist_ok=True)
+        manifest = {'min_zoom': self.min_zoom, 'max_zoom': self.max_zoom, 'levels': {}}
+        for zoom, (keys, counts, fare_sums) in self.levels.items():
+            for name, array in (('keys', keys), ('counts', counts), ('fare_sums', fare_sums)):
+                np.save(os.path.join(directory, f'z{zoom}_{name}.npy'), array)
+            manifest['levels'][str(zoom)] = {'tiles': len(keys), 'trips': int(counts.sum())}
+        with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Open a saved pyramid; arrays are memory-mapped so only queried pages are read"""
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            manifest = json.load(f)
+        pyramid = cls(manifest['min_zoom'], manifest['max_zoom'])
+        mode = 'r' if mmap else None
+        for zoom in map(int, manifest['levels']):
+            pyramid.levels[zoom] = tuple(
+                np.load(os.path.join(directory, f'z{zoom}_{name}.npy'), mmap_mode=mode)
+                for name in ('keys', 'counts', 'fare_sums')
+            )
+        return pyramid
+
+    def nbytes(self):
+        """Total size of all levels"""
+        return sum(array.nbytes for level in self.levels.values() for array in level)
+
+class UberTilePyramidBuilder:
+    """
+    Build pickup and dropoff tile pyramids over every trip
+    """
+
+    def __init__(self, data_path='uber_cleaned.csv', output_dir='tiles', min_zoom=8, max_zoom=16):
+        """Initialize the builder"""
+        self.data_path = data_path
+        self.output_dir = output_dir
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.df = None
+        self.pyramids = {}
+
+    def load_data(self):
+        """Load coordinates and fares"""
+        print("=" * 80)
+        print("UBER FARES DATASET - GEOGRAPHIC TILE PYRAMID")
+        print("=" * 80)
+
+        self.df = pd.read_csv(self.data_path, usecols=[
+            'fare_amount', 'pickup_longitude', 'pickup_latitude', 'dropoff_longitude', 'dropoff_latitude'
+        ])
+
+        print(f"\n📊 Trips loaded: {len(self.df):,}")
+        return True
+
+    def build_pyramids(self):
+        """Build and save one pyramid per trip endpoint"""
+        print("\n" + "=" * 60)
+        print("1. BUILDING TILE PYRAMIDS")
+        print("=" * 60)
+
+        for layer in ('pickup', 'dropoff'):
+            start = time.perf_counter()
+            pyramid = TilePyramid(self.min_zoom, self.max_zoom).build(
+                self.df[f'{layer}_longitude'], self.df[f'{layer}_latitude'], self.df['fare_amount']
+            )
+            elapsed = time.perf_counter() - start
+            path = pyramid.save(os.path.join(self.output_dir, layer))
+            self.pyramids[layer] = pyramid
+
+            print(f"\n✅ {layer.title()} pyramid built in {elapsed:.2f}s ({pyramid.nbytes() / 1024**2:.2f} MB)")
+            for zoom in range(self.min_zoom, self.max_zoom + 1):
+                print(f"   • Zoom {zoom:2d}: {len(pyramid.levels[zoom][0]):,} tiles")
+            print(f"   💾 Saved to: {path}")
+
+    def benchmark_queries(self, zoom=14, n_queries=200, seed=42):
+        """Time random Manhattan-sized viewport queries against the saved pyramid"""
+        print("\n" + "=" * 60)
+        print("2. VIEWPORT QUERY BENCHMARK")
+        print("=" * 60)
+
+        pyramid = TilePyramid.load(os.path.join(self.output_dir, 'pickup'))
+        rng = np.random.default_rng(seed)
+        centers_lon = rng.uniform(-74.02, -73.93, n_queries)
+        centers_lat = rng.uniform(40.70, 40.88, n_queries)
+
+        timings, tiles = [], []
+        for lon, lat in zip(centers_lon, centers_lat):
+            start = time.perf_counter()
+            result = pyramid.query(lon - 0.03, lat - 0.02, lon + 0.03, lat + 0.02, zoom)
+            timings.append(time.perf_counter() - start)
+            tiles.append(len(result))
+
+        timings_ms = np.array(timings) * 1000
+        print(f"\n📊 {n_queries} viewport queries at zoom {zoom}:")
+        print(f"   • Average tiles returned: {np.mean(tiles):.0f}")
+        print(f"   • Latency p50: {np.percentile(timings_ms, 50):.2f} ms")
+        print(f"   • Latency p99: {np.percentile(timings_ms, 99):.2f} ms")
+
+    def export_level(self, zoom, output_path=None):
+        """Write one zoom level of both layers as a CSV for Tableau"""
+        output_path = output_path or f'uber_tiles_z{zoom}.csv'
+        frames = []
+        for layer, pyramid in self.pyramids.items():
+            frame = pyramid.query(-180, -85, 180, 85, zoom)
+            frame.insert(0, 'layer', layer)
+            frames.append(frame)
+        pd.concat(frames, ignore_index=True).to_csv(output_path, index=False)
+        print(f"\n💾 Zoom {zoom} tiles saved to: {output_path}")
+        return output_path
+
+def main():
+    """Main function to build the tile pyramids"""
+    parser = argparse.ArgumentParser(description='Pickup/dropoff tile pyramid builder')
+    parser.add_argument('--data', default='uber_cleaned.csv')
+    parser.add_argument('--output-dir', default='tiles')
+    parser.add_argument('--min-zoom', type=int, default=8)
+    parser.add_argument('--max-zoom', type=int, default=16)
+    parser.add_argument('--export-zoom', type=int, default=None, help='Also write this zoom level as CSV')
+    args = parser.parse_args()
+
+    builder = UberTilePyramidBuilder(args.data, args.output_dir, args.min_zoom, args.max_zoom)
+    builder.load_data()
+    builder.build_pyramids()
+    builder.benchmark_queries(zoom=min(14, args.max_zoom))
+    if args.export_zoom is not None:
+        builder.export_level(args.export_zoom)
+
+    print(f"\n🎯 Tile pyramid completed successfully!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Time-Sorted Trip Store: Pickup-Ordered Memory-Mapped Columns with a Sparse Block Index
+"""
+
+import argparse
+import os
+import time
+import pandas as pd
+import numpy as np
+from column_cache import ColumnCache, decode_column, encode_column
+from partitioned_store import DATE_COLUMN, _parse_dates, add_date_range_arguments, date_range, to_utc
+import warnings
+warnings.filterwarnings('ignore')
+
+# Rows per block of the sparse index (one int64 timestamp per block)
+BLOCK_ROWS = 4096
+
+# Window lengths timed by the benchmark, from a single hour to the whole dataset
+BENCHMARK_WINDOWS = {'1 hour': pd.Timedelta(hours=1), '1 day': pd.Timedelta(days=1),
+                     '1 week': pd.Timedelta(weeks=1), '30 days': pd.Timedelta(days=30),
+                     '1 year': pd.Timedelta(days=365)}
+
+def time_sorted_dir_for(data_path):
+    """Time-sorted store that sits next to a CSV: uber_enhanced.csv -> uber_enhanced_by_time/"""
+    return os.path.splitext(data_path)[0] + '_by_time'
+
+def day_windows(first_day, last_day, start_time, end_time, weekdays=None):
+    """
+    (starts, ends) of the same time-of-day window on every day from first_day to last_day
+
+    day_windows('2014-01-01', '2014-12-31', '07:00', '09:00', weekdays=[1])
+    gives 7-9 AM on every Tuesday of 2014 (Monday=0).
+    """
+    days = pd.date_range(to_utc(first_day).normalize(), to_utc(last_day).normalize(), freq='D')
+    if weekdays is not None:
+        days = days[days.weekday.isin(list(weekdays))]
+    return days + pd.Timedelta(start_time + ':00'), days + pd.Timedelta(end_time + ':00')
+
+class TimeSortedStore(ColumnCache):
+    """
+    Column cache of a dataset written once in pickup_datetime order
+
+    The rows are ordered by a stable argsort of the int64 pickup
+    nanoseconds, and the manifest holds a sparse index with the first
+    timestamp of every block of BLOCK_ROWS rows. A range bound is found by
+    a binary search of the small index and a second one inside a single
+    block of the mapped timestamp column, so a query touches O(log n)
+    index entries plus the pages of its own rows. Range slices are views of
+    the mapped columns (numbers, codes and naive timestamps are not copied);
+    their cost grows with the result, not with the dataset.
+    """
+
+    def __init__(self, directory):
+        """Initialize the store for one directory"""
+        super().__init__(directory)
+        self.arrays = None
+        self.times = None
+        self.block_index = None
+
+    def write_sorted(self, df, source_path=None, block_rows=BLOCK_ROWS):
+        """Sort the frame by pickup time once and write it with its block index"""
+        df = _parse_dates(df.copy(deep=False))
+        nanoseconds = encode_column(df[DATE_COLUMN])[0]
+        if not np.all(nanoseconds[1:] >= nanoseconds[:-1]):
+            order = np.argsort(nanoseconds, kind='stable')
+            df = df.take(order)
+            nanoseconds = nanoseconds[order]
+        extra = {'sort_key': DATE_COLUMN, 'block_rows': block_rows,
+                 'block_index': nanoseconds[::block_rows].tolist()}
+        return self.write(df.reset_index(drop=True), source_path, extra)
+
+    def open(self):
+        """Map every column and load the block index"""
+        self.manifest = self._read_manifest()
+        if self.manifest is None or 'block_index' not in self.manifest:
+            raise FileNotFoundError(f"No time-sorted store in {self.directory}")
+        self.arrays = {entry['name']: (np.asarray(np.load(os.path.join(self.directory, entry['file']), mmap_mode='c')),
+                                       entry) for entry in self.manifest['columns']}
+        self.times = self.arrays[self.manifest['sort_key']][0]
+        self.block_index = np.asarray(self.manifest['block_index'], dtype=np.int64)
+        return self
+
+    def _search(self, nanoseconds):
+        """First row position with a pickup at or after nanoseconds"""
+        block = int(np.searchsorted(self.block_index, nanoseconds, side='left'))
+        if block == 0:
+            return 0
+        # The first block starting at or after the bound begins after the answer: search the block before it
+        first = (block - 1) * self.manifest['block_rows']
+        stop = min(first + self.manifest['block_rows'], len(self.times))
+        return first + int(np.searchsorted(self.times[first:stop], nanoseconds, side='left'))
+
+    def _bound(self, value, default):
+        """Row position of a range bound (None: the start or end of the data)"""
+        return default if value is None else self._search(to_utc(value).value)
+
+    def positions(self, start=None, end=None):
+        """(first, stop) row positions of the pickups in [start, end)"""
+        if self.arrays is None:
+            self.open()
+        first = self._bound(start, 0)
+        return first, max(first, self._bound(end, len(self.times)))
+
+    def rows(self, first, stop, columns=None):
+        """DataFrame of rows first..stop-1 built on views of the mapped columns"""
+        if self.arrays is None:
+            self.open()
+        names = list(self.arrays) if columns is None else list(columns)
+        data = {name: decode_column(self.arrays[name][0][first:stop], self.arrays[name][1]) for name in names}
+        return pd.DataFrame(data, copy=False)
+
+    def slice(self, start=None, end=None, columns=None):
+        """Pickups in [start, end), without scanning or copying the rest of the data"""
+        return self.rows(*self.positions(start, end), columns)
+
+    def windows(self, starts, ends, columns=None):
+        """
+        Pickups in many [start, end) windows at once, with a window column
+
+        Each window costs two binary searches; only the matching rows are
+        gathered, so the cost is O(windows x log n + result rows).
+        """
+        if self.arrays is None:
+            self.open()
+        bounds = np.array([self.positions(start, end) for start, end in zip(starts, ends)],
+                          dtype=np.int64).reshape(-1, 2)
+        lengths = bounds[:, 1] - bounds[:, 0]
+        window = np.repeat(np.arange(len(bounds)), lengths)
+        offsets = np.repeat(bounds[:, 0] - (np.cumsum(lengths) - lengths), lengths)
+        positions = np.arange(lengths.sum()) + offsets
+        names = list(self.arrays) if columns is None else list(columns)
+        data = {'window': window}
+        data.update({name: decode_column(self.arrays[name][0][positions], self.arrays[name][1]) for name in names})
+        return pd.DataFrame(data, copy=False)
+
+def write_time_sorted(df, data_path):
+    """Write the time-sorted store of a dataset just saved to data_path"""
+    return TimeSortedStore(time_sorted_dir_for(data_path)).write_sorted(df, source_path=data_path)
+
+def _best_time(function, repeat=5):
+    """Fastest of repeat runs, in seconds, and the last result"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    """Main function to build time-sorted stores and compare range slices with full scans"""
+    parser = argparse.ArgumentParser(description='Time-sorted trip store with O(log n) range slicing')
+    parser.add_argument('data', help='CSV file, e.g. uber_enhanced.csv')
+    parser.add_argument('--block-rows', type=int, default=BLOCK_ROWS, help='Rows per sparse index block')
+    add_date_range_arguments(parser)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("UBER FARES DATASET - TIME-SORTED STORE")
+    print("=" * 80)
+
+    store = TimeSortedStore(time_sorted_dir_for(args.data))
+    if not store.is_fresh(args.data) or store._read_manifest().get('block_rows') != args.block_rows:
+        build_start = time.perf_counter()
+        store.write_sorted(pd.read_csv(args.data), args.data, args.block_rows)
+        print(f"\n✅ Built {store.directory}/ in {time.perf_counter() - build_start:.2f}s")
+    store.open()
+    first_trip = pd.Timestamp(int(store.times[0]), tz='UTC')
+    last_trip = pd.Timestamp(int(store.times[-1]), tz='UTC')
+    print(f"\n📊 {args.data} -> {store.directory}/:")
+    print(f"   • Rows: {len(store.times):,} from {first_trip} to {last_trip}")
+    print(f"   • Sparse index: {len(store.block_index):,} blocks of {args.block_rows:,} rows")
+
+    start, end = date_range(args)
+    if start is not None or end is not None:
+        elapsed, result = _best_time(lambda: store.slice(start, end))
+        print(f"\n🎯 Pickups in [{start}, {end}): {len(result):,} rows in {elapsed * 1000:.3f} ms")
+
+    # Full-scan baseline: a boolean mask over the same columns held in memory
+    df = store.read()
+    times = df[DATE_COLUMN]
+    middle = first_trip + (last_trip - first_trip) / 2
+    print(f"\n⏱️ Range queries starting at {middle:%Y-%m-%d %H:%M} (best of 5):")
+    for label, width in BENCHMARK_WINDOWS.items():
+        search_s, _ = _best_time(lambda: store.positions(middle, middle + width))
+        sliced_s, sliced = _best_time(lambda: store.slice(middle, middle + width))
+        scan_s, scanned = _best_time(lambda: df.loc[((times >= middle) & (times < middle + width)).to_numpy()])
+        check = '✅' if sliced.equals(scanned.reset_index(drop=True)) else '❌'
+        print(f"   {check} {label:8s} {len(sliced):9,} rows: search {search_s * 1e6:6.1f} µs, "
+              f"slice {sliced_s * 1000:7.3f} ms, full scan {scan_s * 1000:7.2f} ms")
+
+    starts, ends = day_windows(first_trip, last_trip, '07:00', '09:00', weekdays=[1])
+    windows_s, windows = _best_time(lambda: store.windows(starts, ends, ['fare_amount']))
+    print(f"\n📋 7-9 AM on every Tuesday: {len(starts):,} windows, {len(windows):,} trips "
+          f"in {windows_s * 1000:.2f} ms (mean fare ${windows['fare_amount'].mean():.2f})")
+
+    print(f"\n🎯 Time-sorted store ready!")
+
+if __name__ == "__main__":
+    main()
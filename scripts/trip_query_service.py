@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Local Indexed Query Service for Dashboard Drill-Down Filters
+"""
+
+import argparse
+import json
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+def _popcount(words):
+    """Number of set bits in a uint64 array"""
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+def _lookup_key(value):
+    """Normalize a filter value so 1, True and 'True' all address the same category"""
+    text = str(value.item() if isinstance(value, np.generic) else value)
+    return {'True': '1', 'False': '0'}.get(text, text)
+
+class TripQueryIndex:
+    """
+    Time-sorted trip columns with bitmap indexes on the low-cardinality filter columns
+
+    Rows are ordered by pickup time so a date range is a contiguous row range
+    found by binary search. Every value of an indexed column has a bitmap
+    stored as packed uint64 words; a query ORs the bitmaps of the requested
+    values per column and ANDs across columns, touching only the words that
+    overlap the date range.
+    """
+
+    BITMAP_COLUMNS = ['pickup_borough', 'time_period', 'distance_category', 'passenger_count',
+                      'day_of_week', 'is_weekend', 'is_peak_hour']
+    GROUP_COLUMNS = BITMAP_COLUMNS + ['pickup_hour', 'pickup_month', 'pickup_year']
+    MEASURE_COLUMNS = ['fare_amount', 'trip_distance_km']
+
+    def __init__(self):
+        """Initialize an empty index"""
+        self.n_rows = 0
+        self.timestamps = None
+        self.measures = {}
+        self.codes = {}
+        self.categories = {}
+        self.bitmaps = {}
+
+    @classmethod
+    def build(cls, df):
+        """Sort by pickup time once and build every column and bitmap"""
+        index = cls()
+        seconds = pd.to_datetime(df['pickup_datetime'])
+        if seconds.dt.tz is not None:
+            seconds = seconds.dt.tz_localize(None)
+        seconds = seconds.to_numpy(dtype='datetime64[s]').astype(np.int64)
+        order = np.argsort(seconds, kind='stable')
+
+        index.n_rows = len(df)
+        index.timestamps = seconds[order]
+        for col in cls.MEASURE_COLUMNS:
+            index.measures[col] = df[col].to_numpy(dtype=np.float64)[order]
+        for col in cls.GROUP_COLUMNS:
+            codes, categories = pd.factorize(df[col], sort=True)
+            index.codes[col] = codes.astype(np.int16)[order]
+            index.categories[col] = list(categories)
+
+        n_words = (index.n_rows + 63) // 64
+        for col in cls.BITMAP_COLUMNS:
+            bitmap = np.zeros((len(index.categories[col]), n_words), dtype=np.uint64)
+            for code in range(len(index.categories[col])):
+                packed = np.packbits(index.codes[col] == code, bitorder='little')
+                bitmap[code].view(np.uint8)[:len(packed)] = packed
+            index.bitmaps[col] = bitmap
+        return index
+
+    def save(self, directory):
+        """Write every array as .npy plus a JSON manifest"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'timestamps.npy'), self.timestamps)
+        for col, values in self.measures.items():
+            np.save(os.path.join(directory, f'measure_{col}.npy'), values)
+        for col, values in self.codes.items():
+            np.save(os.path.join(directory, f'codes_{col}.npy'), values)
+        for col, bitmap in self.bitmaps.items():
+            np.save(os.path.join(directory, f'bitmap_{col}.npy'), bitmap)
+        manifest = {'n_rows': self.n_rows, 'categories': {
+            col: [c.item() if isinstance(c, np.generic) else c for c in cats] for col, cats in self.categories.items()
+        }}
+        with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return directory
+
+    @classmethod
+    def load(cls, directory):
+        """Memory-map a saved index"""
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            manifest = json.load(f)
+        index = cls()
+        index.n_rows = manifest['n_rows']
+        index.categories = manifest['categories']
+        index.timestamps = np.load(os.path.join(directory, 'timestamps.npy'), mmap_mode='r')
+        for col in cls.MEASURE_COLUMNS:
+            index.measures[col] = np.load(os.path.join(directory, f'measure_{col}.npy'), mmap_mode='r')
+        for col in cls.GROUP_COLUMNS:
+            index.codes[col] = np.load(os.path.join(directory, f'codes_{col}.npy'), mmap_mode='r')
+        for col in cls.BITMAP_COLUMNS:
+            index.bitmaps[col] = np.load(os.path.join(directory, f'bitmap_{col}.npy'), mmap_mode='r')
+        return index
+
+    def _row_range(self, date_from, date_to):
+        """Row range [start, stop) for pickups in [date_from, date_to)"""
+        start = 0 if date_from is None else int(np.searchsorted(
+            self.timestamps, np.datetime64(date_from, 's').astype(np.int64), side='left'))
+        stop = self.n_rows if date_to is None else int(np.searchsorted(
+            self.timestamps, np.datetime64(date_to, 's').astype(np.int64), side='left'))
+        return start, max(start, stop)
+
+    def _selection(self, filters, start, stop):
+        """Packed selection words covering rows [start, stop), with the row offset of word 0"""
+        word_start, word_stop = start // 64, (stop + 63) // 64
+        selection = np.full(word_stop - word_start, np.uint64(0xFFFFFFFFFFFFFFFF), dtype=np.uint64)
+
+        for col, values in filters.items():
+            if col not in self.bitmaps:
+                raise ValueError(f"Column {col} is not indexed; filterable columns: {self.BITMAP_COLUMNS}")
+            lookup = {_lookup_key(c): i for i, c in enumerate(self.categories[col])}
+            column_words = np.zeros_like(selection)
+            for value in (values if isinstance(values, list) else [values]):
+                code = lookup.get(_lookup_key(value))
+                if code is not None:
+                    column_words |= self.bitmaps[col][code, word_start:word_stop]
+            selection &= column_words
+
+        # Clear bits outside [start, stop) in the edge words
+        if len(selection):
+            head, tail = start - word_start * 64, word_stop * 64 - stop
+            selection[0] &= np.uint64((0xFFFFFFFFFFFFFFFF << head) & 0xFFFFFFFFFFFFFFFF)
+            selection[-1] &= np.uint64(0xFFFFFFFFFFFFFFFF >> tail)
+        return selection, word_start * 64
+
+    def query(self, filters=None, date_from=None, date_to=None, group_by=None):
+        """Filter-plus-aggregate query returning counts, sums and means"""
+        start, stop = self._row_range(date_from, date_to)
+        selection, offset = self._selection(filters or {}, start, stop)
+        matched = _popcount(selection)
+        result = {'rows_matched': matched}
+
+        if matched == 0:
+            result['metrics'] = {col: {'sum': 0.0, 'mean': None} for col in self.MEASURE_COLUMNS}
+            result['groups'] = [] if group_by else None
+            return result
+
+        rows = offset + np.flatnonzero(np.unpackbits(selection.view(np.uint8), bitorder='little'))
+        result['metrics'] = {}
+        for col in self.MEASURE_COLUMNS:
+            total = float(self.measures[col][rows].sum())
+            result['metrics'][col] = {'sum': total, 'mean': total / matched}
+
+        if group_by:
+            if group_by not in self.codes:
+                raise ValueError(f"Cannot group by {group_by}; groupable columns: {self.GROUP_COLUMNS}")
+            codes = self.codes[group_by][rows]
+            n_groups = len(self.categories[group_by])
+            counts = np.bincount(codes, minlength=n_groups)
+            sums = {col: np.bincount(codes, weights=self.measures[col][rows], minlength=n_groups)
+                    for col in self.MEASURE_COLUMNS}
+            result['groups'] = [
+                {group_by: self.categories[group_by][g], 'rows': int(counts[g]),
+                 **{f'avg_{col}': float(sums[col][g] / counts[g]) for col in self.MEASURE_COLUMNS}}
+                for g in np.flatnonzero(counts)
+            ]
+        return result
+
+    def execute(self, request):
+        """Run a JSON query: {"filters": {...}, "date_from": ..., "date_to": ..., "group_by": ...}"""
+        if not isinstance(request, dict):
+            raise ValueError("Query must be a JSON object")
+        if not isinstance(request.get('filters') or {}, dict):
+            raise ValueError("filters must be an object mapping columns to values")
+        start = time.perf_counter()
+        result = self.query(request.get('filters'), request.get('date_from'),
+                            request.get('date_to'), request.get('group_by'))
+        result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+        return result
+
+class TripQueryHandler(BaseHTTPRequestHandler):
+    """
+    POST /query with a JSON body; GET /health
+    """
+
+    index = None
+
+    def _send(self, status, payload):
+        """Write a JSON response"""
+        data = json.dumps(payload, default=lambda o: o.item() if isinstance(o, np.generic) else str(o)).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        """Health check"""
+        if self.path == '/health':
+            self._send(200, {'status': 'ok', 'rows': self.index.n_rows})
+        else:
+            self._send(404, {'error': f'No route for GET {self.path}'})
+
+    def do_POST(self):
+        """Execute one query"""
+        if self.path != '/query':
+            self._send(404, {'error': f'No route for POST {self.path}'})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            self._send(200, self.index.execute(request))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self._send(400, {'error': str(e)})
+
+    def log_message(self, format, *args):
+        """Keep the console quiet"""
+        pass
+
+class UberTripQueryService:
+    """
+    Build or load the index, serve it, and benchmark drill-down queries
+    """
+
+    def __init__(self, data_path='uber_enhanced.csv', index_dir='trip_query_index'):
+        """Initialize the service"""
+        self.data_path = data_path
+        self.index_dir = index_dir
+        self.index = None
+
+    def load_index(self, rebuild=False):
+        """Load the saved index, building it from the enhanced dataset if needed"""
+        print("=" * 80)
+        print("UBER FARES DATASET - INDEXED QUERY SERVICE")
+        print("=" * 80)
+
+        start = time.perf_counter()
+        if rebuild or not os.path.exists(os.path.join(self.index_dir, 'manifest.json')):
+            df = pd.read_csv(self.data_path, usecols=list(dict.fromkeys(
+                ['pickup_datetime'] + TripQueryIndex.MEASURE_COLUMNS + TripQueryIndex.GROUP_COLUMNS)))
+            TripQueryIndex.build(df).save(self.index_dir)
+            print(f"\n✅ Index built from {self.data_path} and saved to {self.index_dir}/")
+        self.index = TripQueryIndex.load(self.index_dir)
+
+        print(f"\n📊 Index ready in {time.perf_counter() - start:.2f}s:")
+        print(f"   • Rows: {self.index.n_rows:,}")
+        for col in TripQueryIndex.BITMAP_COLUMNS:
+            print(f"   • {col}: {len(self.index.categories[col])} bitmaps")
+        return self.index
+
+    def serve(self, host='127.0.0.1', port=8081):
+        """Serve queries over HTTP until interrupted"""
+        TripQueryHandler.index = self.index
+        server = ThreadingHTTPServer((host, port), TripQueryHandler)
+        print(f"\n🚀 Query service listening on http://{host}:{server.server_address[1]}/query")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print(f"\n🛑 Query service stopped")
+        finally:
+            server.server_close()
+
+    def random_queries(self, n_queries, seed=42):
+        """Typical dashboard drill-downs: a date range plus one to three filters, sometimes grouped"""
+        rng = np.random.default_rng(seed)
+        t_min, t_max = int(self.index.timestamps[0]), int(self.index.timestamps[-1])
+        queries = []
+        for _ in range(n_queries):
+            span = int(rng.choice([7, 30, 90, 365])) * 86400
+            begin = int(rng.integers(t_min, max(t_min + 1, t_max - span)))
+            filters = {}
+            for col in rng.choice(TripQueryIndex.BITMAP_COLUMNS, size=int(rng.integers(1, 4)), replace=False):
+                filters[str(col)] = [self.index.categories[col][int(rng.integers(len(self.index.categories[col])))]]
+            queries.append({
+                'filters': filters,
+                'date_from': str(np.datetime64(begin, 's')),
+                'date_to': str(np.datetime64(begin + span, 's')),
+                'group_by': str(rng.choice(['pickup_hour', 'pickup_borough'])) if rng.random() < 0.5 else None,
+            })
+        return queries
+
+    def benchmark(self, n_queries=500, url=None):
+        """Latency of random drill-down queries, in-process or against a running server"""
+        print("\n" + "=" * 60)
+        print("QUERY BENCHMARK")
+        print("=" * 60)
+
+        queries = self.random_queries(n_queries)
+        timings, matched = [], []
+        for q in queries:
+            start = time.perf_counter()
+            if url:
+                request = Request(url, data=json.dumps(q).encode(), headers={'Content-Type': 'application/json'})
+                with urlopen(request) as response:
+                    result = json.loads(response.read())
+            else:
+                result = self.index.execute(q)
+            timings.append(time.perf_counter() - start)
+            matched.append(result['rows_matched'])
+
+        timings_ms = np.array(timings) * 1000
+        print(f"\n📊 {n_queries} drill-down queries ({'HTTP ' + url if url else 'in-process'}):")
+        print(f"   • Average rows matched: {np.mean(matched):,.0f}")
+        print(f"   • Latency p50: {np.percentile(timings_ms, 50):.2f} ms")
+        print(f"   • Latency p99: {np.percentile(timings_ms, 99):.2f} ms")
+        print(f"   • Max latency: {timings_ms.max():.2f} ms")
+        return timings_ms
+
+def main():
+    """Main function to serve or benchmark the query service"""
+    parser = argparse.ArgumentParser(description='Indexed drill-down query service')
+    parser.add_argument('command', choices=['serve', 'benchmark'])
+    parser.add_argument('--data', default='uber_enhanced.csv')
+    parser.add_argument('--index-dir', default='trip_query_index')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the index from --data')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--url', default=None, help='Benchmark a running server instead of in-process')
+    args = parser.parse_args()
+
+    service = UberTripQueryService(args.data, args.index_dir)
+    service.load_index(args.rebuild)
+    if args.command == 'serve':
+        service.serve(args.host, args.port)
+    else:
+        service.benchmark(args.queries, args.url)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Out-of-Core Trip Segmentation: Streaming Standardization, Incremental PCA and Mini-Batch K-Means
+"""
+
+import argparse
+import os
+import time
+import pandas as pd
+import numpy as np
+from column_cache import ColumnCache, cache_dir_for
+from instrumentation import PeakRSSMeter
+import warnings
+warnings.filterwarnings('ignore')
+
+# Numeric trip features the segments are built from (missing ones are skipped)
+SEGMENT_FEATURES = ['fare_amount', 'trip_distance_km', 'passenger_count', 'pickup_hour', 'is_weekend',
+                    'is_peak_hour', 'is_inter_borough', 'pickup_distance_from_center',
+                    'dropoff_distance_from_center', 'is_airport_trip']
+
+# Heavy-tailed features are compressed before scaling so a few long trips do not dominate
+LOG_FEATURES = ['fare_amount', 'trip_distance_km', 'pickup_distance_from_center', 'dropoff_distance_from_center']
+
+# (low, high) wording per model input, used to describe a segment by its most distinctive inputs
+FEATURE_LABELS = {
+    'fare_amount': ('low fares', 'high fares'),
+    'trip_distance_km': ('short hops', 'long trips'),
+    'passenger_count': ('solo riders', 'groups'),
+    'is_weekend': ('weekdays', 'weekends'),
+    'is_peak_hour': ('off-peak', 'rush hour'),
+    'is_inter_borough': ('within one borough', 'cross-borough'),
+    'pickup_distance_from_center': ('central pickups', 'outlying pickups'),
+    'dropoff_distance_from_center': ('central dropoffs', 'outlying dropoffs'),
+    'is_airport_trip': ('no airport', 'airport runs'),
+    'pickup_hour_sin': ('evening', 'morning'),
+    'pickup_hour_cos': ('daytime', 'late night'),
+}
+
+class UberTripSegmentation:
+    """
+    Segment trips with every model fitted chunk by chunk
+
+    The data is streamed four times: StandardScaler.partial_fit collects
+    running means and variances, IncrementalPCA.partial_fit learns the
+    components, MiniBatchKMeans.partial_fit learns the centroids, and a last
+    pass assigns labels, appends them to the output and accumulates the
+    per-segment sums. Only one chunk is in memory at a time; chunks come from
+    the memory-mapped column cache when it is fresh, otherwise from the CSV.
+    """
+
+    def __init__(self, data_path='uber_enhanced.csv', n_segments=6, n_components=5, chunk_size=100000,
+                 epochs=1, random_state=42):
+        """Initialize the segmentation"""
+        self.data_path = data_path
+        self.n_segments = n_segments
+        self.n_components = n_components
+        self.chunk_size = chunk_size
+        self.epochs = epochs
+        self.random_state = random_state
+        self.columns = None
+        self.features = None
+        self.scaler = None
+        self.pca = None
+        self.kmeans = None
+        self.meter = PeakRSSMeter()
+        self.chunk_log = []
+        self.summary = None
+
+    def _chunks(self, all_columns=False):
+        """Chunks of the needed (or all) columns, from the column cache if fresh, else parsed from the CSV"""
+        columns = None if all_columns else self.columns
+        cache = ColumnCache(cache_dir_for(self.data_path))
+        if os.environ.get('UBER_COLUMN_CACHE', '1') != '0' and cache.is_fresh(self.data_path):
+            df = cache.read(columns)
+            for start in range(0, len(df), self.chunk_size):
+                yield df.iloc[start:start + self.chunk_size]
+        else:
+            yield from pd.read_csv(self.data_path, usecols=columns, chunksize=self.chunk_size)
+
+    def _feature_matrix(self, chunk):
+        """Model inputs of one chunk: log-compressed tails and the pickup hour on a circle"""
+        columns = []
+        for feature in self.features:
+            if feature == 'pickup_hour_sin':
+                values = np.sin(2 * np.pi * chunk['pickup_hour'].to_numpy(dtype=float) / 24)
+            elif feature == 'pickup_hour_cos':
+                values = np.cos(2 * np.pi * chunk['pickup_hour'].to_numpy(dtype=float) / 24)
+            else:
+                values = chunk[feature].to_numpy(dtype=float)
+                if feature in LOG_FEATURES:
+                    values = np.log1p(np.clip(values, 0, None))
+            columns.append(values)
+        return np.nan_to_num(np.column_stack(columns))
+
+    def _stream(self, name, step, all_columns=False):
+        """Run step(chunk) over every chunk, logging time per chunk and peak memory"""
+        self.meter.reset()
+        start = time.perf_counter()
+        rows = 0
+        timings = []
+        for i, chunk in enumerate(self._chunks(all_columns)):
+            chunk_start = time.perf_counter()
+            step(chunk)
+            elapsed = time.perf_counter() - chunk_start
+            rows += len(chunk)
+            timings.append(elapsed)
+            self.chunk_log.append({'pass': name, 'chunk': i, 'rows': len(chunk), 'seconds': elapsed,
+                                   'peak_rss_mb': self.meter.peak_mb()})
+        total = time.perf_counter() - start
+        print(f"   • {name:10s} {len(timings):4d} chunks, {rows:,} rows in {total:.2f}s "
+              f"(mean {np.mean(timings) * 1000 if timings else 0:.1f} ms/chunk, "
+              f"max {max(timings, default=0) * 1000:.1f} ms), peak RSS {self.meter.peak_mb():.0f} MB")
+        return rows
+
+    def fit(self):
+        """Fit the scaler, incremental PCA and mini-batch k-means pass by pass"""
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.decomposition import IncrementalPCA
+        from sklearn.preprocessing import StandardScaler
+
+        print("=" * 80)
+        print("UBER FARES DATASET - OUT-OF-CORE TRIP SEGMENTATION")
+        print("=" * 80)
+
+        header = pd.read_csv(self.data_path, nrows=0).columns
+        self.columns = [col for col in SEGMENT_FEATURES if col in header]
+        self.features = [col for col in self.columns if col != 'pickup_hour']
+        if 'pickup_hour' in self.columns:
+            self.features += ['pickup_hour_sin', 'pickup_hour_cos']
+        self.n_components = min(self.n_components, len(self.features))
+
+        print(f"\n📊 Segmenting {self.data_path} in chunks of {self.chunk_size:,} rows:")
+        print(f"   • Features: {', '.join(self.features)}")
+        print(f"   • {self.n_components} principal components, {self.n_segments} segments")
+
+        self.scaler = StandardScaler()
+        self.pca = IncrementalPCA(n_components=self.n_components)
+        self.kmeans = MiniBatchKMeans(n_clusters=self.n_segments, random_state=self.random_state,
+                                      n_init=3, batch_size=min(self.chunk_size, 4096))
+
+        # IncrementalPCA needs at least n_components rows per batch: short chunks are stacked until a block is
+        # big enough, and each block is fitted only once the next one is ready so a short tail can join the last
+        pending = []
+        ready = []
+
+        def fit_scaler(chunk):
+            # A header-only file still yields one empty chunk
+            if len(chunk):
+                self.scaler.partial_fit(self._feature_matrix(chunk))
+
+        def fit_pca(chunk):
+            pending.append(self.scaler.transform(self._feature_matrix(chunk)))
+            if sum(len(block) for block in pending) >= self.n_components:
+                if ready:
+                    self.pca.partial_fit(ready.pop())
+                ready.append(np.vstack(pending))
+                pending.clear()
+
+        def fit_kmeans(chunk):
+            components = self.pca.transform(self.scaler.transform(self._feature_matrix(chunk)))
+            if len(components) >= self.n_segments or hasattr(self.kmeans, 'cluster_centers_'):
+                self.kmeans.partial_fit(components)
+
+        print(f"\n⏱️ Passes over the data:")
+        rows = self._stream('scale', fit_scaler)
+        needed = max(self.n_components, self.n_segments)
+        if rows < needed:
+            raise ValueError(f"{self.data_path} has {rows:,} trips; {self.n_components} components and "
+                             f"{self.n_segments} segments need at least {needed}")
+        self._stream('pca', fit_pca)
+        self.pca.partial_fit(np.vstack(ready + pending))
+        for epoch in range(self.epochs):
+            self._stream('kmeans' if self.epochs == 1 else f'kmeans {epoch + 1}', fit_kmeans)
+        if not hasattr(self.kmeans, 'cluster_centers_'):
+            raise ValueError(f"No chunk holds {self.n_segments} trips to start k-means; raise --chunk-size")
+
+        explained = self.pca.explained_variance_ratio_
+        print(f"\n✅ Models fitted:")
+        print(f"   • Variance explained by {self.n_components} components: {explained.sum() * 100:.1f}% "
+              f"({', '.join(f'{v * 100:.1f}%' for v in explained)})")
+        return self
+
+    def _segment_names(self, profiles):
+        """Describe segments by their three most distinctive inputs (largest centroid z-scores)"""
+        standardized = (profiles[self.features] - self.scaler.mean_) / self.scaler.scale_
+        names = {}
+        for segment, row in standardized.iterrows():
+            top = row.abs().sort_values(ascending=False).index[:3]
+            names[segment] = ', '.join(FEATURE_LABELS.get(f, (f'low {f}', f'high {f}'))[int(row[f] > 0)] for f in top)
+        return names
+
+    def label(self, output_path='uber_trip_segments.csv', summary_path='uber_segment_summary.csv', with_trips=False):
+        """
+        Assign a segment to every trip and write the labels and per-segment summaries
+
+        Each label row carries row_id, the trip's 0-based row in the input
+        file, to join on; with_trips also writes every trip column next to it.
+        """
+        print("\n" + "=" * 60)
+        print("1. LABELLING TRIPS")
+        print("=" * 60)
+
+        summary_columns = self.columns + [f for f in self.features if f not in self.columns]
+        sums = np.zeros((self.n_segments, len(summary_columns)))
+        counts = np.zeros(self.n_segments, dtype=np.int64)
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+        next_row_id = [0]
+
+        def assign(chunk):
+            matrix = self._feature_matrix(chunk)
+            labels = self.kmeans.predict(self.pca.transform(self.scaler.transform(matrix)))
+            # Summaries use the model inputs for the hour circle and raw values for everything else
+            raw = np.column_stack([chunk[col].to_numpy(dtype=float) for col in self.columns]
+                                  + [matrix[:, self.features.index(f)] for f in summary_columns[len(self.columns):]])
+            np.add.at(sums, labels, np.nan_to_num(raw))
+            counts[:] += np.bincount(labels, minlength=self.n_segments)
+            row_ids = np.arange(next_row_id[0], next_row_id[0] + len(chunk))
+            next_row_id[0] += len(chunk)
+            output = chunk.reset_index(drop=True) if with_trips else pd.DataFrame(index=range(len(chunk)))
+            output.insert(0, 'row_id', row_ids)
+            output['trip_segment'] = labels
+            output.to_csv(output_path, mode='a', index=False, header=not os.path.exists(output_path))
+
+        print(f"\n⏱️ Passes over the data:")
+        rows = self._stream('label', assign, all_columns=with_trips)
+
+        profiles = pd.DataFrame(sums / np.maximum(counts, 1)[:, None], columns=summary_columns)
+        # Log features are profiled in model space for naming, raw means are reported
+        model_profiles = profiles.copy()
+        for feature in LOG_FEATURES:
+            if feature in model_profiles:
+                model_profiles[feature] = np.log1p(np.clip(model_profiles[feature], 0, None))
+        names = self._segment_names(model_profiles)
+
+        self.summary = profiles[self.columns].copy()
+        self.summary.insert(0, 'share_pct', counts / max(rows, 1) * 100)
+        self.summary.insert(0, 'trips', counts)
+        self.summary.insert(0, 'description', [names[s] for s in range(self.n_segments)])
+        self.summary.index.name = 'trip_segment'
+        self.summary.to_csv(summary_path)
+
+        print(f"\n📊 Segments ({rows:,} trips):")
+        for segment, row in self.summary.sort_values('trips', ascending=False).iterrows():
+            details = [f"{row['trips']:,} trips ({row['share_pct']:.1f}%)"]
+            if 'fare_amount' in row:
+                details.append(f"avg fare ${row['fare_amount']:.2f}")
+            if 'trip_distance_km' in row:
+                details.append(f"{row['trip_distance_km']:.1f} km")
+            if 'pickup_hour' in row:
+                details.append(f"mean hour {row['pickup_hour']:.1f}")
+            print(f"   • Segment {segment}: {row['description']}")
+            print(f"        {', '.join(details)}")
+
+        print(f"\n💾 Segment labels saved to: {output_path} "
+              f"({'trip columns, ' if with_trips else ''}row_id and trip_segment for every input trip)")
+        print(f"💾 Segment summaries saved to: {summary_path}")
+        return self.summary
+
+    def save_chunk_log(self, log_path='uber_segmentation_chunks.csv'):
+        """Save time and peak memory per chunk and pass"""
+        pd.DataFrame(self.chunk_log).to_csv(log_path, index=False)
+        print(f"💾 Chunk timings saved to: {log_path}")
+        return log_path
+
+def main():
+    """Main function to segment trips out of core"""
+    parser = argparse.ArgumentParser(description='Out-of-core trip segmentation')
+    parser.add_argument('--data', default='uber_enhanced.csv', help='Enhanced dataset')
+    parser.add_argument('--segments', type=int, default=6, help='Number of segments')
+    parser.add_argument('--components', type=int, default=5, help='Principal components kept')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Rows per chunk')
+    parser.add_argument('--epochs', type=int, default=1, help='Mini-batch k-means passes')
+    parser.add_argument('--with-trips', action='store_true',
+                        help='Write every trip column next to its segment label')
+    args = parser.parse_args()
+
+    segmentation = UberTripSegmentation(args.data, args.segments, args.components, args.chunk_size, args.epochs)
+    try:
+        segmentation.fit()
+    except ValueError as e:
+        print(f"\n❌ Cannot segment trips: {e}")
+        return
+    segmentation.label(with_trips=args.with_trips)
+    segmentation.save_chunk_log()
+
+    print(f"\n🎯 Trip segmentation completed successfully!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Uber Fares Command-Line Entry Point: One Subcommand per Stage, Heavy Libraries Loaded on Demand
+"""
+
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+CLI_START = time.perf_counter()
+
+# Subcommand -> (script module, help); a module is imported only when its subcommand runs
+COMMANDS = {
+    'explore': ('quick_data_exploration', 'Quick look at the raw dataset'),
+    'overview': ('uber_data_analysis', 'Initial overview of the raw dataset'),
+    'profile': ('dataset_profiler', 'Single-pass profile of a CSV'),
+    'clean': ('data_cleaning', 'Clean the raw dataset'),
+    'features': ('feature_engineering', 'Engineer features on the cleaned dataset'),
+    'eda': ('comprehensive_eda', 'Comprehensive EDA charts'),
+    'advanced': ('advanced_analysis', 'Correlation, fare factor and seasonal analysis'),
+    'tableau': ('tableau_prep_and_interactive_viz', 'Tableau exports and interactive dashboard'),
+    'pipeline': ('run_pipeline', 'Run several stages in one process'),
+    'parallel': ('parallel_analysis', 'Run the three analyses concurrently on shared memory'),
+    'kpi': ('kpi_aggregates', 'Incremental KPI aggregates'),
+    'forecast': ('demand_forecasting', 'Zone-level demand forecasts'),
+    'anomalies': ('fare_anomaly_detection', 'Fare anomaly detection'),
+    'tiles': ('tile_pyramid', 'Map tile pyramid'),
+    'spatial': ('spatial_index', 'Radius, box and origin-destination trip index'),
+    'compact': ('compact_trips', 'Quantized coordinates and delta-encoded pickup times'),
+    'query': ('trip_query_service', 'Indexed drill-down query service'),
+    'quote': ('fare_quote_service', 'Fare quote service'),
+    'synth': ('synthetic_trips', 'Generate synthetic raw trips'),
+    'bench': ('benchmark_suite', 'Per-method benchmark suite'),
+    'events': ('instrumentation', 'Summarize instrumentation events'),
+    'cache': ('column_cache', 'Build memory-mapped column caches'),
+    'partitions': ('partitioned_store', 'Build year/month partitioned layouts and test date-range reads'),
+    'timestore': ('time_sorted_store', 'Build the time-sorted store and benchmark range slices'),
+    'engines': ('dataframe_engine', 'Benchmark the pandas and DuckDB engines side by side'),
+    'segments': ('trip_segmentation', 'Out-of-core trip segmentation'),
+    'live': ('live_ingestion', 'Live trip ingestion with continuously published KPIs'),
+}
+
+# Libraries whose import dominates startup; reported per subcommand by `timing`
+HEAVY_LIBRARIES = ['matplotlib', 'seaborn', 'plotly', 'scipy', 'sklearn']
+
+# Modules that run their work at import time instead of through main()
+IMPORT_RUNS = {'quick_data_exploration'}
+
+def run_command(command, args, timing=False):
+    """Import the subcommand's module and run its main() with the remaining arguments"""
+    module_name = COMMANDS[command][0]
+    sys.argv = [f'{module_name}.py'] + list(args)
+
+    start = time.perf_counter()
+    startup_s = start - CLI_START
+    module = importlib.import_module(module_name)
+    import_s = time.perf_counter() - start
+    start = time.perf_counter()
+    if module_name not in IMPORT_RUNS:
+        module.main()
+    run_s = time.perf_counter() - start
+
+    if timing:
+        print(f"\n⏱️ {command}: CLI startup {startup_s:.3f}s, "
+              f"import {import_s:.3f}s, run {run_s:.3f}s", file=sys.stderr)
+
+def measure_startup(commands=None, repeat=3):
+    """Cold import and interpreter startup time per subcommand, each in a fresh Python process"""
+    print("=" * 80)
+    print("UBER CLI - SUBCOMMAND STARTUP TIMES")
+    print("=" * 80)
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    probe = ("import sys, time; start = time.perf_counter(); import {module}; "
+             "elapsed = time.perf_counter() - start; "
+             "heavy = [name for name in {heavy!r} if name in sys.modules]; "
+             "print(elapsed, ','.join(heavy) or '-')")
+    results = {}
+    for command in commands or COMMANDS:
+        module_name = COMMANDS[command][0]
+        if module_name in IMPORT_RUNS:
+            continue
+        imports, startups = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, '-c', probe.format(module=module_name, heavy=HEAVY_LIBRARIES)],
+                                    cwd=script_dir, capture_output=True, text=True, check=True).stdout.split()
+            startups.append(time.perf_counter() - start)
+            imports.append(float(output[0]))
+        results[command] = {'import_s': min(imports), 'startup_s': min(startups), 'heavy': output[1]}
+
+    print(f"\n⏱️ Best of {repeat} cold starts (import = module import, startup = whole interpreter):")
+    for command, result in results.items():
+        print(f"   • {command:10s} import {result['import_s']:.3f}s, startup {result['startup_s']:.3f}s, "
+              f"heavy libraries loaded: {result['heavy']}")
+    return results
+
+def main():
+    """Main function to dispatch a subcommand"""
+    parser = argparse.ArgumentParser(
+        description='Uber fares analysis command line',
+        epilog='Subcommands: ' + ', '.join(f'{name} ({help_text})' for name, (_, help_text) in COMMANDS.items())
+               + "; run '<subcommand> --help' for its options, or 'timing' to measure startup per subcommand")
+    parser.add_argument('--timing', action='store_true', help='Report startup, import and run time to stderr')
+    parser.add_argument('command', choices=list(COMMANDS) + ['timing'], metavar='subcommand')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='Arguments passed on to the subcommand')
+    args = parser.parse_args()
+
+    if args.command == 'timing':
+        measure_startup(args.args or None)
+    else:
+        run_command(args.command, args.args, args.timing)
+
+if __name__ == "__main__":
+    main()
@@ -16,11 +16,7 @@ Date: July 2025
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from plot_style import pyplot
 import warnings
 from datetime import datetime
 import os
@@ -31,10 +27,6 @@ pd.set_option('display.width', None)
 pd.set_option('display.max_colwidth', None)
 warnings.filterwarnings('ignore')
 
-# Set style for matplotlib
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
-
 class UberDataAnalyzer:
     """
     A comprehensive class for analyzing Uber Fares dataset
@@ -121,6 +113,7 @@ class UberDataAnalyzer:
         """
         Comprehensive analysis of missing values
         """
+        plt = pyplot()
         print("\n" + "=" * 60)
         print("3. MISSING VALUES ANALYSIS")
         print("=" * 60)
@@ -210,8 +203,7 @@ class UberDataAnalyzer:
             lower_bound = Q1 - 1.5 * IQR
             upper_bound = Q3 + 1.5 * IQR
             
-            outliers = self.df[(self.df[col] < lower_bound) | (self.df[col] > upper_bound)]
-            outlier_count = len(outliers)
+            outlier_count = int(((self.df[col] < lower_bound) | (self.df[col] > upper_bound)).sum())
             outlier_percentage = (outlier_count / len(self.df)) * 100
             
             outlier_summary[col] = {